@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from parse_goodreads import (
+    extraer_isbn_de_html, extraer_isbn_de_html_bs4,
+    parsear_pagina_busqueda, parsear_pagina_busqueda_bs4
+)
+
+# --- CONFIGURACIÓN ---
+NUM_PAGINAS = 50
+REPETICIONES = 3
+URL_BASE = "https://www.goodreads.com"
+
+# Relleno HTML para que las páginas sintéticas tengan un tamaño y número de nodos parecidos a las reales
+def generar_relleno(num_bloques, aleatorio):
+    return "".join(
+        f'<div class="bloque-{i}"><p>Texto de relleno {aleatorio.random():.6f}</p><a href="/x/{i}">enlace</a>'
+        f'<ul>{"".join(f"<li>elemento {j}</li>" for j in range(5))}</ul></div>'
+        for i in range(num_bloques)
+    )
+
+# Genera una página de detalle de libro: con JSON-LD, solo con ISBN en el texto, o sin ISBN
+def generar_pagina_detalle(indice, aleatorio):
+    relleno = generar_relleno(400, aleatorio)
+    if indice % 10 == 0:
+        cabecera = ""
+        cuerpo = f"<div>ISBN: 0{indice:09d}</div>"
+    elif indice % 10 == 1:
+        cabecera = ""
+        cuerpo = ""
+    else:
+        cabecera = f'<script type="application/ld+json">{{"@context":"https://schema.org","@type":"Book","name":"Libro {indice}","isbn":"978{indice:010d}"}}</script>'
+        cuerpo = ""
+    return f"<html><head><title>Libro {indice}</title><script>var x = 1;</script>{cabecera}</head><body>{relleno}{cuerpo}{relleno}</body></html>"
+
+# Genera una página de búsqueda con 20 filas de libro, alguna incompleta
+def generar_pagina_busqueda(pagina, aleatorio):
+    filas = []
+    for i in range(20):
+        rating = "" if i == 7 else f'<span class="greyText smallText uitext"><span class="minirating"><span class="stars"></span> {aleatorio.uniform(3, 5):.2f} avg rating — {aleatorio.randint(1, 99999):,} ratings</span></span>'
+        filas.append(
+            f'<tr itemscope itemtype="http://schema.org/Book"><td width="5%"><img src="/c.jpg"></td><td>'
+            f'<a class="bookTitle" itemprop="url" href="/book/show/{pagina}{i}-libro"><span itemprop="name" role="heading"> Libro {pagina}.{i}: Un subtítulo </span></a>'
+            f' by <span itemprop="author"><div class="authorName__container"><a class="authorName" href="/author/{i}"><span itemprop="name">Autor {i}</span></a></div></span>'
+            f'<br>{rating}</td></tr>'
+        )
+    return f"<html><body>{generar_relleno(200, aleatorio)}<table class='tableList'>{''.join(filas)}</table>{generar_relleno(100, aleatorio)}</body></html>"
+
+# Mide el mejor tiempo de varias repeticiones de una función sobre todas las páginas
+def medir(funcion, paginas, *args):
+    mejor = float('inf')
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultados = [funcion(pagina, *args) for pagina in paginas]
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultados
+
+def main():
+    aleatorio = random.Random(42)
+    paginas_detalle = [generar_pagina_detalle(i, aleatorio) for i in range(NUM_PAGINAS)]
+    paginas_busqueda = [generar_pagina_busqueda(i, aleatorio) for i in range(NUM_PAGINAS)]
+    tamano_medio = sum(len(p) for p in paginas_detalle) / len(paginas_detalle) / 1024
+    print(f"{NUM_PAGINAS} páginas de detalle (~{tamano_medio:.0f} KiB) y {NUM_PAGINAS} de búsqueda; mejor de {REPETICIONES} repeticiones\n")
+
+    casos = [
+        ("detalle (ISBN)", paginas_detalle, extraer_isbn_de_html_bs4, extraer_isbn_de_html, "url"),
+        ("búsqueda (filas)", paginas_busqueda, parsear_pagina_busqueda_bs4, parsear_pagina_busqueda, URL_BASE),
+    ]
+    for nombre, paginas, referencia, rapida, argumento in casos:
+        tiempo_bs4, resultados_bs4 = medir(referencia, paginas, argumento)
+        tiempo_rapido, resultados_rapidos = medir(rapida, paginas, argumento)
+        if resultados_bs4 != resultados_rapidos:
+            raise AssertionError(f"Los resultados de '{nombre}' no coinciden entre BeautifulSoup y el camino rápido")
+        print(f"{nombre:<18} BeautifulSoup: {tiempo_bs4 * 1000 / len(paginas):8.2f} ms/página | "
+              f"rápido: {tiempo_rapido * 1000 / len(paginas):8.2f} ms/página | x{tiempo_bs4 / tiempo_rapido:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+
+DIRECTORIO_BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(DIRECTORIO_BENCHMARKS, '..', 'src'))
+
+import enrich_googlebooks
+from cli import SUBCOMANDOS
+import integrate_pipeline as ip
+import scrape_goodreads
+import utils_rate_limit
+from catalogo_sintetico import SEMILLA_DEFAULT, generar_landing
+from indice_libros import RUTA_INDICE_LIBROS, construir_indice
+from motor_arrow import normalizar_y_verificar_calidad_arrow, generar_book_id_arrow, deduplicar_y_seleccionar_ganador_arrow
+from servidor_stub import RUTA_API_GOOGLE_BOOKS, ServidorStub
+from utils_landing import ARCHIVO_GOOGLE_BOOKS
+from utils_metricas import RegistroMetricas, obtener_registro
+from utils_parquet import COLUMNA_PARTICION_DIM_BOOK, ESQUEMA_DIM_BOOK, escribir_tabla
+from utils_quality import generar_reporte_calidad
+
+# --- CONFIGURACIÓN ---
+TAMANOS_DEFAULT = (1_000, 100_000, 1_000_000) # Se pueden cambiar por línea de comandos
+# El scraping y el enriquecimiento hacen una petición por página; por encima de este número de libros
+# se miden sobre este número, que basta para ver el coste por petición
+LIBROS_RED_MAX = 2_000
+MOTORES_BENCH = ('pandas', 'arrow')
+DIRECTORIO_DATOS = os.path.join(DIRECTORIO_BENCHMARKS, '_datos') # Zonas landing generadas, reutilizadas entre ejecuciones
+RUTA_RESULTADOS = os.path.join(DIRECTORIO_BENCHMARKS, 'resultados_pipeline.jsonl')
+UMBRAL_REGRESION = 1.2 # Una etapa un 20% más lenta que en la versión anterior se marca como regresión
+REPETICIONES_ARRANQUE = 5 # Arranques medidos por comando; se guarda la mediana
+# Libro del índice mínimo con el que se mide una búsqueda real desde la CLI
+LIBRO_ARRANQUE = {
+    'book_id': '9780132350884', 'titulo': 'Clean Code', 'titulo_normalizado': 'clean code',
+    'autor_principal': 'Robert C. Martin', 'autores': ['Robert C. Martin'], 'isbn13': '9780132350884',
+}
+
+# Versión del código medido: commit actual, marcado si hay cambios sin confirmar en src/
+def version_codigo():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DIRECTORIO_BENCHMARKS,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--', os.path.join('..', 'src')], cwd=DIRECTORIO_BENCHMARKS,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocida'
+    return f"{commit}-modificado" if cambios else commit
+
+def entorno():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+        'cpus': os.cpu_count(),
+        'sistema': platform.platform(),
+    }
+
+# Devuelve la zona landing sintética de un tamaño, generándola solo la primera vez
+def preparar_landing(tamano, semilla=SEMILLA_DEFAULT):
+    directorio = os.path.join(DIRECTORIO_DATOS, f"{tamano}-{semilla}", 'landing')
+    if not os.path.exists(os.path.join(directorio, ARCHIVO_GOOGLE_BOOKS)):
+        print(f"Generando zona landing sintética de {tamano} libros...")
+        generar_landing(directorio, tamano, semilla)
+    return directorio
+
+# Segundos que tarda un intérprete nuevo en ejecutar el código indicado desde `directorio` (mediana de varias repeticiones)
+def _segundos_arranque(codigo, directorio):
+    directorio_src = os.path.join(DIRECTORIO_BENCHMARKS, '..', 'src')
+    entorno_proceso = {**os.environ, 'PYTHONPATH': directorio_src}
+    tiempos = []
+    for _ in range(REPETICIONES_ARRANQUE):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, '-c', codigo], cwd=directorio, env=entorno_proceso, check=True, stdout=subprocess.DEVNULL)
+        tiempos.append(time.perf_counter() - inicio)
+    return sorted(tiempos)[len(tiempos) // 2]
+
+# Escribe en `directorio` un dim_book de un libro y su índice de búsqueda
+def _preparar_indice_arranque(directorio):
+    ruta_dim_book = os.path.join(directorio, ip.RUTA_DIM_BOOK)
+    escribir_tabla(pa.Table.from_pylist([LIBRO_ARRANQUE], schema=ESQUEMA_DIM_BOOK), ruta_dim_book,
+                   columna_particion=COLUMNA_PARTICION_DIM_BOOK)
+    construir_indice(ruta_dim_book, os.path.join(directorio, RUTA_INDICE_LIBROS))
+
+# Mide el arranque de la CLI: la CLI sola (lo que cuesta mostrar la ayuda), la CLI con el módulo de cada subcomando
+# importado, que es lo que paga cualquier ejecución antes de empezar a trabajar, y una búsqueda completa con
+# 'buscar' sobre un índice mínimo, que incluye lo que se importa al abrir el índice y consultarlo.
+# No depende del tamaño del catálogo
+def medir_arranque():
+    comandos = {'cli': "import cli"}
+    comandos.update({f"cli {nombre}": f"import cli; cli.cargar_subcomando('{nombre}')" for nombre in SUBCOMANDOS})
+    comandos['cli buscar (consulta)'] = f"import cli; cli.main(['buscar', '{LIBRO_ARRANQUE['isbn13']}'])"
+    with tempfile.TemporaryDirectory() as directorio:
+        _preparar_indice_arranque(directorio)
+        return [
+            {'etapa': etapa, 'segundos': round(_segundos_arranque(codigo, directorio), 4), 'filas_por_segundo': None, 'rss_pico_mb': None}
+            for etapa, codigo in comandos.items()
+        ]
+
+# Mide el scraping asíncrono y el enriquecimiento contra el servidor stub, sin caché en disco ni límite de tasa
+def medir_red(num_libros, semilla=SEMILLA_DEFAULT):
+    registro = obtener_registro()
+    registro.reiniciar()
+    with ServidorStub(num_libros, semilla) as servidor:
+        host = servidor.url_base.split('//', 1)[1]
+        utils_rate_limit.TASAS_POR_HOST[host] = {'tasa_inicial': 1e6, 'tasa_maxima': 1e6}
+        scrape_goodreads.URL_BASE_GOODREADS = servidor.url_base
+        scrape_goodreads.USAR_CACHE_HTTP = False
+        enrich_googlebooks.URL_API_GOOGLE_BOOKS = servidor.url_base + RUTA_API_GOOGLE_BOOKS
+        enrich_googlebooks.USAR_CACHE_CONSULTAS = False
+
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            with registro.etapa('scraping') as medicion:
+                libros = asyncio.run(scrape_goodreads.extraer_goodreads_async('benchmark', num_libros))
+                medicion['filas'] = len(libros)
+            with registro.etapa('enriquecimiento', filas=len(libros)):
+                df_enriquecido = enrich_googlebooks.enriquecer_libros('clave-benchmark', pd.DataFrame(libros))
+
+    if len(libros) != num_libros:
+        raise AssertionError(f"El scraping devolvió {len(libros)} libros en lugar de {num_libros}")
+    resumen = registro.resumen()
+    resumen['encontrados_google_books'] = int(df_enriquecido['gb_id'].notna().sum())
+    return resumen
+
+# Mide las etapas comunes (carga, calidad, modelo canónico) y las de cada motor sobre una zona landing.
+# Se ejecuta en un directorio temporal porque la escritura Parquet usa las rutas relativas de standard/
+def medir_integracion(ruta_landing, motores=MOTORES_BENCH):
+    resultados = {}
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory() as directorio_temporal, open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        os.chdir(directorio_temporal)
+        try:
+            registro = RegistroMetricas()
+            with registro.etapa('cargar_datos') as medicion:
+                df_gr, df_gb = ip.cargar_datos(ruta_landing)
+                medicion['filas'] = len(df_gr) + len(df_gb)
+            with registro.etapa('reporte_calidad', filas=len(df_gr) + len(df_gb)):
+                generar_reporte_calidad(df_gr, 'Goodreads')
+                generar_reporte_calidad(df_gb, 'Google Books')
+                ip.anotar_hash_contenido(df_gr, df_gb)
+            with registro.etapa('crear_modelo_canonico', filas=len(df_gr)):
+                df_detalle_fuente_raw = ip.crear_modelo_canonico(df_gr, df_gb)
+            resultados['comunes'] = registro.resumen()['etapas']
+            del df_gr, df_gb
+
+            for motor in motores:
+                gc.collect()
+                resultados[motor] = medir_motor(df_detalle_fuente_raw.copy(), motor)
+        finally:
+            os.chdir(directorio_original)
+    return resultados
+
+# Pasos 3-7 del pipeline con un motor: normalización, book_id, deduplicación, dim_book y escritura Parquet
+def medir_motor(df_detalle_fuente_raw, motor):
+    registro = RegistroMetricas()
+    filas = len(df_detalle_fuente_raw)
+    if motor == 'arrow':
+        tabla = pa.Table.from_pandas(df_detalle_fuente_raw, preserve_index=False)
+        with registro.etapa('normalizar_y_verificar_calidad', filas=filas):
+            tabla = normalizar_y_verificar_calidad_arrow(tabla)
+        with registro.etapa('generar_book_id', filas=filas):
+            tabla_con_id = generar_book_id_arrow(tabla)
+        with registro.etapa('deduplicar_y_seleccionar_ganador', filas=filas):
+            tabla_ganador = deduplicar_y_seleccionar_ganador_arrow(tabla_con_id)
+        with registro.etapa('crear_dim_book', filas=tabla_ganador.num_rows):
+            tabla_dim = ip.crear_dim_book_arrow(tabla_ganador)
+        with registro.etapa('escritura_parquet', filas=filas):
+            ip.guardar_dim_book(tabla_dim)
+            ip.guardar_detalle_fuente(tabla_con_id)
+    else:
+        with registro.etapa('normalizar_y_verificar_calidad', filas=filas):
+            df = ip.normalizar_y_verificar_calidad(df_detalle_fuente_raw)
+        with registro.etapa('generar_book_id', filas=filas):
+            df_con_id = ip.generar_book_id(df)
+        with registro.etapa('deduplicar_y_seleccionar_ganador', filas=filas):
+            df_ganador = ip.deduplicar_y_seleccionar_ganador(df_con_id)
+        with registro.etapa('crear_dim_book', filas=len(df_ganador)):
+            dim_book = ip.crear_dim_book(df_ganador)
+        with registro.etapa('escritura_parquet', filas=filas):
+            ip.guardar_dim_book(pa.Table.from_pandas(dim_book, preserve_index=False))
+            ip.guardar_detalle_fuente(pa.Table.from_pandas(df_con_id, preserve_index=False))
+    return registro.resumen()['etapas']
+
+# Añade un resultado al histórico JSONL
+def guardar_resultado(resultado, ruta=RUTA_RESULTADOS):
+    with open(ruta, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(resultado, ensure_ascii=False) + '\n')
+
+# Último resultado del histórico para el mismo tamaño medido con otra versión del código
+def resultado_anterior(resultado, ruta=RUTA_RESULTADOS):
+    if not os.path.exists(ruta):
+        return None
+    anterior = None
+    with open(ruta, 'r', encoding='utf-8') as f:
+        for linea in f:
+            try:
+                previo = json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+            if previo['tamano'] == resultado['tamano'] and previo['version'] != resultado['version']:
+                anterior = previo
+    return anterior
+
+# Imprime los tiempos de cada etapa y, si hay un resultado de otra versión, la variación frente a él
+def imprimir_resultado(resultado, anterior):
+    referencia = f" frente a {anterior['version']}" if anterior else ""
+    print(f"\n{resultado['tamano']:,} libros (versión {resultado['version']}{referencia})")
+    for grupo, etapas in resultado['etapas'].items():
+        previas = {e['etapa']: e for e in anterior['etapas'].get(grupo, [])} if anterior else {}
+        for medicion in etapas:
+            linea = (f"  {grupo:<8} {medicion['etapa']:<34} {medicion['segundos']:9.3f} s "
+                     f"{medicion['filas_por_segundo'] or 0:>14,.0f} filas/s {medicion['rss_pico_mb'] or 0:>8.0f} MB")
+            previa = previas.get(medicion['etapa'])
+            if previa and previa['segundos'] > 0:
+                proporcion = medicion['segundos'] / previa['segundos']
+                linea += f"  x{proporcion:.2f}" + ("  REGRESIÓN" if proporcion > UMBRAL_REGRESION else "")
+            print(linea)
+    if 'http' in resultado:
+        http = resultado['http']
+        print(f"  red      {http.get('http_peticiones', 0)} peticiones, latencia p50 {http['latencia_ms']['p50']} ms, "
+              f"p99 {http['latencia_ms']['p99']} ms")
+
+def main(tamanos=TAMANOS_DEFAULT):
+    version = version_codigo()
+    print(f"Benchmark del pipeline, versión {version}; resultados en {RUTA_RESULTADOS}")
+    arranque = medir_arranque()
+    for tamano in tamanos:
+        ruta_landing = preparar_landing(tamano)
+        resumen_red = medir_red(min(tamano, LIBROS_RED_MAX))
+        resultado = {
+            'version': version,
+            'fecha': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'entorno': entorno(),
+            'tamano': tamano,
+            'semilla': SEMILLA_DEFAULT,
+            'libros_red': min(tamano, LIBROS_RED_MAX),
+            'etapas': {'arranque': arranque, 'red': resumen_red['etapas'], **medir_integracion(ruta_landing)},
+            'http': resumen_red['http'],
+        }
+        imprimir_resultado(resultado, resultado_anterior(resultado))
+        guardar_resultado(resultado)
+        gc.collect()
+
+if __name__ == "__main__":
+    main([int(argumento) for argumento in sys.argv[1:]] or TAMANOS_DEFAULT)
@@ -0,0 +1,203 @@
+import json
+import os
+import random
+import re
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from enrich_googlebooks import extraer_info_libro
+from utils_landing import (
+    ARCHIVO_GOODREADS, ARCHIVO_GOOGLE_BOOKS, ARCHIVO_GOODREADS_LEGADO, ARCHIVO_GOOGLE_BOOKS_LEGADO,
+    ESQUEMA_LANDING_GOODREADS, ESQUEMA_LANDING_GOOGLE_BOOKS, escribir_landing
+)
+
+# --- CONFIGURACIÓN ---
+SEMILLA_DEFAULT = 42
+LIBROS_POR_PAGINA = 20 # Igual que las páginas de búsqueda de Goodreads
+PROPORCION_DUPLICADOS = 0.1 # Libros que repiten título y autor de otro anterior (la mitad, también su ISBN)
+PROPORCION_SIN_GOOGLE_BOOKS = 0.15 # Libros que la API de Google Books no encuentra
+PROPORCION_SIN_ISBN13 = 0.3
+PROPORCION_ISBN_SUCIO = 0.3 # ISBN con guiones, espacios, prefijo o dígito de control erróneo
+
+PALABRAS = ['clean', 'code', 'data', 'science', 'python', 'for', 'the', 'handbook', 'learning', 'deep', 'statistics',
+            'machine', 'a', 'guide', 'practical', 'R', 'analysis', 'systems', 'design', 'introducción', 'análisis', 'datos']
+EDITORIALES = ["O'Reilly Media", "  Prentice   Hall ", "Packt", "No Starch Press", "Anaya Multimedia", None]
+IDIOMAS = ['en', 'es', 'en-US', 'EN', 'english', 'pt-BR', None]
+MONEDAS = ['USD', 'eur', 'EURO', 'GBP', None]
+CATEGORIAS = [['Computers'], ['Computers', 'Science'], ['Mathematics'], []]
+MESES = ['January', 'March', 'June', 'October']
+
+# Calcula el dígito de control de un ISBN-13 a partir de sus 12 primeros dígitos
+def _digito_control_isbn13(base):
+    total = sum(int(c) * (1 if i % 2 == 0 else 3) for i, c in enumerate(base))
+    return str((10 - total % 10) % 10)
+
+# Calcula el dígito de control de un ISBN-10 a partir de sus 9 primeros dígitos
+def _digito_control_isbn10(base):
+    resto = (11 - sum(int(c) * (10 - i) for i, c in enumerate(base)) % 11) % 11
+    return 'X' if resto == 10 else str(resto)
+
+# Ensucia un ISBN como aparece en fuentes reales; algunas variantes dejan de ser válidas
+def _ensuciar_isbn(isbn, aleatorio):
+    variante = aleatorio.randrange(5)
+    if variante == 0:
+        return f"{isbn[:3]}-{isbn[3]}-{isbn[4:8]}-{isbn[8:12]}-{isbn[12:]}" if len(isbn) == 13 else f"{isbn[0]}-{isbn[1:5]}-{isbn[5:9]}-{isbn[9]}"
+    if variante == 1:
+        return f" {isbn[:5]} {isbn[5:]} "
+    if variante == 2:
+        return f"ISBN {isbn}"
+    if variante == 3:
+        return isbn[:-1] + str((int(isbn[-1]) + 1) % 10 if isbn[-1].isdigit() else 0) # Dígito de control erróneo
+    return isbn[:-2] # Truncado
+
+# Fecha de publicación en uno de los formatos que devuelve Google Books, a veces inválida
+def _fecha(aleatorio):
+    anio, mes, dia = aleatorio.randint(1950, 2024), aleatorio.randint(1, 12), aleatorio.randint(1, 28)
+    return aleatorio.choice([
+        f"{anio}-{mes:02d}-{dia:02d}", f"{anio}-{mes:02d}-{dia:02d}", f"{anio}", f"{anio}-{mes:02d}", f"{anio}-{mes}-{dia}",
+        f"{aleatorio.choice(MESES)} {anio}", f"{anio}-13-01", "1999-02-29", None,
+    ])
+
+# Genera de forma determinista el libro número indice del catálogo: el mismo índice y la misma semilla
+# dan siempre el mismo libro, así el servidor stub puede servir cualquier página sin tener el catálogo en memoria
+def libro_sintetico(indice, semilla=SEMILLA_DEFAULT):
+    aleatorio = random.Random(semilla * 1_000_003 + indice)
+
+    if indice and aleatorio.random() < PROPORCION_DUPLICADOS:
+        original = libro_sintetico(aleatorio.randrange(indice), semilla)
+        titulo, autor = original['titulo'], original['autor']
+        isbn13 = original['isbn13'] if aleatorio.random() < 0.5 else None
+    else:
+        titulo = ' '.join(aleatorio.choice(PALABRAS) for _ in range(aleatorio.randint(1, 5))).title()
+        autor = f"Author {aleatorio.randint(0, max(1, indice // 3))}"
+        isbn13 = None
+    if isbn13 is None and aleatorio.random() >= PROPORCION_SIN_ISBN13:
+        base = '978' + ''.join(aleatorio.choice('0123456789') for _ in range(9))
+        isbn13 = base + _digito_control_isbn13(base)
+    isbn10 = None
+    if aleatorio.random() < 0.3:
+        base = ''.join(aleatorio.choice('0123456789') for _ in range(9))
+        isbn10 = base + _digito_control_isbn10(base)
+
+    return {
+        'indice': indice,
+        'titulo': titulo,
+        'autor': autor,
+        'coautor': 'Other One' if aleatorio.random() < 0.3 else None,
+        'isbn13': isbn13,
+        'isbn10': isbn10,
+        'isbn13_sucio': _ensuciar_isbn(isbn13, aleatorio) if isbn13 and aleatorio.random() < PROPORCION_ISBN_SUCIO else isbn13,
+        'isbn10_sucio': _ensuciar_isbn(isbn10, aleatorio) if isbn10 and aleatorio.random() < PROPORCION_ISBN_SUCIO else isbn10,
+        'rating': round(aleatorio.uniform(2, 5), 2) if aleatorio.random() < 0.9 else None,
+        'conteo_ratings': aleatorio.randint(0, 10 ** 6),
+        'en_google_books': aleatorio.random() >= PROPORCION_SIN_GOOGLE_BOOKS,
+        'variante_titulo_gb': aleatorio.randrange(4), # 0-1: igual, 2: con subtítulo, 3: en minúsculas
+        'isbn13_en_google_books': aleatorio.random() < 0.8,
+        'editorial': aleatorio.choice(EDITORIALES),
+        'fecha': _fecha(aleatorio),
+        'idioma': aleatorio.choice(IDIOMAS),
+        'categorias': aleatorio.choice(CATEGORIAS),
+        'precio': aleatorio.choice([None, 9.99, 35.5, 59.0]),
+        'moneda': aleatorio.choice(MONEDAS),
+    }
+
+# Ruta relativa de la página de detalle de un libro en Goodreads
+def ruta_detalle(libro):
+    return f"/book/show/{libro['indice']}-{re.sub(r'[^a-z0-9]+', '-', libro['titulo'].lower()).strip('-')}"
+
+# Registro de Goodreads tal como lo guarda el scraper en la zona landing
+def registro_goodreads(libro, url_base="https://www.goodreads.com"):
+    return {
+        "title": libro['titulo'],
+        "author": libro['autor'],
+        "rating": libro['rating'],
+        "ratings_count": libro['conteo_ratings'] if libro['rating'] is not None else None,
+        "book_url": url_base + ruta_detalle(libro),
+        "isbn10": libro['isbn10_sucio'] if not libro['isbn13'] else None,
+        "isbn13": libro['isbn13_sucio'],
+    }
+
+# Item de la API de Google Books para un libro, o None si la API no lo encuentra
+def volumen_google_books(libro):
+    if not libro['en_google_books']:
+        return None
+    titulo = libro['titulo']
+    if libro['variante_titulo_gb'] == 2:
+        titulo += ": A Subtitle"
+    elif libro['variante_titulo_gb'] == 3:
+        titulo = titulo.lower()
+
+    identificadores = []
+    if libro['isbn13'] and libro['isbn13_en_google_books']:
+        identificadores.append({'type': 'ISBN_13', 'identifier': libro['isbn13']})
+    if libro['isbn10']:
+        identificadores.append({'type': 'ISBN_10', 'identifier': libro['isbn10']})
+    info_volumen = {
+        'title': titulo,
+        'authors': [libro['autor']] + ([libro['coautor']] if libro['coautor'] else []),
+        'categories': libro['categorias'],
+        'industryIdentifiers': identificadores,
+    }
+    for campo, clave in (('publisher', 'editorial'), ('publishedDate', 'fecha'), ('language', 'idioma')):
+        if libro[clave] is not None:
+            info_volumen[campo] = libro[clave]
+    info_venta = {'listPrice': {'amount': libro['precio'], 'currencyCode': libro['moneda']}} if libro['precio'] is not None else {}
+    return {'id': f"gb{libro['indice']}", 'volumeInfo': info_volumen, 'saleInfo': info_venta}
+
+# Página de búsqueda de Goodreads con los libros de la página indicada (empieza en 1).
+# Pasado el final del catálogo la página no tiene contenedores, como en Goodreads
+def pagina_busqueda(pagina, num_libros, semilla=SEMILLA_DEFAULT):
+    filas = []
+    for indice in range((pagina - 1) * LIBROS_POR_PAGINA, min(pagina * LIBROS_POR_PAGINA, num_libros)):
+        libro = libro_sintetico(indice, semilla)
+        texto_rating = 'no ratings yet' if libro['rating'] is None else f'{libro["rating"]:.2f} avg rating — {libro["conteo_ratings"]:,} ratings'
+        rating = f'<span class="greyText smallText uitext"><span class="minirating"><span class="stars"></span> {texto_rating}</span></span>'
+        filas.append(
+            f'<tr itemscope itemtype="http://schema.org/Book"><td width="5%"><img src="/c.jpg"></td><td>'
+            f'<a class="bookTitle" itemprop="url" href="{ruta_detalle(libro)}"><span itemprop="name" role="heading">{libro["titulo"]}</span></a>'
+            f' by <span itemprop="author"><div class="authorName__container"><a class="authorName" href="/author/{indice}">'
+            f'<span itemprop="name">{libro["autor"]}</span></a></div></span><br>{rating}</td></tr>'
+        )
+    return f"<html><head><title>Búsqueda</title></head><body><table class='tableList'>{''.join(filas)}</table></body></html>"
+
+# Página de detalle de un libro: con JSON-LD, solo con el ISBN-10 en el texto, o sin ISBN
+def pagina_detalle(libro):
+    cabecera, cuerpo = '', ''
+    if libro['isbn13']:
+        datos = {'@context': 'https://schema.org', '@type': 'Book', 'name': libro['titulo'], 'isbn': libro['isbn13_sucio']}
+        cabecera = f'<script type="application/ld+json">{json.dumps(datos, ensure_ascii=False)}</script>'
+    elif libro['isbn10']:
+        cuerpo = f"<div>ISBN: {libro['isbn10']}</div>"
+    relleno = ''.join(f'<div class="bloque-{i}"><p>Texto de relleno {i}</p></div>' for i in range(50))
+    return f"<html><head><title>{libro['titulo']}</title>{cabecera}</head><body>{relleno}{cuerpo}{relleno}</body></html>"
+
+# Escribe una zona landing sintética de num_libros libros con el formato del scraper y del enriquecedor,
+# una fila por libro y en el mismo orden. Con legado=True usa el JSON y el CSV del formato anterior
+def generar_landing(directorio, num_libros, semilla=SEMILLA_DEFAULT, legado=False):
+    os.makedirs(directorio, exist_ok=True)
+    libros_goodreads = []
+    filas_google_books = []
+    for indice in range(num_libros):
+        libro = libro_sintetico(indice, semilla)
+        libros_goodreads.append(registro_goodreads(libro))
+        volumen = volumen_google_books(libro)
+        filas_google_books.append(extraer_info_libro(volumen) if volumen else {"gb_id": None, "title": libro['titulo']})
+
+    if legado:
+        with open(os.path.join(directorio, ARCHIVO_GOODREADS_LEGADO), 'w', encoding='utf-8') as f:
+            json.dump(libros_goodreads, f, ensure_ascii=False, indent=4)
+        pd.DataFrame(filas_google_books).to_csv(os.path.join(directorio, ARCHIVO_GOOGLE_BOOKS_LEGADO), index=False, sep=';', encoding='utf-8')
+    else:
+        escribir_landing(libros_goodreads, os.path.join(directorio, ARCHIVO_GOODREADS), ESQUEMA_LANDING_GOODREADS)
+        escribir_landing(filas_google_books, os.path.join(directorio, ARCHIVO_GOOGLE_BOOKS), ESQUEMA_LANDING_GOOGLE_BOOKS,
+                         vacios_como_nulos=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Uso: python benchmarks/catalogo_sintetico.py <directorio_landing> <num_libros> [semilla]")
+        sys.exit(1)
+    generar_landing(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]) if len(sys.argv) > 3 else SEMILLA_DEFAULT)
+    print(f"Zona landing sintética de {sys.argv[2]} libros guardada en {sys.argv[1]}")
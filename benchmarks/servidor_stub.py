@@ -0,0 +1,159 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from catalogo_sintetico import SEMILLA_DEFAULT, libro_sintetico, pagina_busqueda, pagina_detalle, volumen_google_books
+
+# --- CONFIGURACIÓN ---
+LATENCIA_STUB_DEFAULT = 0.0 # Segundos de espera añadidos a cada respuesta para simular la red
+RUTA_API_GOOGLE_BOOKS = '/books/v1/volumes'
+PATRON_DETALLE = re.compile(r'^/book/show/(\d+)')
+PATRON_TITULO_AUTOR = re.compile(r'^intitle:(.*)\+inauthor:(.*)$', re.DOTALL)
+SEPARADOR_CONSULTAS = ' OR '
+MAX_RESULTADOS_DEFAULT = 10 # Como la API, si la petición no indica maxResults
+
+# Deja solo los dígitos y la X de un ISBN, como hace la API con las consultas isbn:
+def _limpiar_isbn(isbn):
+    return re.sub(r'[^0-9X]', '', isbn.upper())
+
+# Árbol de una proyección de respuesta parcial ('a,b(c,d)' → {'a': None, 'b': {'c': None, 'd': None}})
+def _parsear_campos(texto):
+    arbol, nombre, nivel, inicio = {}, '', 0, 0
+    for posicion, caracter in enumerate(texto + ','):
+        if caracter == '(':
+            if nivel == 0:
+                inicio = posicion + 1
+            nivel += 1
+        elif caracter == ')':
+            nivel -= 1
+            if nivel == 0:
+                arbol[nombre.strip()] = _parsear_campos(texto[inicio:posicion])
+                nombre = None
+        elif caracter == ',' and nivel == 0:
+            if nombre:
+                arbol[nombre.strip()] = None
+            nombre = ''
+        elif nivel == 0 and nombre is not None:
+            nombre += caracter
+    return arbol
+
+# Aplica una proyección a una respuesta: en los diccionarios solo quedan los campos pedidos, también dentro de listas
+def _proyectar(valor, arbol):
+    if arbol is None:
+        return valor
+    if isinstance(valor, list):
+        return [_proyectar(elemento, arbol) for elemento in valor]
+    if isinstance(valor, dict):
+        return {clave: _proyectar(valor[clave], subarbol) for clave, subarbol in arbol.items() if clave in valor}
+    return valor
+
+# Manejador HTTP que imita las rutas de Goodreads y de la API de Google Books que usan el scraper y el enriquecedor
+class ManejadorStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        servidor = self.server
+        if servidor.latencia:
+            time.sleep(servidor.latencia)
+        url = urlparse(self.path)
+        parametros = parse_qs(url.query)
+
+        if url.path == '/search':
+            pagina = int(parametros.get('page', ['1'])[0])
+            self._responder(pagina_busqueda(pagina, servidor.num_libros, servidor.semilla), 'text/html; charset=utf-8')
+            return
+        coincidencia = PATRON_DETALLE.match(url.path)
+        if coincidencia and int(coincidencia.group(1)) < servidor.num_libros:
+            self._responder(pagina_detalle(libro_sintetico(int(coincidencia.group(1)), servidor.semilla)), 'text/html; charset=utf-8')
+            return
+        if url.path == RUTA_API_GOOGLE_BOOKS:
+            self._responder(json.dumps(servidor.respuesta_api(parametros), ensure_ascii=False), 'application/json; charset=utf-8')
+            return
+        self.send_error(404)
+
+    def _responder(self, cuerpo, tipo):
+        datos = cuerpo.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    # Sin registro por petición: en un benchmark solo añade ruido
+    def log_message(self, formato, *argumentos):
+        pass
+
+# Servidor HTTP local que sirve un catálogo sintético de num_libros libros en un hilo aparte.
+# Se usa como gestor de contexto; url_base apunta al servidor para sustituir a Goodreads y a la API
+class ServidorStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, num_libros, semilla=SEMILLA_DEFAULT, latencia=LATENCIA_STUB_DEFAULT, puerto=0):
+        super().__init__(('127.0.0.1', puerto), ManejadorStub)
+        self.num_libros = num_libros
+        self.semilla = semilla
+        self.latencia = latencia
+        self.hilo = None
+        self.por_isbn = {}
+        self.por_titulo_autor = {}
+        # Índices de búsqueda de la API; con libros duplicados gana el primero, como el primer resultado de Google Books
+        for indice in range(num_libros):
+            libro = libro_sintetico(indice, semilla)
+            for isbn in (libro['isbn13'], libro['isbn10']):
+                if isbn:
+                    self.por_isbn.setdefault(isbn, indice)
+            self.por_titulo_autor.setdefault((libro['titulo'], libro['autor']), indice)
+
+    @property
+    def url_base(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    # Respuesta de la API a una consulta: una o varias búsquedas unidas con OR, limitada a maxResults volúmenes
+    # y recortada a la proyección de 'fields' si la petición la indica
+    def respuesta_api(self, parametros):
+        indices = []
+        for consulta in parametros.get('q', [''])[0].split(SEPARADOR_CONSULTAS):
+            indice = self.buscar(consulta)
+            if indice is not None and indice not in indices:
+                indices.append(indice)
+        volumenes = [volumen for volumen in (volumen_google_books(libro_sintetico(i, self.semilla)) for i in indices) if volumen]
+        respuesta = {'kind': 'books#volumes', 'totalItems': len(volumenes)}
+        max_resultados = int(parametros.get('maxResults', [MAX_RESULTADOS_DEFAULT])[0])
+        if volumenes:
+            respuesta['items'] = volumenes[:max_resultados]
+        if 'fields' in parametros:
+            respuesta = _proyectar(respuesta, _parsear_campos(parametros['fields'][0]))
+        return respuesta
+
+    # Índice del libro que responde a una consulta 'isbn:...' o 'intitle:...+inauthor:...', o None
+    def buscar(self, consulta):
+        if consulta.startswith('isbn:'):
+            return self.por_isbn.get(_limpiar_isbn(consulta[5:]))
+        coincidencia = PATRON_TITULO_AUTOR.match(consulta)
+        if coincidencia:
+            return self.por_titulo_autor.get((coincidencia.group(1), coincidencia.group(2)))
+        return None
+
+    def __enter__(self):
+        self.hilo = threading.Thread(target=self.serve_forever, daemon=True)
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == "__main__":
+    num_libros = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    puerto = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    with ServidorStub(num_libros, puerto=puerto) as servidor:
+        print(f"Servidor stub con {num_libros} libros en {servidor.url_base} (Ctrl+C para terminar)")
+        try:
+            servidor.hilo.join()
+        except KeyboardInterrupt:
+            pass
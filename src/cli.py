@@ -0,0 +1,84 @@
+import argparse
+import importlib
+import sys
+
+# --- CONFIGURACIÓN ---
+# Subcomandos: módulo que los implementa y descripción. El módulo se importa solo al ejecutar su subcomando,
+# así que la ayuda no carga ninguna dependencia pesada y cada paso carga únicamente las suyas
+# (p. ej. 'buscar' no importa pandas, requests ni lxml)
+SUBCOMANDOS = {
+    'extraer': ('scrape_goodreads', "Paso 1: extrae libros de Goodreads a la zona landing"),
+    'extraer-distribuido': ('scrape_distribuido', "Paso 1 con una cola de trabajo compartida entre procesos o máquinas"),
+    'enriquecer': ('enrich_googlebooks', "Paso 2: enriquece los libros con la API de Google Books"),
+    'integrar': ('integrate_pipeline', "Paso 3: integra la zona landing y genera dim_book y sus artefactos"),
+    'orquestar': ('orquestador', "Ejecuta el pipeline completo omitiendo las etapas al día"),
+    'buscar': ('indice_libros', "Busca libros en el índice de dim_book por ISBN, book_id o título"),
+}
+
+# Importa el módulo de un subcomando
+def cargar_subcomando(nombre):
+    if nombre not in SUBCOMANDOS:
+        raise ValueError(f"Subcomando desconocido: '{nombre}'. Opciones: {', '.join(SUBCOMANDOS)}.")
+    return importlib.import_module(SUBCOMANDOS[nombre][0])
+
+# Opciones de integración comunes a 'integrar' y 'orquestar'. Sin indicar, se usan los valores por defecto del módulo
+def _agregar_opciones_integracion(parser):
+    parser.add_argument('--motor', help="Motor de normalización y deduplicación: pandas o arrow")
+    parser.add_argument('--streaming', action=argparse.BooleanOptionalAction, default=None, help="Procesar la zona landing por bloques")
+    parser.add_argument('--incremental', action=argparse.BooleanOptionalAction, default=None, help="Reprocesar solo las filas cambiadas")
+    parser.add_argument('--calidad', help="Informe de calidad: exacto o muestreo")
+
+def _opciones_integracion(argumentos):
+    return {'motor': argumentos.motor, 'modo_streaming': argumentos.streaming,
+            'modo_incremental': argumentos.incremental, 'modo_calidad': argumentos.calidad}
+
+def construir_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description="Pipeline de libros: extracción, enriquecimiento, integración y búsqueda.")
+    subparsers = parser.add_subparsers(dest='subcomando', required=True)
+    ayudas = {nombre: ayuda for nombre, (_, ayuda) in SUBCOMANDOS.items()}
+
+    subparsers.add_parser('extraer', help=ayudas['extraer'])
+    distribuido = subparsers.add_parser('extraer-distribuido', help=ayudas['extraer-distribuido'])
+    distribuido.add_argument('accion', nargs='?', default='completo', help="completo, sembrar, trabajar o fusionar")
+    distribuido.add_argument('num_trabajadores', nargs='?', type=int, help="Procesos trabajadores en esta máquina")
+    distribuido.add_argument('--maquinas', type=int, help="Máquinas que trabajan sobre la misma cola. La tasa por host "
+                             "se reparte entre los trabajadores de todas ellas; sin indicarlo, cada máquina usa la tasa completa")
+    distribuido.add_argument('--reiniciar', action='store_true', help="Al sembrar, borra la cola anterior aunque "
+                             "tenga trabajo abierto o un rastreo terminado sin fusionar")
+    subparsers.add_parser('enriquecer', help=ayudas['enriquecer'])
+    integrar = subparsers.add_parser('integrar', help=ayudas['integrar'])
+    _agregar_opciones_integracion(integrar)
+    orquestar = subparsers.add_parser('orquestar', help=ayudas['orquestar'])
+    orquestar.add_argument('forzar', nargs='*', help="Etapas que se ejecutan aunque estén al día")
+    _agregar_opciones_integracion(orquestar)
+    buscar = subparsers.add_parser('buscar', help=ayudas['buscar'])
+    buscar.add_argument('consulta', nargs='+', help="ISBN, book_id o palabras del título")
+    return parser
+
+# Ejecuta un subcomando con sus argumentos ya interpretados; devuelve el código de salida
+def ejecutar(argumentos):
+    modulo = cargar_subcomando(argumentos.subcomando)
+    if argumentos.subcomando == 'extraer-distribuido':
+        modulo.main(argumentos.accion, argumentos.num_trabajadores or modulo.NUM_TRABAJADORES_DEFAULT,
+                    argumentos.maquinas or modulo.NUM_MAQUINAS_DEFAULT, argumentos.reiniciar)
+    elif argumentos.subcomando == 'integrar':
+        opciones = _opciones_integracion(argumentos)
+        modulo.main(
+            modo_streaming=modulo.MODO_STREAMING_DEFAULT if opciones['modo_streaming'] is None else opciones['modo_streaming'],
+            modo_incremental=modulo.MODO_INCREMENTAL_DEFAULT if opciones['modo_incremental'] is None else opciones['modo_incremental'],
+            motor=opciones['motor'] or modulo.MOTOR_DEFAULT,
+            modo_calidad=opciones['modo_calidad'] or modulo.MODO_CALIDAD_DEFAULT,
+        )
+    elif argumentos.subcomando == 'orquestar':
+        return 0 if modulo.main(forzar=argumentos.forzar, **_opciones_integracion(argumentos)) else 1
+    elif argumentos.subcomando == 'buscar':
+        return 0 if modulo.main(' '.join(argumentos.consulta)) else 1
+    else:
+        modulo.main()
+    return 0
+
+def main(argv=None):
+    return ejecutar(construir_parser().parse_args(argv))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,158 @@
-import requests
 import pandas as pd
 import os
-import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from utils_cache_consultas import CacheConsultas, RUTA_CACHE_DEFAULT, clave_isbn, clave_titulo_autor
+from utils_isbn import limpiar_isbn
+from utils_checkpoint import DiarioCheckpoint
+from utils_rate_limit import obtener_con_limite
+from utils_metricas import etapa, instrumentar, obtener_registro
+from utils_landing import (
+    ARCHIVO_GOODREADS, ARCHIVO_GOODREADS_LEGADO, DIRECTORIO_LANDING, ESQUEMA_LANDING_GOOGLE_BOOKS, RUTA_LANDING_GOOGLE_BOOKS,
+    EscritorLanding, buscar_archivo_landing, es_landing_parquet, leer_landing
+)
+
+# --- CONFIGURACIÓN ---
+URL_API_GOOGLE_BOOKS = "https://www.googleapis.com/books/v1/volumes"
+HILOS_ENRIQUECIMIENTO_DEFAULT = 8 # Filas enriquecidas en paralelo; 1 desactiva la concurrencia
+
+# Respuesta parcial: la API devuelve solo los campos que usa extraer_info_libro
+CAMPOS_RESPUESTA_GOOGLE_BOOKS = (
+    "totalItems,items(id,volumeInfo(title,subtitle,authors,publisher,publishedDate,language,categories,industryIdentifiers),"
+    "saleInfo(listPrice))"
+)
+# Consultas por lotes: los ISBN de varias filas se piden en una sola consulta unida con OR y cada volumen devuelto
+# se asigna a su fila por sus industryIdentifiers. Las filas sin volumen en el lote siguen la búsqueda individual
+TAMANO_LOTE_ISBN_DEFAULT = 10 # ISBN por consulta; 1 desactiva los lotes
+SEPARADOR_LOTE_ISBN = " OR "
+MAX_RESULTADOS_LOTE = 40 # Máximo de volúmenes que la API devuelve por petición
+FILAS_POR_BLOQUE_LOTES = 1_000 # Filas cuyos lotes se resuelven antes de enriquecerlas; acota la memoria de las respuestas
+
+# Diario de checkpoint: permite reanudar un enriquecimiento interrumpido sin repetir las filas ya procesadas
+RUTA_CHECKPOINT = os.path.join("landing", "googlebooks_books.checkpoint.jsonl")
+
+# Caché local de consultas: solo se pregunta a la API por libros que no se han consultado antes
+USAR_CACHE_CONSULTAS = True
+RUTA_CACHE_CONSULTAS = RUTA_CACHE_DEFAULT
+
+_cache_consultas = None
+
+# Devuelve la caché de consultas configurada, o None si está desactivada
+def obtener_cache_consultas():
+    global _cache_consultas
+    if USAR_CACHE_CONSULTAS and _cache_consultas is None:
+        _cache_consultas = CacheConsultas(RUTA_CACHE_CONSULTAS)
+    return _cache_consultas if USAR_CACHE_CONSULTAS else None
+
+# Crea una sesión HTTP con un pool de conexiones keep-alive del tamaño indicado
+def crear_sesion(tamano_pool):
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool)
+    sesion.mount('https://', adaptador)
+    sesion.mount('http://', adaptador)
+    return sesion
+
 # Carga la clave de la API de Google Books
 def cargar_clave_api():
     load_dotenv()
     api_key = os.getenv("GOOGLE_BOOKS_API_KEY")
     return api_key
 
-# Busca en la API de Google Books un libro por ISBN, o título y autor, con reintentos
-def buscar_en_google_books(api_key, isbn=None, titulo=None, autor=None, reintentos=3, factor_backoff=0.5):
-    url_base = "https://www.googleapis.com/books/v1/volumes"
+# Lanza una consulta a la API de Google Books con la proyección de campos, con reintentos y limitación de tasa por host
+def consultar_api(api_key, consulta, max_resultados=1, reintentos=3, factor_backoff=0.5, sesion=None):
+    params = {
+        "q": consulta, "key": api_key, "langRestrict": "es,en",
+        "fields": CAMPOS_RESPUESTA_GOOGLE_BOOKS, "maxResults": max_resultados
+    }
+    respuesta = obtener_con_limite(
+        URL_API_GOOGLE_BOOKS, reintentos=reintentos, factor_backoff=factor_backoff, sesion=sesion,
+        descripcion=f"la consulta '{consulta}'", params=params, timeout=10
+    )
+    if respuesta is None:
+        return None
+    return respuesta.json()
+
+# Busca en la API de Google Books un libro por ISBN, o título y autor. Solo se usa el primer resultado,
+# así que se pide uno. Si la búsqueda ya se resolvió en un lote (precargadas), no se repite
+def buscar_en_google_books(api_key, isbn=None, titulo=None, autor=None, reintentos=3, factor_backoff=0.5, sesion=None, precargadas=None):
     consulta = ""
     
     if isbn:
         consulta = f"isbn:{isbn}"
+        clave = clave_isbn(isbn)
     elif titulo and autor:
         consulta = f"intitle:{titulo}+inauthor:{autor}"
+        clave = clave_titulo_autor(titulo, autor)
     else:
         return None
 
-    params = {"q": consulta, "key": api_key, "langRestrict": "es,en"}
-    
-    for i in range(reintentos):
-        try:
-            respuesta = requests.get(url_base, params=params, timeout=10)
-            respuesta.raise_for_status()
-            return respuesta.json()
-        except requests.exceptions.RequestException as e:
-            print(f"La solicitud a la API falló para la consulta '{consulta}': {e}. Reintentando en {factor_backoff * (2 ** i)} segundos...")
-            time.sleep(factor_backoff * (2 ** i))
-    
-    print(f"No se pudieron obtener datos para la consulta '{consulta}' después de {reintentos} reintentos.")
-    return None
+    if precargadas and clave in precargadas:
+        return precargadas[clave]
+
+    cache = obtener_cache_consultas()
+    if cache is not None:
+        en_cache, resultado = cache.buscar(clave)
+        obtener_registro().contar('cache_consultas_aciertos' if en_cache else 'cache_consultas_fallos')
+        if en_cache:
+            return resultado
+
+    resultado = consultar_api(api_key, consulta, reintentos=reintentos, factor_backoff=factor_backoff, sesion=sesion)
+    if resultado is not None and cache is not None:
+        cache.guardar(clave, resultado)
+    return resultado
+
+# Busca varios ISBN (ya limpios) en una sola consulta. Cada volumen devuelto se asigna a los ISBN del lote que
+# aparecen en sus industryIdentifiers, y gana el primero, como en la búsqueda individual. Devuelve
+# {clave_isbn: respuesta} solo para los ISBN asignados: un ISBN sin volumen en el lote no es un "no encontrado"
+def buscar_lote_isbn(api_key, isbns, reintentos=3, factor_backoff=0.5, sesion=None):
+    resultado = consultar_api(
+        api_key, SEPARADOR_LOTE_ISBN.join(f"isbn:{isbn}" for isbn in isbns), max_resultados=MAX_RESULTADOS_LOTE,
+        reintentos=reintentos, factor_backoff=factor_backoff, sesion=sesion
+    )
+    pendientes = {clave_isbn(isbn) for isbn in isbns}
+    encontradas = {}
+    for item in (resultado or {}).get('items', []):
+        for identificador in item.get('volumeInfo', {}).get('industryIdentifiers', []):
+            clave = clave_isbn(identificador.get('identifier'))
+            if clave in pendientes and clave not in encontradas:
+                encontradas[clave] = {"totalItems": 1, "items": [item]}
+
+    cache = obtener_cache_consultas()
+    if cache is not None:
+        for clave, respuesta in encontradas.items():
+            cache.guardar(clave, respuesta)
+    return encontradas
+
+# Resuelve en lotes el primer ISBN de la cadena de búsqueda de cada fila (ISBN-13 o, si falta, ISBN-10),
+# salvo los que ya están en la caché. mapear reparte los lotes (map o el map de un pool de hilos)
+def precargar_lotes_isbn(api_key, filas, tamano_lote=TAMANO_LOTE_ISBN_DEFAULT, sesion=None, mapear=map):
+    if tamano_lote <= 1:
+        return {}
+    cache = obtener_cache_consultas()
+    isbns = {}
+    for fila in filas:
+        isbn = next((fila.get(campo) for campo in ('isbn13', 'isbn10') if fila.get(campo) and pd.notna(fila[campo])), None)
+        limpio = limpiar_isbn(str(isbn)) if isbn is not None else None
+        clave = clave_isbn(limpio) if limpio else None
+        if clave is None or clave in isbns or (cache is not None and cache.buscar(clave)[0]):
+            continue
+        isbns[clave] = limpio
+
+    pendientes = list(isbns.values())
+    lotes = [pendientes[i:i + tamano_lote] for i in range(0, len(pendientes), tamano_lote)]
+    # Un lote de un solo ISBN no ahorra nada: lo resuelve la búsqueda individual
+    lotes = [lote for lote in lotes if len(lote) > 1]
+    precargadas = {}
+    for encontradas in mapear(lambda lote: buscar_lote_isbn(api_key, lote, sesion=sesion), lotes):
+        precargadas.update(encontradas)
+    registro = obtener_registro()
+    registro.contar('google_books_lotes', len(lotes))
+    registro.contar('google_books_isbn_resueltos_en_lote', len(precargadas))
+    return precargadas
 
 # Extrae la información deseada del libro de un item de la API de Google Books
 def extraer_info_libro(item):
@@ -63,62 +181,123 @@ def extraer_info_libro(item):
         "price_currency": info_venta.get('listPrice', {}).get('currencyCode'),
     }
 
-# Enriquece los libros del dataframe de Goodreads con datos de Google Books
-def enriquecer_libros(api_key, df_goodreads):
-    datos_enriquecidos = []
+# Enriquece un libro de Goodreads siguiendo la cadena ISBN-13 → ISBN-10 → título y autor
+def enriquecer_fila(api_key, fila, sesion=None, precargadas=None):
+    print(f"Enriqueciendo: {fila['title']}")
+    resultado = None
     
-    for _, fila in df_goodreads.iterrows():
-        print(f"Enriqueciendo: {fila['title']}")
-        resultado = None
-        
-        # Prioriza ISBN-13, luego ISBN-10
-        if fila.get('isbn13') and pd.notna(fila['isbn13']):
-            resultado = buscar_en_google_books(api_key, isbn=fila['isbn13'])
-            time.sleep(0.5)
+    # Prioriza ISBN-13, luego ISBN-10
+    if fila.get('isbn13') and pd.notna(fila['isbn13']):
+        resultado = buscar_en_google_books(api_key, isbn=fila['isbn13'], sesion=sesion, precargadas=precargadas)
+    
+    if not resultado or resultado.get('totalItems', 0) == 0:
+        if fila.get('isbn10') and pd.notna(fila['isbn10']):
+            resultado = buscar_en_google_books(api_key, isbn=fila['isbn10'], sesion=sesion, precargadas=precargadas)
+
+    # Fallback a título y autor
+    if not resultado or resultado.get('totalItems', 0) == 0:
+        resultado = buscar_en_google_books(api_key, titulo=fila['title'], autor=fila['author'], sesion=sesion)
         
-        if not resultado or resultado.get('totalItems', 0) == 0:
-            if fila.get('isbn10') and pd.notna(fila['isbn10']):
-                resultado = buscar_en_google_books(api_key, isbn=fila['isbn10'])
-                time.sleep(0.5)
-
-        # Fallback a título y autor
-        if not resultado or resultado.get('totalItems', 0) == 0:
-            resultado = buscar_en_google_books(api_key, titulo=fila['title'], autor=fila['author'])
-            time.sleep(0.5)
-            
-        if resultado and resultado.get('totalItems', 0) > 0:
-            # Toma el primer resultado, que generalmente es el más relevante
-            info_libro = extraer_info_libro(resultado['items'][0])
-            datos_enriquecidos.append(info_libro)
+    if resultado and resultado.get('totalItems', 0) > 0:
+        # Toma el primer resultado, que generalmente es el más relevante
+        return extraer_info_libro(resultado['items'][0])
+
+    print(f"  -> No se pudo encontrar '{fila['title']}' en Google Books.")
+    return { "gb_id": None, "title": fila['title'] }
+
+# Clave de checkpoint de una fila: su posición y su URL (o título), para no mezclar entradas distintas
+def clave_checkpoint(posicion, fila):
+    return f"{posicion}|{fila.get('book_url') or fila.get('title')}"
+
+# Enriquece los libros del dataframe de Goodreads con datos de Google Books.
+# Las filas se reparten entre un pool de hilos que comparte una sesión keep-alive; el orden de salida se conserva.
+# Se avanza por bloques de FILAS_POR_BLOQUE_LOTES filas: primero se resuelven los lotes de ISBN del bloque y
+# después se enriquecen sus filas, que solo consultan la API por lo que el lote no resolvió.
+# Si se pasa un diario, las filas ya completadas se reutilizan y cada fila nueva se registra al terminar.
+# Si se pasa un escritor de la zona landing, cada fila se escribe en cuanto ella y las anteriores están completas
+def enriquecer_libros(api_key, df_goodreads, max_hilos=HILOS_ENRIQUECIMIENTO_DEFAULT, diario=None, escritor=None,
+                      tamano_lote_isbn=TAMANO_LOTE_ISBN_DEFAULT):
+    filas = df_goodreads.to_dict('records')
+    sesion = crear_sesion(max(1, max_hilos))
+
+    def procesar(posicion_y_fila, precargadas):
+        posicion, fila = posicion_y_fila
+        clave = clave_checkpoint(posicion, fila)
+        if diario is not None and diario.contiene(clave):
+            return diario.obtener(clave)
+        info_libro = enriquecer_fila(api_key, fila, sesion, precargadas)
+        if diario is not None:
+            diario.registrar(clave, info_libro)
+        return info_libro
+
+    def enriquecer_por_bloques(mapear):
+        for inicio in range(0, len(filas), FILAS_POR_BLOQUE_LOTES):
+            bloque = list(enumerate(filas[inicio:inicio + FILAS_POR_BLOQUE_LOTES], start=inicio))
+            pendientes = [fila for posicion, fila in bloque if diario is None or not diario.contiene(clave_checkpoint(posicion, fila))]
+            precargadas = precargar_lotes_isbn(api_key, pendientes, tamano_lote_isbn, sesion, mapear)
+            yield from mapear(partial(procesar, precargadas=precargadas), bloque)
+
+    with sesion:
+        if max_hilos <= 1:
+            datos_enriquecidos = _recoger(enriquecer_por_bloques(map), escritor)
         else:
-            print(f"  -> No se pudo encontrar '{fila['title']}' en Google Books.")
-            datos_enriquecidos.append({ "gb_id": None, "title": fila['title'] })
+            # El número de hilos acota las peticiones en vuelo; map devuelve los resultados en el orden de entrada
+            with ThreadPoolExecutor(max_workers=max_hilos) as executor:
+                datos_enriquecidos = _recoger(enriquecer_por_bloques(executor.map), escritor)
 
     return pd.DataFrame(datos_enriquecidos)
 
-# Función principal para ejecutar el proceso de enriquecimiento
-def main():
+# Recoge los resultados en orden y, si hay escritor, los va escribiendo en la zona landing
+def _recoger(resultados, escritor):
+    datos = []
+    for info_libro in resultados:
+        if escritor is not None:
+            escritor.escribir(info_libro)
+        datos.append(info_libro)
+    return datos
+
+# Elimina de la caché de consultas las respuestas caducadas
+def purgar_cache_consultas():
+    cache = obtener_cache_consultas()
+    if cache is not None:
+        cache.purgar_caducadas()
+
+# Función principal para ejecutar el proceso de enriquecimiento. El orquestador purga la caché en una etapa aparte
+@instrumentar('enrich_googlebooks')
+def main(purgar_cache=True):
     api_key = cargar_clave_api()
     if not api_key:
         print("Error: No se encontró la clave de la API de Google Books. Por favor, cree un archivo '.env' con la variable GOOGLE_BOOKS_API_KEY.")
         return
 
-    directorio_landing = "landing"
-    archivo_goodreads = os.path.join(directorio_landing, "goodreads_books.json")
-    archivo_googlebooks = os.path.join(directorio_landing, "googlebooks_books.csv")
-
-    if not os.path.exists(archivo_goodreads):
-        print(f"Error: Archivo de entrada no encontrado en '{archivo_goodreads}'. Por favor, ejecute primero el scraper de Goodreads.")
+    # Acepta también el JSON del formato anterior de la zona landing
+    archivo_goodreads = buscar_archivo_landing(DIRECTORIO_LANDING, ARCHIVO_GOODREADS, ARCHIVO_GOODREADS_LEGADO)
+    if archivo_goodreads is None:
+        print(f"Error: Archivo de entrada no encontrado en '{os.path.join(DIRECTORIO_LANDING, ARCHIVO_GOODREADS)}'. Por favor, ejecute primero el scraper de Goodreads.")
         return
 
-    df_goodreads = pd.read_json(archivo_goodreads)
+    with etapa('cargar_goodreads') as medicion:
+        if es_landing_parquet(archivo_goodreads):
+            df_goodreads = leer_landing(archivo_goodreads)
+        else:
+            df_goodreads = pd.read_json(archivo_goodreads)
+        medicion['filas'] = len(df_goodreads)
     
     print("Iniciando proceso de enriquecimiento con la API de Google Books...")
-    df_enriquecido = enriquecer_libros(api_key, df_goodreads)
+    diario = DiarioCheckpoint(RUTA_CHECKPOINT)
+    # Las filas se escriben a medida que se enriquecen. Las cadenas vacías se guardan como nulos, como las leía el CSV anterior
+    with etapa('enriquecer_libros', filas=len(df_goodreads)), \
+            EscritorLanding(RUTA_LANDING_GOOGLE_BOOKS, ESQUEMA_LANDING_GOOGLE_BOOKS, vacios_como_nulos=True) as escritor:
+        df_enriquecido = enriquecer_libros(api_key, df_goodreads, diario=diario, escritor=escritor)
+
+    if purgar_cache:
+        with etapa('purgar_cache'):
+            purgar_cache_consultas()
     
     if not df_enriquecido.empty:
-        df_enriquecido.to_csv(archivo_googlebooks, index=False, sep=';', encoding='utf-8')
-        print(f"Enriquecimiento completo. Datos guardados en '{archivo_googlebooks}'.")
+        print(f"Enriquecimiento completo. Datos guardados en '{RUTA_LANDING_GOOGLE_BOOKS}'.")
+        # La salida final ya está en disco: el diario deja de hacer falta
+        diario.eliminar()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,286 @@
+import bisect
+import hashlib
+import os
+import re
+import shutil
+import sys
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from utils_isbn import limpiar_isbn
+
+# --- CONFIGURACIÓN ---
+RUTA_INDICE_LIBROS = os.path.join('standard', 'dim_book_indice')
+CAMPOS_HASH = ('book_id', 'isbn10', 'isbn13') # Campos con índice hash para búsquedas exactas
+CAMPOS_TOKENS = ('titulo_normalizado', 'autor_principal') # Campos con índice de palabras para búsquedas por prefijo
+LIMITE_RESULTADOS_DEFAULT = 20
+MAX_FILAS_CONVERSION_DIRECTA = 6 # Hasta este número de filas se convierten sin take() (ver IndiceLibros.obtener_filas)
+ARCHIVO_FILAS = 'filas.arrow'
+
+# Normalización de las palabras de cada campo de texto; las consultas pasan por la misma.
+# El título repite la de titulo_normalizado (minúsculas y solo [a-z0-9]), así 'Análisis' busca 'anlisis' como se indexó
+REGEX_NO_TITULO = re.compile(r'[^a-z0-9\s]')
+REGEX_PALABRA = re.compile(r'\w+')
+
+def _palabras_titulo(texto):
+    return REGEX_NO_TITULO.sub('', texto.lower()).split()
+
+def _palabras_autor(texto):
+    return REGEX_PALABRA.findall(texto.lower())
+
+PALABRAS_POR_CAMPO = {'titulo_normalizado': _palabras_titulo, 'autor_principal': _palabras_autor}
+
+# Hash de 64 bits estable entre procesos (el hash() de Python cambia en cada ejecución)
+def hash_clave(clave):
+    return int.from_bytes(hashlib.blake2b(clave.encode('utf-8'), digest_size=8).digest(), 'little')
+
+# Normaliza la clave de una búsqueda exacta: los ISBN se comparan sin guiones ni espacios
+def _normalizar_clave(campo, clave):
+    if clave is None:
+        return None
+    clave = str(clave)
+    return limpiar_isbn(clave) if campo in ('isbn10', 'isbn13') else clave
+
+# --- CONSTRUCCIÓN ---
+
+# Índice hash de una columna: pares (hash, fila) ordenados, para buscar con una búsqueda binaria
+def _indice_hash(columna):
+    valores = columna.to_pylist()
+    filas = np.fromiter((i for i, valor in enumerate(valores) if valor is not None), dtype=np.int64)
+    hashes = np.fromiter((hash_clave(valores[i]) for i in filas), dtype=np.uint64, count=len(filas))
+    orden = np.lexsort((filas, hashes))
+    return pa.table({'hash': hashes[orden], 'fila': filas[orden]})
+
+# Índice invertido de palabras de una columna: una fila por palabra distinta, en orden, con la lista ordenada
+# de las filas que la contienen. Cada valor distinto se trocea una sola vez y sus palabras se reparten
+# después entre sus filas
+def _indice_palabras(columna, palabras_de):
+    codificada = pc.dictionary_encode(columna).combine_chunks()
+    palabras_por_valor = [palabras_de(valor) for valor in codificada.dictionary.to_pylist()]
+    longitudes = np.array([len(palabras) for palabras in palabras_por_valor], dtype=np.int64)
+    inicios = np.concatenate([[0], np.cumsum(longitudes)[:-1]]) if len(longitudes) else longitudes
+    palabras = pa.array([palabra for lista in palabras_por_valor for palabra in lista], type=pa.string())
+
+    filas = np.flatnonzero(codificada.is_valid().to_numpy(zero_copy_only=False))
+    codigos = codificada.indices.to_numpy(zero_copy_only=False)[filas]
+    repeticiones = longitudes[codigos]
+    total = int(repeticiones.sum())
+    # Posición en 'palabras' de cada par: el inicio de su valor más el desplazamiento dentro de él
+    desplazamiento = np.arange(total) - np.repeat(np.cumsum(repeticiones) - repeticiones, repeticiones)
+    posiciones = np.repeat(inicios[codigos], repeticiones) + desplazamiento
+
+    pares = pa.table({'palabra': palabras.take(pa.array(posiciones, type=pa.int64())), 'fila': np.repeat(filas, repeticiones)})
+    pares = pares.group_by(['palabra', 'fila']).aggregate([]).sort_by([('palabra', 'ascending'), ('fila', 'ascending')])
+    palabras_pares = pares.column('palabra').combine_chunks()
+    if not len(palabras_pares):
+        return pa.table({'palabra': pa.array([], type=pa.string()), 'filas': pa.array([], type=pa.list_(pa.int64()))})
+    cambios = np.flatnonzero(pc.not_equal(palabras_pares[1:], palabras_pares[:-1]).to_numpy(zero_copy_only=False)) + 1
+    primeras = np.concatenate([[0], cambios])
+    return pa.table({
+        'palabra': palabras_pares.take(pa.array(primeras, type=pa.int64())),
+        'filas': pa.ListArray.from_arrays(np.append(primeras, len(palabras_pares)), pares.column('fila').combine_chunks()),
+    })
+
+def _escribir_arrow(tabla, ruta):
+    with pa.OSFile(ruta, 'wb') as archivo, pa.ipc.new_file(archivo, tabla.schema) as escritor:
+        escritor.write_table(tabla.combine_chunks())
+
+# Construye el índice de búsqueda de dim_book: las filas ordenadas por book_id y un archivo Arrow IPC por índice.
+# Arrow IPC sin comprimir se puede abrir con memory map sin copiar nada. El directorio se sustituye entero al final
+def construir_indice(ruta_dim_book, ruta_indice=RUTA_INDICE_LIBROS):
+    # utils_parquet carga pyarrow.dataset, que a su vez carga pandas: solo se importa al construir, no al consultar
+    from utils_parquet import leer_tabla
+    tabla = leer_tabla(ruta_dim_book).sort_by('book_id')
+    ruta_temporal = ruta_indice + '.tmp'
+    if os.path.isdir(ruta_temporal):
+        shutil.rmtree(ruta_temporal)
+    os.makedirs(ruta_temporal)
+
+    _escribir_arrow(tabla, os.path.join(ruta_temporal, ARCHIVO_FILAS))
+    for campo in CAMPOS_HASH:
+        _escribir_arrow(_indice_hash(tabla.column(campo)), os.path.join(ruta_temporal, f'hash_{campo}.arrow'))
+    for campo in CAMPOS_TOKENS:
+        _escribir_arrow(_indice_palabras(tabla.column(campo), PALABRAS_POR_CAMPO[campo]), os.path.join(ruta_temporal, f'palabras_{campo}.arrow'))
+
+    ruta_anterior = ruta_indice + '.anterior'
+    if os.path.isdir(ruta_anterior):
+        shutil.rmtree(ruta_anterior)
+    if os.path.isdir(ruta_indice):
+        os.replace(ruta_indice, ruta_anterior)
+    os.replace(ruta_temporal, ruta_indice)
+    if os.path.isdir(ruta_anterior):
+        shutil.rmtree(ruta_anterior)
+    return tabla.num_rows
+
+# --- CONSULTA ---
+
+# Vista numpy sin copia del búfer de valores de un array Arrow de enteros sin nulos. Array.to_numpy() y pa.array()
+# importan pandas en pyarrow, y eso multiplica el tiempo de arranque de una búsqueda desde la línea de comandos
+def _vista_numpy(array, tipo):
+    if not len(array):
+        return np.empty(0, dtype=tipo)
+    return np.frombuffer(array.buffers()[1], dtype=tipo, count=len(array), offset=array.offset * np.dtype(tipo).itemsize)
+
+# Array Arrow int64 de posiciones construido sobre un búfer numpy, sin pasar por pa.array() (ver _vista_numpy)
+def _array_posiciones(posiciones):
+    valores = np.asarray(posiciones, dtype=np.int64)
+    return pa.Array.from_buffers(pa.int64(), len(valores), [None, pa.py_buffer(valores)])
+
+# Índice de búsqueda sobre dim_book construido por construir_indice. Los archivos se abren con memory map
+# la primera vez que se usan, así que cargarlo no lee nada y una búsqueda solo toca las páginas que necesita.
+# Las búsquedas devuelven filas de dim_book como diccionarios
+class IndiceLibros:
+    def __init__(self, ruta_indice=RUTA_INDICE_LIBROS):
+        if not os.path.isdir(ruta_indice):
+            raise FileNotFoundError(f"Índice de búsqueda no encontrado en '{ruta_indice}'. Ejecute primero el pipeline de integración.")
+        self.ruta_indice = ruta_indice
+        self._lotes = {}
+        self._columnas = None
+        self._hashes = {}
+        self._palabras = {}
+
+    # Cada archivo del índice es un único lote de registros; se abre con memory map la primera vez que se pide
+    def _lote(self, archivo):
+        if archivo not in self._lotes:
+            lector = pa.ipc.open_file(pa.memory_map(os.path.join(self.ruta_indice, archivo)))
+            self._lotes[archivo] = lector.get_batch(0) if lector.num_record_batches else \
+                pa.RecordBatch.from_pylist([], schema=lector.schema)
+        return self._lotes[archivo]
+
+    @property
+    def filas(self):
+        return self._lote(ARCHIVO_FILAS)
+
+    def __len__(self):
+        return self.filas.num_rows
+
+    # Columnas de dim_book por nombre. Pedirlas al lote crea objetos nuevos en cada llamada, así que se guardan
+    @property
+    def columnas(self):
+        if self._columnas is None:
+            self._columnas = dict(zip(self.filas.schema.names, self.filas.columns))
+        return self._columnas
+
+    # Arrays numpy (sin copia) de hashes y filas del índice de un campo
+    def _indice_hash(self, campo):
+        if campo not in self._hashes:
+            if campo not in CAMPOS_HASH:
+                raise ValueError(f"Campo sin índice hash: '{campo}'. Opciones: {', '.join(CAMPOS_HASH)}.")
+            lote = self._lote(f'hash_{campo}.arrow')
+            self._hashes[campo] = (_vista_numpy(lote.column('hash'), np.uint64), _vista_numpy(lote.column('fila'), np.int64))
+        return self._hashes[campo]
+
+    # Vocabulario (como lista de str, para buscar con bisect) y listas de filas de cada palabra como arrays numpy
+    # de desplazamientos y valores. El vocabulario es lo único que se copia a memoria, y solo tiene las palabras distintas
+    def _indice_palabras(self, campo):
+        if campo not in self._palabras:
+            if campo not in CAMPOS_TOKENS:
+                raise ValueError(f"Campo sin índice de palabras: '{campo}'. Opciones: {', '.join(CAMPOS_TOKENS)}.")
+            lote = self._lote(f'palabras_{campo}.arrow')
+            listas = lote.column('filas')
+            self._palabras[campo] = (
+                lote.column('palabra').to_pylist(), _vista_numpy(listas.offsets, np.int32), _vista_numpy(listas.values, np.int64)
+            )
+        return self._palabras[campo]
+
+    # Filas de dim_book en las posiciones indicadas, como lista de diccionarios. take() tiene un coste fijo
+    # de unas decenas de microsegundos; para pocas filas sale más barato convertirlas valor a valor
+    def obtener_filas(self, posiciones):
+        if len(posiciones) <= MAX_FILAS_CONVERSION_DIRECTA:
+            return [{nombre: columna[posicion].as_py() for nombre, columna in self.columnas.items()} for posicion in posiciones]
+        return self.filas.take(_array_posiciones(posiciones)).to_pylist()
+
+    # Posiciones de las filas cuyo campo es exactamente la clave. El hash solo acota los candidatos;
+    # cada uno se comprueba contra el valor real, así que una colisión no devuelve filas ajenas
+    def posiciones_por_clave(self, campo, clave):
+        clave = _normalizar_clave(campo, clave)
+        if not clave:
+            return []
+        hashes, filas = self._indice_hash(campo)
+        valor_hash = np.uint64(hash_clave(clave))
+        inicio, fin = hashes.searchsorted(valor_hash, 'left'), hashes.searchsorted(valor_hash, 'right')
+        columna = self.columnas[campo]
+        return [int(fila) for fila in filas[inicio:fin] if columna[int(fila)].as_py() == clave]
+
+    # Búsqueda exacta por un campo con índice hash: book_id, isbn10 o isbn13
+    def buscar(self, campo, clave):
+        return self.obtener_filas(self.posiciones_por_clave(campo, clave))
+
+    def buscar_book_id(self, book_id):
+        filas = self.buscar('book_id', book_id)
+        return filas[0] if filas else None
+
+    # Busca un ISBN en su índice según su longitud una vez limpio (10 o 13 caracteres)
+    def buscar_isbn(self, isbn):
+        limpio = _normalizar_clave('isbn13', isbn)
+        if not limpio or len(limpio) not in (10, 13):
+            return []
+        return self.buscar('isbn13' if len(limpio) == 13 else 'isbn10', limpio)
+
+    # Búsqueda exacta de muchas claves a la vez: los hashes se buscan con una sola búsqueda binaria vectorizada.
+    # Devuelve {clave: [filas]} con una entrada por clave pedida (lista vacía si no se encuentra)
+    def buscar_lote(self, campo, claves):
+        hashes, filas = self._indice_hash(campo)
+        normalizadas = [_normalizar_clave(campo, clave) for clave in claves]
+        valores_hash = np.fromiter((hash_clave(clave) if clave else 0 for clave in normalizadas), dtype=np.uint64, count=len(normalizadas))
+        inicios, fines = hashes.searchsorted(valores_hash, 'left'), hashes.searchsorted(valores_hash, 'right')
+
+        columna = self.columnas[campo]
+        posiciones_por_clave = []
+        for clave, inicio, fin in zip(normalizadas, inicios, fines):
+            candidatos = [int(fila) for fila in filas[inicio:fin]] if clave else []
+            posiciones_por_clave.append([fila for fila in candidatos if columna[fila].as_py() == clave])
+
+        todas = sorted({fila for posiciones in posiciones_por_clave for fila in posiciones})
+        por_posicion = dict(zip(todas, self.obtener_filas(todas)))
+        return {clave: [por_posicion[fila] for fila in posiciones] for clave, posiciones in zip(claves, posiciones_por_clave)}
+
+    # Filas con alguna palabra del campo que empieza por el prefijo (o que es igual a él, con exacta=True).
+    # Las palabras de un prefijo son un tramo contiguo del vocabulario, y sus listas de filas también lo son
+    def _filas_con_palabra(self, campo, palabra, exacta):
+        vocabulario, desplazamientos, filas = self._indice_palabras(campo)
+        inicio = bisect.bisect_left(vocabulario, palabra)
+        fin = bisect.bisect_right(vocabulario, palabra, inicio) if exacta else bisect.bisect_left(vocabulario, palabra + chr(sys.maxunicode), inicio)
+        seleccion = filas[desplazamientos[inicio]:desplazamientos[fin]]
+        return seleccion if fin - inicio <= 1 else np.unique(seleccion)
+
+    # Posiciones de las filas que contienen todas las palabras del texto; la última puede estar incompleta
+    # (búsqueda mientras se escribe), así que se busca como prefijo
+    def posiciones_por_texto(self, campo, texto, limite=LIMITE_RESULTADOS_DEFAULT):
+        if campo not in PALABRAS_POR_CAMPO:
+            raise ValueError(f"Campo sin índice de palabras: '{campo}'. Opciones: {', '.join(CAMPOS_TOKENS)}.")
+        palabras = PALABRAS_POR_CAMPO[campo](texto or '')
+        if not palabras:
+            return []
+        conjuntos = [self._filas_con_palabra(campo, palabra, exacta=True) for palabra in dict.fromkeys(palabras[:-1])]
+        conjuntos.append(self._filas_con_palabra(campo, palabras[-1], exacta=False))
+        conjuntos.sort(key=len)
+        resultado = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            if not len(resultado):
+                break
+            resultado = np.intersect1d(resultado, conjunto, assume_unique=True)
+        return [int(fila) for fila in resultado[:limite]]
+
+    def buscar_titulo(self, texto, limite=LIMITE_RESULTADOS_DEFAULT):
+        return self.obtener_filas(self.posiciones_por_texto('titulo_normalizado', texto, limite))
+
+    def buscar_autor(self, texto, limite=LIMITE_RESULTADOS_DEFAULT):
+        return self.obtener_filas(self.posiciones_por_texto('autor_principal', texto, limite))
+
+# Busca un libro por ISBN, por book_id o, si no es ninguno de los dos, por las palabras del título, e imprime los resultados
+def main(consulta, ruta_indice=RUTA_INDICE_LIBROS):
+    indice = IndiceLibros(ruta_indice)
+    resultados = indice.buscar_isbn(consulta) or indice.buscar('book_id', consulta) or indice.buscar_titulo(consulta)
+    for fila in resultados:
+        print(f"{fila['book_id']}  {fila['titulo']} — {fila['autor_principal']} ({fila['anio_publicacion']})")
+    print(f"{len(resultados)} resultados.")
+    return resultados
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python src/indice_libros.py <isbn, book_id o texto del título>")
+        sys.exit(1)
+    main(' '.join(sys.argv[1:]))
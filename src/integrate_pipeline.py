@@ -2,26 +2,141 @@ import pandas as pd
 import numpy as np
 import os
 import json
-import hashlib
+import shutil
 from datetime import datetime, timezone
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 # Importar funciones de los módulos de utilidades
-from utils_isbn import formatear_isbn10, formatear_isbn13
+from utils_isbn import formatear_isbn10_lote, formatear_isbn13_lote
+from utils_matching import emparejar_fuentes, emparejar_con_indice, indexar_google_books, COLUMNAS_INDICE_GB
+from utils_book_id import crear_ids_hash_lote
+from motor_arrow import (
+    normalizar_y_verificar_calidad_arrow, generar_book_id_arrow, deduplicar_y_seleccionar_ganador_arrow,
+    agregar_columnas, seleccionar_columnas
+)
 from utils_quality import (
-    validar_fecha, validar_codigo_idioma, validar_codigo_moneda,
-    limpiar_string, generar_reporte_calidad
+    validar_fecha_lote, validar_codigo_idioma_lote, validar_codigo_moneda_lote,
+    limpiar_string, generar_reporte_calidad, AcumuladorCalidad, hash_filas, MODO_CALIDAD_DEFAULT
+)
+from utils_streaming import (
+    leer_json_por_bloques, leer_csv_por_bloques, escribir_parte, unificar_esquemas, concatenar_tablas
+)
+from utils_parquet import (
+    ESQUEMA_DIM_BOOK, COLUMNA_PARTICION_DIM_BOOK, COLUMNAS_DICCIONARIO_DETALLE_FUENTE,
+    convertir_a_esquema, compactar_tabla, esquema_compacto, escribir_tabla, escribir_tabla_desde_partes, leer_tabla
 )
+from utils_metricas import etapa, instrumentar
+from utils_landing import (
+    ARCHIVO_GOODREADS, ARCHIVO_GOOGLE_BOOKS, ARCHIVO_GOODREADS_LEGADO, ARCHIVO_GOOGLE_BOOKS_LEGADO, ESQUEMA_LANDING_GOOGLE_BOOKS,
+    buscar_archivo_landing, es_landing_parquet, leer_landing, leer_landing_por_bloques
+)
+from indice_libros import RUTA_INDICE_LIBROS, construir_indice
+
+# --- CONFIGURACIÓN ---
+# Los ISBN se leen siempre como texto: si pandas los infiere como números se pierden los ceros iniciales,
+# y en modo streaming el tipo dependería de los valores de cada bloque
+TIPOS_LANDING_GOODREADS = {'isbn10': str, 'isbn13': str}
+TIPOS_LANDING_GOOGLE_BOOKS = {'isbn10': str, 'isbn13': str}
+
+# Motor de normalización, generación de book_id y deduplicación: 'pandas' (referencia) o 'arrow' (motor_arrow.py).
+# Ambos producen los mismos archivos; el modo streaming usa siempre el motor pandas
+MOTOR_DEFAULT = 'pandas'
+MOTORES = ('pandas', 'arrow')
+
+# Modo streaming: procesa la zona landing por bloques de tamaño fijo con memoria acotada por el tamaño del bloque
+MODO_STREAMING_DEFAULT = False
+TAMANO_CHUNK_DEFAULT = 50_000
+DIRECTORIO_TRABAJO_STREAMING = os.path.join('standard', '_trabajo')
+FILAS_GRUPO_GOOGLE_BOOKS = 8192 # Grupos de filas de la copia de trabajo de Google Books: acotan lo que se lee por libro emparejado
+NUM_PARTICIONES_DEDUP = 64 # Particiones por nivel al repartir los registros por book_id para deduplicar
+MAX_NIVELES_PARTICION = 3 # Una partición mayor que un bloque se vuelve a repartir, como mucho este número de veces
+
+# Modo incremental: solo se reprocesan las filas de la zona landing nuevas o modificadas y los book_id afectados
+MODO_INCREMENTAL_DEFAULT = False
+RUTA_DIM_BOOK = os.path.join('standard', 'dim_book.parquet')
+RUTA_DETALLE_FUENTE = os.path.join('standard', 'book_source_detail.parquet')
+
+# Nombres de las columnas de cada fuente en el modelo canónico (evitan conflictos al fusionarlas)
+RENOMBRES_GOODREADS = {
+    'title': 'titulo_gr', 'author': 'autor_gr', 'rating': 'rating_gr', 'ratings_count': 'conteo_ratings_gr',
+    'isbn10': 'isbn10_gr', 'isbn13': 'isbn13_gr'
+}
+RENOMBRES_GOOGLE_BOOKS = {
+    'title': 'titulo_gb', 'authors': 'autores_gb', 'publisher': 'editorial_gb', 'pub_date': 'fecha_pub_gb',
+    'language': 'idioma_gb', 'categories': 'categorias_gb', 'isbn10': 'isbn10_gb', 'isbn13': 'isbn13_gb',
+    'price_amount': 'precio_gb', 'price_currency': 'moneda_gb'
+}
+
+# Columnas de los registros ganadores que pasan a dim_book
+COLUMNAS_DIM_BOOK = [
+    'book_id',
+    'titulo',
+    'titulo_normalizado',
+    'autor_principal',
+    'autores',
+    'editorial',
+    'anio_pub',
+    'fecha_pub_iso',
+    'codigo_idioma',
+    'isbn10_limpio',
+    'isbn13_limpio',
+    'precio_gb',
+    'codigo_moneda',
+]
+# Nombres de esas columnas en dim_book
+RENOMBRES_DIM_BOOK = {
+    'fecha_pub_iso': 'fecha_publicacion',
+    'anio_pub': 'anio_publicacion',
+    'codigo_idioma': 'idioma',
+    'isbn10_limpio': 'isbn10',
+    'isbn13_limpio': 'isbn13',
+    'precio_gb': 'precio',
+    'codigo_moneda': 'moneda'
+}
+
+# Esquema de las particiones intermedias del modo streaming: lo necesario para deduplicar y construir dim_book
+ESQUEMA_PARTICION_DEDUP = pa.schema([
+    ('book_id', pa.string()),
+    ('titulo', pa.string()),
+    ('titulo_normalizado', pa.string()),
+    ('autor_principal', pa.string()),
+    ('autores', pa.list_(pa.string())),
+    ('editorial', pa.string()),
+    ('anio_pub', pa.int64()),
+    ('fecha_pub_iso', pa.string()),
+    ('codigo_idioma', pa.string()),
+    ('isbn10_limpio', pa.string()),
+    ('isbn13_limpio', pa.string()),
+    ('precio_gb', pa.float64()),
+    ('codigo_moneda', pa.string()),
+    ('fuente_gb', pa.string()),
+])
+
+# Rutas de los archivos fuente de la zona landing: los Parquet si existen y, si no, el JSON y el CSV
+# del formato anterior. Falla si falta alguna de las dos fuentes
+def rutas_landing(ruta_landing):
+    archivo_goodreads = buscar_archivo_landing(ruta_landing, ARCHIVO_GOODREADS, ARCHIVO_GOODREADS_LEGADO)
+    archivo_googlebooks = buscar_archivo_landing(ruta_landing, ARCHIVO_GOOGLE_BOOKS, ARCHIVO_GOOGLE_BOOKS_LEGADO)
+
+    if archivo_goodreads is None or archivo_googlebooks is None:
+        raise FileNotFoundError("Archivos fuente no encontrados en el directorio landing. Por favor, ejecute el scraper y el enriquecedor primero.")
+
+    return archivo_goodreads, archivo_googlebooks
 
 # Carga los datos de Goodreads y Google Books desde la zona de aterrizaje (landing)
 def cargar_datos(ruta_landing):
-    archivo_goodreads = os.path.join(ruta_landing, 'goodreads_books.json')
-    archivo_googlebooks = os.path.join(ruta_landing, 'googlebooks_books.csv')
+    archivo_goodreads, archivo_googlebooks = rutas_landing(ruta_landing)
 
-    if not os.path.exists(archivo_goodreads) or not os.path.exists(archivo_googlebooks):
-        raise FileNotFoundError("Archivos fuente no encontrados en el directorio landing. Por favor, ejecute el scraper y el enriquecedor primero.")
-
-    df_gr = pd.read_json(archivo_goodreads)
-    df_gb = pd.read_csv(archivo_googlebooks, sep=';')
+    if es_landing_parquet(archivo_goodreads):
+        df_gr = leer_landing(archivo_goodreads)
+    else:
+        df_gr = pd.read_json(archivo_goodreads, dtype=TIPOS_LANDING_GOODREADS)
+    if es_landing_parquet(archivo_googlebooks):
+        df_gb = leer_landing(archivo_googlebooks)
+    else:
+        df_gb = pd.read_csv(archivo_googlebooks, sep=';', dtype=TIPOS_LANDING_GOOGLE_BOOKS)
 
     # Añadir información de la fuente
     df_gr['fuente'] = 'goodreads'
@@ -29,14 +144,79 @@ def cargar_datos(ruta_landing):
     
     return df_gr, df_gb
 
+# Carga por bloques de tamano_chunk filas los libros de Goodreads de la zona landing
+def cargar_goodreads_por_bloques(ruta_landing, tamano_chunk=TAMANO_CHUNK_DEFAULT):
+    archivo_goodreads, _ = rutas_landing(ruta_landing)
+    if es_landing_parquet(archivo_goodreads):
+        bloques_gr = leer_landing_por_bloques(archivo_goodreads, tamano_chunk)
+    else:
+        bloques_gr = leer_json_por_bloques(archivo_goodreads, tamano_chunk, tipos=TIPOS_LANDING_GOODREADS)
+
+    for df_gr in bloques_gr:
+        df_gr['fuente'] = 'goodreads'
+        yield df_gr
+
+# Carga por bloques de tamano_chunk filas las filas de Google Books de la zona landing
+def cargar_google_books_por_bloques(ruta_landing, tamano_chunk=TAMANO_CHUNK_DEFAULT):
+    _, archivo_googlebooks = rutas_landing(ruta_landing)
+    if es_landing_parquet(archivo_googlebooks):
+        bloques_gb = leer_landing_por_bloques(archivo_googlebooks, tamano_chunk)
+    else:
+        bloques_gb = leer_csv_por_bloques(archivo_googlebooks, tamano_chunk, tipos=TIPOS_LANDING_GOOGLE_BOOKS)
+
+    for df_gb in bloques_gb:
+        df_gb['fuente'] = 'google_books'
+        yield df_gb
+
+# Columnas de Google Books en la zona landing, incluida la de la fuente, sin leer ninguna fila
+def columnas_google_books(ruta_landing):
+    _, archivo_googlebooks = rutas_landing(ruta_landing)
+    if es_landing_parquet(archivo_googlebooks):
+        columnas_gb = list(ESQUEMA_LANDING_GOOGLE_BOOKS.names)
+    else:
+        columnas_gb = list(pd.read_csv(archivo_googlebooks, sep=';', nrows=0).columns)
+    return columnas_gb + ['fuente']
+
+# Hash de una fila vacía de Google Books, el que usan los libros de Goodreads sin fila alineada
+def hash_fila_vacia(columnas_gb):
+    return hash_filas(pd.DataFrame(index=[0], columns=columnas_gb))[0]
+
+# Hash de contenido de cada libro de Goodreads: el de su fila combinado con el de la fila alineada de Google Books
+# (el enriquecedor escribe una por libro y en el mismo orden). hashes_gb son los de las filas alineadas con df_gr
+def hash_contenido_goodreads(df_gr, hashes_gb, hash_vacio):
+    hashes_gb_alineados = np.full(len(df_gr), hash_vacio, dtype=np.uint64)
+    hashes_gb_alineados[:min(len(df_gr), len(hashes_gb))] = hashes_gb[:len(df_gr)]
+    with np.errstate(over='ignore'):
+        return hash_filas(df_gr) * np.uint64(1000003) + hashes_gb_alineados
+
+# Añade los hashes de contenido de la zona landing que usa el modo incremental para detectar cambios:
+# a cada libro de Goodreads el de su fila y la fila alineada de Google Books, y a cada fila de Google Books
+# el suyo, que acompaña al libro con el que se empareje
+def anotar_hash_contenido(df_gr, df_gb):
+    hashes_gb = hash_filas(df_gb)
+    df_gr['hash_contenido'] = hash_contenido_goodreads(df_gr, hashes_gb, hash_fila_vacia(df_gb.columns))
+    df_gb['hash_gb'] = pd.array(hashes_gb, dtype='UInt64')
+    return df_gr, df_gb
+
 # Combina y transforma datos de ambas fuentes en un modelo canónico
 def crear_modelo_canonico(df_gr, df_gb):
     # Renombrar columnas para evitar conflictos y preparar para la fusión
-    df_gr.rename(columns={'title': 'titulo_gr', 'author': 'autor_gr', 'rating': 'rating_gr', 'ratings_count': 'conteo_ratings_gr', 'isbn10': 'isbn10_gr', 'isbn13': 'isbn13_gr'}, inplace=True)
-    df_gb.rename(columns={'title': 'titulo_gb', 'authors': 'autores_gb', 'publisher': 'editorial_gb', 'pub_date': 'fecha_pub_gb', 'language': 'idioma_gb', 'categories': 'categorias_gb', 'isbn10': 'isbn10_gb', 'isbn13': 'isbn13_gb', 'price_amount': 'precio_gb', 'price_currency': 'moneda_gb'}, inplace=True)
-
-    # Usar el título de Goodreads como clave de unión
-    df_fusionado = pd.merge(df_gr, df_gb, left_on='titulo_gr', right_on='titulo_gb', how='left', suffixes=('_gr', '_gb'))
+    df_gr.rename(columns=RENOMBRES_GOODREADS, inplace=True)
+    df_gb.rename(columns=RENOMBRES_GOOGLE_BOOKS, inplace=True)
+
+    # Emparejar cada libro de Goodreads con su mejor candidato de Google Books: ISBN primero, después título y autor
+    df_gr = df_gr.reset_index(drop=True)
+    df_gb = df_gb.reset_index(drop=True)
+    return fusionar_fuentes(df_gr, df_gb, emparejar_fuentes(df_gr, df_gb))
+
+# Une a cada libro de Goodreads la fila de Google Books con la que se emparejó. df_gb puede contener solo
+# las filas emparejadas, indexadas por su posición en Google Books (indice_gb de los pares)
+def fusionar_fuentes(df_gr, df_gb, pares):
+    df_gr = df_gr.join(pares.set_index('indice_gr'))
+    df_fusionado = pd.merge(df_gr, df_gb, left_on='indice_gb', right_index=True, how='left', suffixes=('_gr', '_gb'))
+    df_fusionado = df_fusionado.drop(columns='indice_gb').reset_index(drop=True)
+    df_fusionado['puntuacion_match'] = df_fusionado['puntuacion_match'].fillna(0.0)
+    df_fusionado['metodo_match'] = df_fusionado['metodo_match'].fillna('sin_match')
     
     # Crear el dataframe de detalle de fuente
     df_detalle_fuente = df_fusionado.copy()
@@ -46,17 +226,17 @@ def crear_modelo_canonico(df_gr, df_gb):
 
 # Aplica normalización, limpieza y verificaciones de calidad.
 def normalizar_y_verificar_calidad(df):
-    # Limpieza y validación de ISBN
-    df['isbn13_limpio'] = df['isbn13_gr'].fillna(df['isbn13_gb']).apply(formatear_isbn13)
-    df['isbn10_limpio'] = df['isbn10_gr'].fillna(df['isbn10_gb']).apply(formatear_isbn10)
+    # Limpieza y validación de ISBN (vectorizada sobre toda la columna)
+    df['isbn13_limpio'] = formatear_isbn13_lote(df['isbn13_gr'].fillna(df['isbn13_gb']))
+    df['isbn10_limpio'] = formatear_isbn10_lote(df['isbn10_gr'].fillna(df['isbn10_gb']))
 
-    # Normalización de fecha
-    df['fecha_pub_iso'] = df['fecha_pub_gb'].apply(lambda x: validar_fecha(str(x)) if pd.notna(x) else None)
+    # Normalización de fecha (los valores no nulos se validan como texto)
+    df['fecha_pub_iso'] = validar_fecha_lote(df['fecha_pub_gb'].map(str, na_action='ignore'))
     df['anio_pub'] = pd.to_datetime(df['fecha_pub_iso']).dt.year.astype('Int64')
 
     # Validación de idioma y moneda
-    df['codigo_idioma'] = df['idioma_gb'].apply(validar_codigo_idioma)
-    df['codigo_moneda'] = df['moneda_gb'].apply(validar_codigo_moneda)
+    df['codigo_idioma'] = validar_codigo_idioma_lote(df['idioma_gb'])
+    df['codigo_moneda'] = validar_codigo_moneda_lote(df['moneda_gb'])
 
     # Limpieza de cadenas
     df['titulo'] = df['titulo_gb'].fillna(df['titulo_gr']).apply(limpiar_string)
@@ -73,13 +253,9 @@ def normalizar_y_verificar_calidad(df):
 
 # Genera un book_id estable. Prefiere ISBN-13, recurre a un hash como fallback
 def generar_book_id(df):
-    def crear_id_hash(fila):
-        cadena_clave = f"{fila['titulo_normalizado']}{fila['autor_principal']}{fila['editorial']}{fila['anio_pub']}"
-        return hashlib.sha256(cadena_clave.encode('utf-8')).hexdigest()
-
     df['book_id'] = df['isbn13_limpio']
     mascara_fallback = df['book_id'].isnull()
-    df.loc[mascara_fallback, 'book_id'] = df[mascara_fallback].apply(crear_id_hash, axis=1)
+    df.loc[mascara_fallback, 'book_id'] = crear_ids_hash_lote(df.loc[mascara_fallback])
     return df
 
 # Deduplica registros basados en book_id y aplica reglas de supervivencia
@@ -94,48 +270,50 @@ def deduplicar_y_seleccionar_ganador(df):
 
 # Crea el DataFrame final dim_book a partir de los registros ganadores
 def crear_dim_book(df_ganador):
-    dim_book = df_ganador[[
-        'book_id',
-        'titulo',
-        'titulo_normalizado',
-        'autor_principal',
-        'autores',
-        'editorial',
-        'anio_pub',
-        'fecha_pub_iso',
-        'codigo_idioma',
-        'isbn10_limpio',
-        'isbn13_limpio',
-        'precio_gb',
-        'codigo_moneda',
-    ]].copy()
+    dim_book = df_ganador[COLUMNAS_DIM_BOOK].copy()
 
     # Renombrar columnas para la dimensión final
-    dim_book.rename(columns={
-        'fecha_pub_iso': 'fecha_publicacion',
-        'anio_pub': 'anio_publicacion',
-        'codigo_idioma': 'idioma',
-        'isbn10_limpio': 'isbn10',
-        'isbn13_limpio': 'isbn13',
-        'precio_gb': 'precio',
-        'codigo_moneda': 'moneda'
-    }, inplace=True)
+    dim_book.rename(columns=RENOMBRES_DIM_BOOK, inplace=True)
     
     dim_book['ts_ultima_actualizacion'] = datetime.now(timezone.utc).isoformat()
     
     return dim_book
 
+# Versión Arrow de crear_dim_book
+def crear_dim_book_arrow(tabla_ganador):
+    dim_book = seleccionar_columnas(tabla_ganador, COLUMNAS_DIM_BOOK, RENOMBRES_DIM_BOOK)
+    ts = pa.repeat(pa.scalar(datetime.now(timezone.utc).isoformat(), pa.large_string()), dim_book.num_rows)
+    return agregar_columnas(dim_book, {'ts_ultima_actualizacion': ts})
+
 # Guarda todos los artefactos finales en el disco
 def generar_artefactos(df_dim, df_fuente, reportes_calidad):
     # Crear directorios si no existen
     os.makedirs('standard', exist_ok=True)
-    os.makedirs('docs', exist_ok=True)
 
     # Guardar archivos Parquet
-    df_dim.to_parquet('standard/dim_book.parquet', index=False)
-    df_fuente.to_parquet('standard/book_source_detail.parquet', index=False)
+    guardar_dim_book(pa.Table.from_pandas(df_dim, preserve_index=False))
+    guardar_detalle_fuente(pa.Table.from_pandas(df_fuente, preserve_index=False))
+    guardar_indice_libros()
     print("Guardados dim_book.parquet y book_source_detail.parquet")
 
+    guardar_documentacion(reportes_calidad, df_dim)
+
+# Escribe dim_book con su esquema explícito como dataset particionado (ver utils_parquet)
+def guardar_dim_book(tabla):
+    escribir_tabla(convertir_a_esquema(tabla, ESQUEMA_DIM_BOOK), RUTA_DIM_BOOK, columna_particion=COLUMNA_PARTICION_DIM_BOOK)
+
+# Reconstruye el índice de búsqueda de dim_book (ver indice_libros) a partir de la versión recién escrita
+def guardar_indice_libros():
+    construir_indice(RUTA_DIM_BOOK, RUTA_INDICE_LIBROS)
+
+# Escribe book_source_detail con las columnas de baja cardinalidad codificadas como diccionario
+def guardar_detalle_fuente(tabla):
+    escribir_tabla(compactar_tabla(tabla, COLUMNAS_DICCIONARIO_DETALLE_FUENTE), RUTA_DETALLE_FUENTE)
+
+# Guarda las métricas de calidad y la documentación del esquema
+def guardar_documentacion(reportes_calidad, df_dim=None):
+    os.makedirs('docs', exist_ok=True)
+
     # Guardar métricas de calidad
     with open('docs/quality_metrics.json', 'w', encoding='utf-8') as f:
         json.dump(reportes_calidad, f, indent=4, ensure_ascii=False)
@@ -144,6 +322,276 @@ def generar_artefactos(df_dim, df_fuente, reportes_calidad):
     # Generar el archivo schema.md
     generar_schema_md(df_dim)
 
+# Partición de cada book_id en el nivel indicado. Cada nivel usa otros dígitos del mismo hash,
+# así que al volver a repartir una partición sus registros se separan
+def _particion_book_id(book_ids, nivel, num_particiones=NUM_PARTICIONES_DEDUP):
+    hashes = pd.util.hash_array(book_ids.to_numpy(dtype=object))
+    return (hashes // np.uint64(num_particiones ** nivel)) % np.uint64(num_particiones)
+
+# Reparte los registros de una secuencia de DataFrames en archivos Parquet por partición de book_id
+def _repartir_por_book_id(bloques, directorio, nivel):
+    os.makedirs(directorio, exist_ok=True)
+    escritores = {}
+    try:
+        for df in bloques:
+            particiones = _particion_book_id(df['book_id'], nivel)
+            for particion in np.unique(particiones):
+                if particion not in escritores:
+                    ruta = os.path.join(directorio, f"particion-{int(particion):03d}.parquet")
+                    escritores[particion] = pq.ParquetWriter(ruta, ESQUEMA_PARTICION_DEDUP)
+                df_particion = df.loc[particiones == particion, ESQUEMA_PARTICION_DEDUP.names]
+                escritores[particion].write_table(pa.Table.from_pandas(df_particion, schema=ESQUEMA_PARTICION_DEDUP, preserve_index=False))
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+    return [escritor.where for _, escritor in sorted(escritores.items())]
+
+# Lee una tabla de partición a pandas; los enteros vuelven como Int64 para conservar los nulos de anio_pub
+def _particion_a_pandas(tabla):
+    return tabla.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+
+# Devuelve, una a una, las particiones listas para deduplicar. Todos los registros de un book_id caen en la misma
+# partición; las que superan tamano_chunk filas se vuelven a repartir con el siguiente nivel del hash
+def _leer_particiones(rutas, tamano_chunk, nivel=0):
+    for ruta in rutas:
+        archivo = pq.ParquetFile(ruta)
+        if archivo.metadata.num_rows > tamano_chunk and nivel < MAX_NIVELES_PARTICION:
+            subparticiones = _repartir_por_book_id(
+                (_particion_a_pandas(lote) for lote in archivo.iter_batches(batch_size=tamano_chunk)),
+                ruta[:-len('.parquet')], nivel + 1
+            )
+            yield from _leer_particiones(subparticiones, tamano_chunk, nivel + 1)
+        else:
+            yield _particion_a_pandas(archivo.read())
+
+# Primera pasada del modo streaming: recorre Google Books por bloques, escribe en el directorio de trabajo una copia
+# con las columnas del modelo canónico y su hash_gb, y construye el índice de emparejamiento solo con COLUMNAS_INDICE_GB.
+# Devuelve el índice, los hashes de todas las filas (por posición) y las partes escritas como (fila inicial, ruta)
+def _preparar_google_books(ruta_landing, tamano_chunk, directorio, calidad_gb):
+    claves, hashes, partes = [], [], []
+    inicio = 0
+    for numero, df_gb in enumerate(cargar_google_books_por_bloques(ruta_landing, tamano_chunk)):
+        calidad_gb.agregar(df_gb)
+        hashes_bloque = hash_filas(df_gb)
+        df_gb['hash_gb'] = pd.array(hashes_bloque, dtype='UInt64')
+        df_gb.rename(columns=RENOMBRES_GOOGLE_BOOKS, inplace=True)
+
+        ruta_parte = os.path.join(directorio, f"parte-{numero:05d}.parquet")
+        escribir_parte(df_gb, ruta_parte, filas_por_grupo=FILAS_GRUPO_GOOGLE_BOOKS)
+        claves.append(df_gb[[columna for columna in COLUMNAS_INDICE_GB if columna in df_gb.columns]])
+        hashes.append(hashes_bloque)
+        partes.append((inicio, ruta_parte))
+        inicio += len(df_gb)
+
+    df_claves = pd.concat(claves, ignore_index=True) if claves else pd.DataFrame(columns=COLUMNAS_INDICE_GB)
+    hashes_gb = np.concatenate(hashes) if hashes else np.empty(0, dtype=np.uint64)
+    return indexar_google_books(df_claves), hashes_gb, partes
+
+# Lee de la copia de trabajo de Google Books las filas de las posiciones indicadas, indexadas por su posición.
+# De cada parte solo se leen los grupos de filas que contienen alguna; sin partes, devuelve un DataFrame vacío con columnas_gb
+def _leer_filas_google_books(partes, posiciones, columnas_gb):
+    if not partes:
+        return pd.DataFrame(columns=columnas_gb)
+    posiciones = np.unique(posiciones)
+    numero_parte = np.searchsorted([inicio for inicio, _ in partes], posiciones, side='right') - 1
+
+    trozos = []
+    for numero in np.unique(numero_parte):
+        inicio, ruta_parte = partes[numero]
+        posiciones_parte = posiciones[numero_parte == numero]
+        grupos = (posiciones_parte - inicio) // FILAS_GRUPO_GOOGLE_BOOKS
+        grupos_leidos = np.unique(grupos)
+        # Todos los grupos salvo el último de la parte están completos, así que la fila dentro de los grupos leídos
+        # es el orden del grupo entre ellos por su tamaño más la fila dentro del grupo
+        filas = np.searchsorted(grupos_leidos, grupos) * FILAS_GRUPO_GOOGLE_BOOKS + (posiciones_parte - inicio) % FILAS_GRUPO_GOOGLE_BOOKS
+        tabla = pq.ParquetFile(ruta_parte).read_row_groups(grupos_leidos.tolist()).take(pa.array(filas))
+        trozos.append(tabla.to_pandas().set_axis(posiciones_parte))
+    if not trozos:
+        return pq.read_schema(partes[0][1]).empty_table().to_pandas()
+    return pd.concat(trozos)
+
+# Ejecuta el pipeline por bloques de tamano_chunk filas, sin cargar nunca la zona landing completa.
+# Una primera pasada indexa Google Books completo (ver _preparar_google_books); después cada bloque de Goodreads
+# se empareja contra ese índice, así que el resultado es el mismo que en memoria, y se normaliza y recibe su book_id.
+# El detalle de fuente se vuelca a disco bloque a bloque y los registros se reparten por book_id en particiones
+# que después se deduplican de una en una
+def ejecutar_pipeline_streaming(ruta_landing, tamano_chunk=TAMANO_CHUNK_DEFAULT, directorio_trabajo=DIRECTORIO_TRABAJO_STREAMING,
+                                modo_calidad=MODO_CALIDAD_DEFAULT):
+    if os.path.exists(directorio_trabajo):
+        shutil.rmtree(directorio_trabajo)
+    os.makedirs('standard', exist_ok=True)
+
+    calidad_gr = AcumuladorCalidad('Goodreads', os.path.join(directorio_trabajo, 'calidad_gr'), modo=modo_calidad)
+    calidad_gb = AcumuladorCalidad('Google Books', os.path.join(directorio_trabajo, 'calidad_gb'), modo=modo_calidad)
+    partes_detalle = []
+
+    # 1. Indexar Google Books completo para el emparejamiento
+    columnas_gb = columnas_google_books(ruta_landing)
+    with etapa('indexar_google_books') as medicion:
+        indice_gb, hashes_gb, partes_gb = _preparar_google_books(
+            ruta_landing, tamano_chunk, os.path.join(directorio_trabajo, 'google_books'), calidad_gb
+        )
+        medicion['filas'] = len(hashes_gb)
+    hash_vacio = hash_fila_vacia(columnas_gb)
+    columnas_canonicas_gb = [RENOMBRES_GOOGLE_BOOKS.get(columna, columna) for columna in columnas_gb] + ['hash_gb']
+
+    # 2-4. Cargar, emparejar, normalizar y generar book_id bloque a bloque de Goodreads
+    def procesar_bloques():
+        inicio = 0
+        for numero, df_gr in enumerate(cargar_goodreads_por_bloques(ruta_landing, tamano_chunk)):
+            calidad_gr.agregar(df_gr)
+            df_gr['hash_contenido'] = hash_contenido_goodreads(df_gr, hashes_gb[inicio:inicio + len(df_gr)], hash_vacio)
+            inicio += len(df_gr)
+
+            df_gr = df_gr.rename(columns=RENOMBRES_GOODREADS).reset_index(drop=True)
+            pares = emparejar_con_indice(df_gr, indice_gb)
+            df_gb = _leer_filas_google_books(partes_gb, pares['indice_gb'].to_numpy(), columnas_canonicas_gb)
+            df_con_id = generar_book_id(normalizar_y_verificar_calidad(fusionar_fuentes(df_gr, df_gb, pares)))
+            ruta_parte = os.path.join(directorio_trabajo, 'detalle', f"parte-{numero:05d}.parquet")
+            escribir_parte(df_con_id, ruta_parte)
+            partes_detalle.append(ruta_parte)
+            print(f"Bloque {numero + 1} procesado ({len(df_con_id)} filas).")
+            yield df_con_id
+
+    with etapa('procesar_bloques') as medicion:
+        particiones = _repartir_por_book_id(procesar_bloques(), os.path.join(directorio_trabajo, 'particiones'), nivel=0)
+        medicion['filas'] = calidad_gr.filas_totales
+    if not partes_detalle:
+        print("La zona landing no contiene libros.")
+        shutil.rmtree(directorio_trabajo)
+        return
+
+    # 5-6. Deduplicar cada partición y construir su parte de dim_book
+    duplicados_encontrados = 0
+    partes_dim = []
+    with etapa('deduplicar_particiones', filas=calidad_gr.filas_totales):
+        for numero, df_particion in enumerate(_leer_particiones(particiones, tamano_chunk)):
+            duplicados_encontrados += int(df_particion.duplicated('book_id').sum())
+            dim_particion = crear_dim_book(deduplicar_y_seleccionar_ganador(df_particion))
+            ruta_parte = os.path.join(directorio_trabajo, 'dim', f"parte-{numero:05d}.parquet")
+            escribir_parte(dim_particion, ruta_parte)
+            partes_dim.append((ruta_parte, len(dim_particion)))
+
+    # 7. Generar artefactos finales
+    with etapa('generar_artefactos', filas=calidad_gr.filas_totales):
+        escribir_tabla_desde_partes(
+            [ruta for ruta, _ in partes_dim], RUTA_DIM_BOOK, ESQUEMA_DIM_BOOK, columna_particion=COLUMNA_PARTICION_DIM_BOOK
+        )
+        esquema_detalle = unificar_esquemas([pq.read_schema(ruta) for ruta in partes_detalle])
+        escribir_tabla_desde_partes(
+            partes_detalle, RUTA_DETALLE_FUENTE, esquema_compacto(esquema_detalle, COLUMNAS_DICCIONARIO_DETALLE_FUENTE)
+        )
+        guardar_indice_libros()
+    print("Guardados dim_book.parquet y book_source_detail.parquet")
+
+    reporte_calidad_final = {
+        'fuentes': [calidad_gr.reporte(), calidad_gb.reporte()],
+        'duplicados_encontrados': duplicados_encontrados,
+        'total_libros_en_dimension': sum(filas for _, filas in partes_dim)
+    }
+    guardar_documentacion(reporte_calidad_final)
+    shutil.rmtree(directorio_trabajo)
+
+# Actualiza dim_book y book_source_detail a partir de la versión existente en lugar de reconstruirlos.
+# Las filas de la zona landing cuyo hash de contenido ya está en el detalle se conservan tal cual (cada fila previa
+# cubre una sola fila de la zona landing, así que las filas idénticas se cuentan); las nuevas o modificadas se emparejan, normalizan y reciben su book_id, y las que ya no están se eliminan. Las reglas de
+# supervivencia solo se vuelven a aplicar a los book_id afectados; el resto de dim_book se copia sin cambios
+def ejecutar_pipeline_incremental(ruta_landing, motor=MOTOR_DEFAULT, modo_calidad=MODO_CALIDAD_DEFAULT):
+    if not os.path.exists(RUTA_DIM_BOOK) or not os.path.exists(RUTA_DETALLE_FUENTE):
+        print("No existe una versión previa de dim_book: se hace una reconstrucción completa.")
+        return False
+
+    tabla_detalle = leer_tabla(RUTA_DETALLE_FUENTE)
+    if 'hash_contenido' not in tabla_detalle.column_names or 'hash_gb' not in tabla_detalle.column_names:
+        print("La versión previa no tiene hash de contenido: se hace una reconstrucción completa.")
+        return False
+
+    with etapa('cargar_datos') as medicion:
+        df_gr, df_gb = cargar_datos(ruta_landing)
+        medicion['filas'] = len(df_gr) + len(df_gb)
+    with etapa('reporte_calidad', filas=len(df_gr) + len(df_gb)):
+        calidad_gr = generar_reporte_calidad(df_gr, 'Goodreads', modo_calidad)
+        calidad_gb = generar_reporte_calidad(df_gb, 'Google Books', modo_calidad)
+        anotar_hash_contenido(df_gr, df_gb)
+
+    # Filas vigentes (ni su contenido ni la fila de Google Books con la que se emparejaron han cambiado)
+    # y filas nuevas o modificadas. Los hashes se cuentan como multiconjunto: la n-ésima fila previa con un hash
+    # se conserva si la zona landing tiene al menos n filas con ese hash, y ocupa la posición de la n-ésima
+    hashes_gb_previos = tabla_detalle.column('hash_gb').cast(pa.uint64())
+    candidatas = pc.or_kleene(
+        pc.is_null(hashes_gb_previos),
+        pc.is_in(hashes_gb_previos, value_set=pa.array(df_gb['hash_gb'].to_numpy(), type=pa.uint64()))
+    ).to_numpy(zero_copy_only=False)
+    landing = pd.DataFrame({'hash': df_gr['hash_contenido'].to_numpy(dtype=np.uint64), 'posicion': np.arange(len(df_gr))})
+    landing['ocurrencia'] = landing.groupby('hash').cumcount()
+    previas = pd.DataFrame({
+        'hash': tabla_detalle.column('hash_contenido').cast(pa.uint64()).to_numpy(), 'fila': np.arange(tabla_detalle.num_rows)
+    })[candidatas]
+    previas['ocurrencia'] = previas.groupby('hash').cumcount()
+    conservadas = previas.merge(landing, on=['hash', 'ocurrencia']).sort_values('fila')
+
+    vigentes = np.zeros(tabla_detalle.num_rows, dtype=bool)
+    vigentes[conservadas['fila'].to_numpy()] = True
+    vigentes = pa.array(vigentes)
+    nuevas = np.ones(len(df_gr), dtype=bool)
+    nuevas[conservadas['posicion'].to_numpy()] = False
+    eliminadas = tabla_detalle.num_rows - len(conservadas)
+
+    if not nuevas.any() and not eliminadas:
+        print("Sin cambios en la zona landing: dim_book no se modifica.")
+        if not os.path.isdir(RUTA_INDICE_LIBROS):
+            guardar_indice_libros()
+        return True
+    print(f"Filas nuevas o modificadas: {int(nuevas.sum())}; filas eliminadas o sustituidas: {eliminadas}.")
+
+    # Solo las filas nuevas pasan por emparejamiento, normalización y generación de book_id;
+    # se emparejan contra todo Google Books, igual que en una reconstrucción completa
+    with etapa('procesar_filas_nuevas', filas=int(nuevas.sum())):
+        df_nuevas_raw = crear_modelo_canonico(df_gr[nuevas].reset_index(drop=True), df_gb)
+        if motor == 'arrow':
+            tabla_nuevas = generar_book_id_arrow(normalizar_y_verificar_calidad_arrow(pa.Table.from_pandas(df_nuevas_raw, preserve_index=False)))
+        else:
+            tabla_nuevas = pa.Table.from_pandas(generar_book_id(normalizar_y_verificar_calidad(df_nuevas_raw)), preserve_index=False)
+    book_ids_afectados = pa.concat_arrays([
+        pc.filter(tabla_detalle.column('book_id'), pc.invert(vigentes)).combine_chunks().cast(pa.string()),
+        tabla_nuevas.column('book_id').combine_chunks().cast(pa.string()),
+    ]).unique()
+
+    # Nuevo detalle de fuente: filas vigentes más las nuevas, en el orden de la zona landing. Sin filas nuevas
+    # no se concatena su tabla vacía, cuyas columnas sin valores no tienen el tipo de las del detalle
+    tabla_detalle = concatenar_tablas([tabla_detalle.filter(vigentes)] + ([tabla_nuevas] if tabla_nuevas.num_rows else []))
+    posicion = np.concatenate([conservadas['posicion'].to_numpy(), np.flatnonzero(nuevas)])
+    tabla_detalle = tabla_detalle.take(np.argsort(posicion, kind='stable'))
+
+    # Las reglas de supervivencia se aplican solo a los registros de los book_id afectados
+    afectados_en_detalle = pc.is_in(tabla_detalle.column('book_id').cast(pa.string()), value_set=book_ids_afectados)
+    with etapa('deduplicar_afectados', filas=pc.sum(afectados_en_detalle).as_py() or 0):
+        if motor == 'arrow':
+            tabla_dim_afectados = crear_dim_book_arrow(deduplicar_y_seleccionar_ganador_arrow(tabla_detalle.filter(afectados_en_detalle)))
+        else:
+            df_afectados = tabla_detalle.filter(afectados_en_detalle).to_pandas()
+            tabla_dim_afectados = pa.Table.from_pandas(crear_dim_book(deduplicar_y_seleccionar_ganador(df_afectados)), preserve_index=False)
+
+    tabla_dim = leer_tabla(RUTA_DIM_BOOK, columnas=ESQUEMA_DIM_BOOK.names)
+    tabla_dim = concatenar_tablas([
+        tabla_dim.filter(pc.invert(pc.is_in(tabla_dim.column('book_id').cast(pa.string()), value_set=book_ids_afectados))),
+        tabla_dim_afectados,
+    ]).sort_by('book_id')
+
+    with etapa('generar_artefactos', filas=tabla_detalle.num_rows):
+        guardar_dim_book(tabla_dim)
+        guardar_detalle_fuente(tabla_detalle)
+        guardar_indice_libros()
+    print(f"Actualizados dim_book.parquet y book_source_detail.parquet ({len(book_ids_afectados)} book_id afectados)")
+
+    reporte_calidad_final = {
+        'fuentes': [calidad_gr, calidad_gb],
+        'duplicados_encontrados': tabla_detalle.num_rows - pc.count_distinct(tabla_detalle.column('book_id'), mode='all').as_py(),
+        'total_libros_en_dimension': tabla_dim.num_rows
+    }
+    guardar_documentacion(reporte_calidad_final)
+    return True
+
 # Genera la documentación del esquema en formato Markdown
 def generar_schema_md(df_dim):
     
@@ -197,6 +645,13 @@ A continuación se describen todos los campos presentes en `dim_book.parquet`.
 | `precio` | `float64` | Sí | `35.99` | Precio del libro, extraído de Google Books. |
 | `moneda` | `string` | Sí | `USD` | Código de moneda en formato **ISO 4217**. Se valida contra una lista de códigos permitidos. |
 | `ts_ultima_actualizacion` | `string` | No | `2025-11-15T10:00:00Z` | Timestamp en formato **ISO 8601** que indica cuándo se procesó el registro por última vez. |
+
+## Almacenamiento
+
+-   `dim_book.parquet` es un directorio con un dataset particionado estilo Hive por idioma (`particion_idioma=en/`, `particion_idioma=desconocido/` para los libros sin idioma). La columna `particion_idioma` solo sirve para descartar particiones al filtrar; `idioma` conserva el valor original.
+-   **Contrato de lectura**: los lectores genéricos del directorio (`pd.read_parquet`, `pq.read_table`, `ds.dataset(..., partitioning='hive')`) devuelven, además de los campos de la tabla anterior, una última columna `particion_idioma` (`category` en pandas) que no forma parte del esquema. Para obtener exactamente los campos de `dim_book` hay que descartarla, leer con `columns=[...]` o usar `utils_parquet.leer_tabla`. No se particiona por `idioma` directamente porque esos lectores no saben leer una partición de valores nulos de una columna de diccionario.
+-   `editorial`, `idioma` y `moneda` se guardan con codificación de diccionario (en pandas se leen como `category`).
+-   Los archivos usan compresión `zstd`, row groups de hasta 131.072 filas y estadísticas por columna, de modo que los filtros por `anio_publicacion`, `isbn13`, etc. pueden saltarse row groups completos.
 """
     
     # Guardar el contenido en el archivo
@@ -205,33 +660,60 @@ A continuación se describen todos los campos presentes en `dim_book.parquet`.
     print("Guardado schema.md")
 
 # Función principal para ejecutar el pipeline de integración
-def main():
+@instrumentar('integrate_pipeline')
+def main(modo_streaming=MODO_STREAMING_DEFAULT, modo_incremental=MODO_INCREMENTAL_DEFAULT, motor=MOTOR_DEFAULT,
+         modo_calidad=MODO_CALIDAD_DEFAULT):
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido: '{motor}'. Opciones: {', '.join(MOTORES)}.")
     print("Iniciando pipeline de integración...")
+
+    if modo_incremental and ejecutar_pipeline_incremental('landing', motor, modo_calidad):
+        print("Pipeline de integración finalizado con éxito.")
+        return
+
+    if modo_streaming:
+        ejecutar_pipeline_streaming('landing', modo_calidad=modo_calidad)
+        print("Pipeline de integración finalizado con éxito.")
+        return
     
     # 1. Cargar datos
-    df_gr, df_gb = cargar_datos('landing')
+    with etapa('cargar_datos') as medicion:
+        df_gr, df_gb = cargar_datos('landing')
+        medicion['filas'] = len(df_gr) + len(df_gb)
     
     # Generar reportes de calidad iniciales
-    calidad_gr = generar_reporte_calidad(df_gr, 'Goodreads')
-    calidad_gb = generar_reporte_calidad(df_gb, 'Google Books')
+    with etapa('reporte_calidad', filas=len(df_gr) + len(df_gb)):
+        calidad_gr = generar_reporte_calidad(df_gr, 'Goodreads', modo_calidad)
+        calidad_gb = generar_reporte_calidad(df_gb, 'Google Books', modo_calidad)
+        anotar_hash_contenido(df_gr, df_gb)
 
     # 2. Crear modelo canónico (para detalle de fuente)
-    df_detalle_fuente_raw = crear_modelo_canonico(df_gr, df_gb)
+    with etapa('crear_modelo_canonico', filas=len(df_gr)):
+        df_detalle_fuente_raw = crear_modelo_canonico(df_gr, df_gb)
+
+    if motor == 'arrow':
+        ejecutar_motor_arrow(df_detalle_fuente_raw, [calidad_gr, calidad_gb])
+        print("Pipeline de integración finalizado con éxito.")
+        return
 
     # 3. Normalizar y aplicar verificaciones de calidad
-    df_procesado = normalizar_y_verificar_calidad(df_detalle_fuente_raw)
+    with etapa('normalizar_y_verificar_calidad', filas=len(df_detalle_fuente_raw)):
+        df_procesado = normalizar_y_verificar_calidad(df_detalle_fuente_raw)
 
     # 4. Generar book_id
-    df_con_id = generar_book_id(df_procesado)
+    with etapa('generar_book_id', filas=len(df_procesado)):
+        df_con_id = generar_book_id(df_procesado)
     
     # El dataframe procesado es nuestro book_source_detail
     book_source_detail = df_con_id.copy()
 
     # 5. Deduplicar y seleccionar ganador para dim_book
-    df_ganador = deduplicar_y_seleccionar_ganador(df_con_id)
+    with etapa('deduplicar_y_seleccionar_ganador', filas=len(df_con_id)):
+        df_ganador = deduplicar_y_seleccionar_ganador(df_con_id)
 
     # 6. Crear tabla dimensional final
-    dim_book = crear_dim_book(df_ganador)
+    with etapa('crear_dim_book', filas=len(df_ganador)):
+        dim_book = crear_dim_book(df_ganador)
 
     # 7. Generar artefactos finales
     reporte_calidad_final = {
@@ -239,9 +721,40 @@ def main():
         'duplicados_encontrados': int(df_con_id.duplicated('book_id').sum()),
         'total_libros_en_dimension': len(dim_book)
     }
-    generar_artefactos(dim_book, book_source_detail, reporte_calidad_final)
+    with etapa('generar_artefactos', filas=len(book_source_detail)):
+        generar_artefactos(dim_book, book_source_detail, reporte_calidad_final)
     
     print("Pipeline de integración finalizado con éxito.")
 
+# Pasos 3-7 del pipeline con el motor Arrow, sobre una tabla de pyarrow en lugar de un DataFrame
+def ejecutar_motor_arrow(df_detalle_fuente_raw, reportes_fuentes):
+    filas = len(df_detalle_fuente_raw)
+
+    # 3-4. Normalizar y generar book_id
+    with etapa('normalizar_y_verificar_calidad', filas=filas):
+        tabla_procesada = normalizar_y_verificar_calidad_arrow(pa.Table.from_pandas(df_detalle_fuente_raw, preserve_index=False))
+    with etapa('generar_book_id', filas=filas):
+        tabla_con_id = generar_book_id_arrow(tabla_procesada)
+
+    # 5-6. Deduplicar y crear la tabla dimensional
+    with etapa('deduplicar_y_seleccionar_ganador', filas=filas):
+        tabla_ganador = deduplicar_y_seleccionar_ganador_arrow(tabla_con_id)
+    with etapa('crear_dim_book', filas=tabla_ganador.num_rows):
+        tabla_dim = crear_dim_book_arrow(tabla_ganador)
+
+    # 7. Generar artefactos finales
+    with etapa('generar_artefactos', filas=filas):
+        guardar_dim_book(tabla_dim)
+        guardar_detalle_fuente(tabla_con_id)
+        guardar_indice_libros()
+    print("Guardados dim_book.parquet y book_source_detail.parquet")
+
+    reporte_calidad_final = {
+        'fuentes': reportes_fuentes,
+        'duplicados_encontrados': tabla_con_id.num_rows - pc.count_distinct(tabla_con_id.column('book_id'), mode='all').as_py(),
+        'total_libros_en_dimension': tabla_dim.num_rows
+    }
+    guardar_documentacion(reporte_calidad_final)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
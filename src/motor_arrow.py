@@ -0,0 +1,201 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from utils_book_id import COLUMNAS_CLAVE_HASH, NUM_PROCESOS_HASH_DEFAULT, hashear_claves_lote
+from utils_isbn import formatear_isbn10_arrow, formatear_isbn13_arrow
+from utils_quality import (
+    validar_fecha_arrow, validar_codigo_idioma_arrow, validar_codigo_moneda_arrow, limpiar_string_arrow
+)
+
+# Motor Arrow: las mismas transformaciones que normalizar_y_verificar_calidad, generar_book_id y
+# deduplicar_y_seleccionar_ganador (integrate_pipeline.py) sobre tablas de pyarrow con kernels de pyarrow.compute.
+# El resultado es idéntico al del motor pandas, incluidos los tipos de columna y los metadatos de pandas
+
+# --- CONFIGURACIÓN ---
+# Los kernels de pyarrow.compute liberan el GIL, así que la tabla se normaliza por bloques en varios hilos
+NUM_HILOS_ARROW = pa.cpu_count()
+FILAS_POR_TAREA_ARROW = 100_000
+# Patrón de titulo_normalizado; el motor pandas también lo evalúa con RE2, porque sus columnas de texto son de Arrow
+PATRON_NO_ALFANUMERICO = r'[^a-z0-9\s]'
+
+# Convierte una columna en un array large_string. Los valores que no son texto pasan a nulos, o a su str()
+# con numeros_a_texto (como .map(str) en pandas), que se calcula una vez por valor distinto
+def _texto(columna, numeros_a_texto=False):
+    if isinstance(columna, pa.ChunkedArray):
+        columna = columna.combine_chunks()
+    if pa.types.is_string(columna.type) or pa.types.is_large_string(columna.type):
+        return columna.cast(pa.large_string())
+    if not numeros_a_texto or columna.null_count == len(columna):
+        return pa.nulls(len(columna), pa.large_string())
+    codificado = pc.dictionary_encode(columna)
+    unicos = [str(valor) for valor in codificado.dictionary.to_numpy(zero_copy_only=False)]
+    return pa.array(unicos, type=pa.large_string()).take(codificado.indices)
+
+# pandas guarda como objetos (tipo null en Arrow) las columnas de texto calculadas que no tienen ningún valor,
+# y las listas de autores como listas de nulos si todas están vacías
+def _como_pandas(arreglo):
+    if pa.types.is_list(arreglo.type):
+        return pa.ListArray.from_arrays(arreglo.offsets, pa.nulls(0)) if len(arreglo.values) == 0 else arreglo
+    return pa.nulls(len(arreglo)) if arreglo.null_count == len(arreglo) else arreglo
+
+# Separa la lista de autores igual que str(x).split(',') con limpiar_string en cada autor; los nulos dan una lista vacía
+def _autores(fuente):
+    nulos = pc.is_null(fuente)
+    partes = pc.split_pattern(pc.fill_null(fuente, ''), ',')
+    conservar = pc.invert(nulos).take(pc.list_parent_indices(partes))
+    autores = limpiar_string_arrow(pc.list_flatten(partes)).filter(conservar).cast(pa.string())
+    longitudes = pc.if_else(nulos, 0, pc.list_value_length(partes)).cast(pa.int32())
+    offsets = pa.concat_arrays([pa.array([0], pa.int32()), pc.cumulative_sum(longitudes)])
+    autor_principal = pc.if_else(nulos, pa.scalar(None, pa.large_string()), limpiar_string_arrow(pc.list_element(partes, 0)))
+    return pa.ListArray.from_arrays(offsets, autores), autor_principal
+
+# Año de una fecha ISO (YYYY-MM-DD), como pd.to_datetime(...).dt.year
+def _anio(fecha):
+    return pc.list_element(pc.split_pattern(fecha, '-', max_splits=1), 0).cast(pa.int64())
+
+# Normaliza un bloque de filas; devuelve las columnas nuevas en el mismo orden que el motor pandas
+def _normalizar_bloque(tabla):
+    columnas = {}
+
+    # Limpieza y validación de ISBN
+    columnas['isbn13_limpio'] = formatear_isbn13_arrow(pc.coalesce(_texto(tabla['isbn13_gr']), _texto(tabla['isbn13_gb'])))
+    columnas['isbn10_limpio'] = formatear_isbn10_arrow(pc.coalesce(_texto(tabla['isbn10_gr']), _texto(tabla['isbn10_gb'])))
+
+    # Normalización de fecha (los valores no nulos se validan como texto)
+    columnas['fecha_pub_iso'] = validar_fecha_arrow(_texto(tabla['fecha_pub_gb'], numeros_a_texto=True))
+    columnas['anio_pub'] = _anio(columnas['fecha_pub_iso'])
+
+    # Validación de idioma y moneda
+    columnas['codigo_idioma'] = validar_codigo_idioma_arrow(_texto(tabla['idioma_gb']))
+    columnas['codigo_moneda'] = validar_codigo_moneda_arrow(_texto(tabla['moneda_gb']))
+
+    # Limpieza de cadenas
+    columnas['titulo'] = limpiar_string_arrow(pc.coalesce(_texto(tabla['titulo_gb']), _texto(tabla['titulo_gr'])))
+    columnas['titulo_normalizado'] = limpiar_string_arrow(
+        pc.replace_substring_regex(pc.utf8_lower(columnas['titulo']), PATRON_NO_ALFANUMERICO, '')
+    )
+
+    # Normalización de autor
+    columnas['autores'], columnas['autor_principal'] = _autores(
+        pc.coalesce(_texto(tabla['autores_gb'], numeros_a_texto=True), _texto(tabla['autor_gr'], numeros_a_texto=True))
+    )
+
+    # Editorial (las columnas que no son de texto se conservan tal cual, como con limpiar_string)
+    editorial = tabla['editorial_gb'].combine_chunks()
+    es_texto = pa.types.is_string(editorial.type) or pa.types.is_large_string(editorial.type)
+    columnas['editorial'] = limpiar_string_arrow(editorial.cast(pa.large_string())) if es_texto else editorial
+
+    return columnas
+
+# Reparte la tabla en bloques de FILAS_POR_TAREA_ARROW filas y aplica la función a cada uno en un hilo
+def _por_bloques(funcion, tabla, num_hilos):
+    bloques = [tabla.slice(inicio, FILAS_POR_TAREA_ARROW) for inicio in range(0, tabla.num_rows, FILAS_POR_TAREA_ARROW)]
+    if num_hilos <= 1 or len(bloques) <= 1:
+        return [funcion(bloque) for bloque in bloques]
+    with ThreadPoolExecutor(max_workers=num_hilos) as executor:
+        return list(executor.map(funcion, bloques))
+
+# Pone a la tabla los metadatos de pandas de la original (las operaciones de pyarrow sobre columnas los descartan),
+# con entradas nuevas para las columnas que no las tienen: las que tendrían si pandas hubiera creado la columna
+def _con_metadatos_pandas(tabla, original, renombradas=None):
+    renombradas = renombradas or {}
+    metadatos_originales = original.schema.metadata or {}
+    if b'pandas' not in metadatos_originales:
+        return tabla
+    metadatos = json.loads(metadatos_originales[b'pandas'])
+    entradas = {renombradas.get(entrada['name'], entrada['name']): entrada for entrada in metadatos['columns']}
+
+    muestras = {}
+    for campo in tabla.schema:
+        if campo.name in entradas:
+            continue
+        if pa.types.is_large_string(campo.type):
+            muestras[campo.name] = pd.Series(['x'], dtype='str')
+        elif pa.types.is_string(campo.type):
+            muestras[campo.name] = pd.Series(['x'], dtype=object)
+        elif pa.types.is_int64(campo.type):
+            muestras[campo.name] = pd.Series([1], dtype='Int64')
+        elif pa.types.is_list(campo.type):
+            muestras[campo.name] = pd.Series([[]] if pa.types.is_null(campo.type.value_type) else [['x']])
+        else:
+            muestras[campo.name] = pa.nulls(1, campo.type).to_pandas()
+    if muestras:
+        nuevas = json.loads(pa.Schema.from_pandas(pd.DataFrame(muestras), preserve_index=False).metadata[b'pandas'])
+        entradas.update({entrada['name']: entrada for entrada in nuevas['columns']})
+
+    metadatos['columns'] = [
+        dict(entradas[nombre], name=nombre, field_name=nombre) for nombre in tabla.column_names
+    ]
+    return tabla.replace_schema_metadata({**metadatos_originales, b'pandas': json.dumps(metadatos).encode('utf-8')})
+
+# Añade o sustituye columnas al final de la tabla, con sus metadatos de pandas
+def agregar_columnas(tabla, columnas):
+    resultado = tabla
+    for nombre, columna in columnas.items():
+        if nombre in resultado.column_names:
+            resultado = resultado.drop_columns([nombre])
+        resultado = resultado.append_column(nombre, columna)
+    return _con_metadatos_pandas(resultado, tabla)
+
+# Selecciona y renombra columnas conservando sus metadatos de pandas
+def seleccionar_columnas(tabla, columnas, renombres):
+    resultado = tabla.select(columnas).rename_columns([renombres.get(nombre, nombre) for nombre in columnas])
+    return _con_metadatos_pandas(resultado, tabla, renombres)
+
+# Versión Arrow de normalizar_y_verificar_calidad: añade las mismas columnas, con los mismos valores y tipos
+def normalizar_y_verificar_calidad_arrow(tabla, num_hilos=NUM_HILOS_ARROW):
+    bloques = _por_bloques(_normalizar_bloque, tabla, num_hilos)
+    if not bloques:
+        bloques = [_normalizar_bloque(tabla)]
+
+    columnas = {}
+    for nombre in bloques[0]:
+        columna = pa.chunked_array([bloque[nombre] for bloque in bloques]).combine_chunks()
+        # Los resultados de los validadores y de autores sin ningún valor tienen otro tipo en pandas
+        if nombre not in ('anio_pub', 'titulo', 'titulo_normalizado', 'editorial'):
+            columna = _como_pandas(columna)
+        columnas[nombre] = columna
+    return agregar_columnas(tabla, columnas)
+
+# Texto de cada valor de una columna en la clave de fallback, igual que al formatear el valor de pandas:
+# 'nan' para los textos nulos, '<NA>' para los enteros nulos y 'None' en las columnas sin ningún valor
+def _texto_clave(columna):
+    if pa.types.is_null(columna.type):
+        return pc.fill_null(columna.cast(pa.large_string()), 'None')
+    if pa.types.is_integer(columna.type):
+        return pc.fill_null(columna.cast(pa.large_string()), '<NA>')
+    return pc.fill_null(_texto(columna, numeros_a_texto=True), 'nan')
+
+# Versión Arrow de generar_book_id: ISBN-13 o, si falta, el SHA-256 de la misma clave de fallback
+def generar_book_id_arrow(tabla, num_procesos=NUM_PROCESOS_HASH_DEFAULT):
+    isbn13 = tabla.column('isbn13_limpio').combine_chunks()
+    fallback = pc.is_null(isbn13)
+    filas_fallback = tabla.filter(fallback)
+    claves = pc.binary_join_element_wise(*[_texto_clave(filas_fallback.column(columna)) for columna in COLUMNAS_CLAVE_HASH], pa.scalar('', pa.large_string()))
+    hashes = pa.array(hashear_claves_lote(claves.to_pylist(), num_procesos), type=pa.large_string())
+
+    # Si ninguna fila tiene ISBN-13, pandas guarda los book_id como objetos (string en Arrow)
+    tipo = pa.string() if pa.types.is_null(isbn13.type) else pa.large_string()
+    book_id = pc.replace_with_mask(isbn13.cast(pa.large_string()), fallback, hashes) if len(hashes) else isbn13.cast(pa.large_string())
+    return agregar_columnas(tabla, {'book_id': book_id.cast(tipo)})
+
+# Versión Arrow de deduplicar_y_seleccionar_ganador: ordena por book_id y prioridad de la fuente
+# (con una ordenación estable, como pandas) y conserva el primer registro de cada book_id
+def deduplicar_y_seleccionar_ganador_arrow(tabla):
+    prioridad = pc.if_else(pc.is_null(tabla.column('fuente_gb')), 2, 1)
+    orden = pc.sort_indices(
+        pa.table({'book_id': tabla.column('book_id'), 'prioridad': prioridad}),
+        sort_keys=[('book_id', 'ascending'), ('prioridad', 'ascending')]
+    )
+    tabla = tabla.take(orden)
+
+    book_ids = tabla.column('book_id').combine_chunks()
+    primero = pa.concat_arrays([
+        pa.array([True] * min(len(book_ids), 1)),
+        pc.not_equal(book_ids[1:], book_ids[:-1]),
+    ])
+    return tabla.filter(primero)
@@ -0,0 +1,238 @@
+import hashlib
+import importlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import enrich_googlebooks
+import integrate_pipeline
+import scrape_goodreads
+from utils_landing import RUTA_LANDING_GOODREADS, RUTA_LANDING_GOOGLE_BOOKS
+
+# --- CONFIGURACIÓN ---
+RUTA_ESTADO_ORQUESTADOR = os.path.join('landing', 'estado_orquestador.json') # Huella de la última ejecución de cada etapa
+MAX_ETAPAS_PARALELAS = 2 # Etapas independientes que pueden ejecutarse a la vez
+# La web cambia aunque la configuración no lo haga: pasado este tiempo la extracción se repite. None la desactiva
+CADUCIDAD_EXTRACCION = 7 * 24 * 3600
+TAMANO_BLOQUE_HASH = 1 << 20
+
+RUTA_GOODREADS = RUTA_LANDING_GOODREADS
+RUTA_GOOGLE_BOOKS = RUTA_LANDING_GOOGLE_BOOKS
+
+# Nodo del DAG. La huella de una etapa resume su código, su configuración y el contenido de sus entradas;
+# si coincide con la de la última ejecución correcta y sus salidas existen, la etapa se omite
+class Etapa:
+    def __init__(self, nombre, funcion, dependencias=(), entradas=(), salidas=(), modulos=(), configuracion=None, caducidad=None):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.dependencias = tuple(dependencias)
+        self.entradas = tuple(entradas) # Archivos o directorios que lee la etapa
+        self.salidas = tuple(salidas) # Archivos o directorios que debe dejar escritos
+        self.modulos = tuple(modulos) # Módulos cuyo código y constantes de configuración forman parte de la huella
+        self.configuracion = configuracion or {}
+        self.caducidad = caducidad # Segundos tras los que la etapa se repite aunque su huella no cambie
+
+# Constantes de configuración (nombres en mayúsculas) de un módulo, serializables para la huella
+def configuracion_modulo(modulo):
+    return {nombre: valor for nombre, valor in sorted(vars(modulo).items()) if nombre.isupper()}
+
+# Representación estable de los valores que json no sabe serializar: los conjuntos se ordenan
+# (su orden de iteración cambia entre procesos) y el resto se representa con repr
+def _serializar(valor):
+    if isinstance(valor, (set, frozenset)):
+        return sorted(valor, key=repr)
+    return repr(valor)
+
+# Hash SHA-256 de un archivo, reutilizando el guardado si ni el tamaño ni la fecha de modificación han cambiado
+def huella_archivo(ruta, cache_huellas):
+    info = os.stat(ruta)
+    previa = cache_huellas.get(ruta)
+    if previa and previa['tamano'] == info.st_size and previa['mtime_ns'] == info.st_mtime_ns:
+        return previa['hash']
+    sha256 = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_BLOQUE_HASH), b''):
+            sha256.update(bloque)
+    cache_huellas[ruta] = {'tamano': info.st_size, 'mtime_ns': info.st_mtime_ns, 'hash': sha256.hexdigest()}
+    return cache_huellas[ruta]['hash']
+
+# Huella del contenido de una entrada: un archivo, todos los archivos de un directorio, o None si no existe
+def huella_entrada(ruta, cache_huellas):
+    if os.path.isfile(ruta):
+        return huella_archivo(ruta, cache_huellas)
+    if not os.path.isdir(ruta):
+        return None
+    archivos = sorted(os.path.join(raiz, nombre) for raiz, _, nombres in os.walk(ruta) for nombre in nombres)
+    return hashlib.sha256(''.join(f"{os.path.relpath(a, ruta)}:{huella_archivo(a, cache_huellas)};" for a in archivos).encode('utf-8')).hexdigest()
+
+# Huella completa de una etapa: código y configuración de sus módulos, configuración propia y entradas
+def huella_etapa(etapa, cache_huellas):
+    componentes = {'etapa': etapa.nombre, 'configuracion': etapa.configuracion, 'modulos': {}, 'entradas': {}}
+    for nombre_modulo in etapa.modulos:
+        modulo = importlib.import_module(nombre_modulo)
+        componentes['modulos'][nombre_modulo] = {
+            'codigo': huella_archivo(modulo.__file__, cache_huellas),
+            'configuracion': configuracion_modulo(modulo),
+        }
+    for ruta in etapa.entradas:
+        componentes['entradas'][ruta] = huella_entrada(ruta, cache_huellas)
+    serializado = json.dumps(componentes, sort_keys=True, ensure_ascii=False, default=_serializar)
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+def cargar_estado(ruta):
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {'etapas': {}, 'archivos': {}}
+
+# Guarda el estado de forma atómica, para que una ejecución interrumpida no deje un JSON a medias
+def guardar_estado(estado, ruta):
+    directorio = os.path.dirname(ruta) or '.'
+    os.makedirs(directorio, exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=4, ensure_ascii=False)
+    os.replace(ruta_temporal, ruta)
+
+# Comprueba que las dependencias existen y que el grafo no tiene ciclos; devuelve las etapas por nombre
+def validar_dag(etapas):
+    por_nombre = {etapa.nombre: etapa for etapa in etapas}
+    for etapa in etapas:
+        for dependencia in etapa.dependencias:
+            if dependencia not in por_nombre:
+                raise ValueError(f"La etapa '{etapa.nombre}' depende de una etapa desconocida: '{dependencia}'.")
+
+    visitadas, en_curso = set(), set()
+    def visitar(nombre):
+        if nombre in en_curso:
+            raise ValueError(f"El DAG tiene un ciclo que pasa por la etapa '{nombre}'.")
+        if nombre not in visitadas:
+            en_curso.add(nombre)
+            for dependencia in por_nombre[nombre].dependencias:
+                visitar(dependencia)
+            en_curso.discard(nombre)
+            visitadas.add(nombre)
+    for nombre in por_nombre:
+        visitar(nombre)
+    return por_nombre
+
+# Decide si una etapa está al día: misma huella que la última ejecución correcta, salidas presentes y sin caducar
+def etapa_al_dia(etapa, huella, estado_etapa):
+    if not estado_etapa or estado_etapa.get('huella') != huella:
+        return False
+    if not all(os.path.exists(salida) for salida in etapa.salidas):
+        return False
+    return etapa.caducidad is None or time.time() - estado_etapa['fecha'] < etapa.caducidad
+
+# Ejecuta el DAG: cada etapa arranca en cuanto terminan sus dependencias, y las que están listas a la vez
+# se ejecutan en paralelo. La huella se calcula justo antes de ejecutar, cuando las entradas ya están escritas.
+# Si una etapa falla, las que dependen de ella se cancelan. Devuelve el resultado de cada etapa
+def ejecutar_dag(etapas, forzar=(), max_paralelas=MAX_ETAPAS_PARALELAS, ruta_estado=RUTA_ESTADO_ORQUESTADOR):
+    por_nombre = validar_dag(etapas)
+    for nombre in forzar:
+        if nombre not in por_nombre:
+            raise ValueError(f"Etapa desconocida: '{nombre}'. Opciones: {', '.join(por_nombre)}.")
+
+    estado = cargar_estado(ruta_estado)
+    resultados = {}
+    pendientes = dict(por_nombre)
+
+    # Cada etapa recibe una copia de las huellas de archivos conocidas y devuelve las que ha calculado;
+    # solo el hilo principal modifica el estado
+    def preparar_y_ejecutar(etapa, cache_huellas, estado_etapa):
+        huella = huella_etapa(etapa, cache_huellas)
+        if etapa.nombre not in forzar and etapa_al_dia(etapa, huella, estado_etapa):
+            print(f"Etapa '{etapa.nombre}' omitida: sus entradas no han cambiado.")
+            return 'omitida', huella, 0.0, cache_huellas
+        print(f"Ejecutando etapa '{etapa.nombre}'...")
+        inicio = time.perf_counter()
+        etapa.funcion()
+        faltantes = [salida for salida in etapa.salidas if not os.path.exists(salida)]
+        if faltantes:
+            raise RuntimeError(f"la etapa no generó {', '.join(faltantes)}")
+        return 'ejecutada', huella, time.perf_counter() - inicio, cache_huellas
+
+    with ThreadPoolExecutor(max_workers=max_paralelas) as executor:
+        en_curso = {}
+        while pendientes or en_curso:
+            for nombre, etapa in list(pendientes.items()):
+                estados_dependencias = [resultados.get(d) for d in etapa.dependencias]
+                if any(e in ('fallida', 'cancelada') for e in estados_dependencias):
+                    print(f"Etapa '{nombre}' cancelada: falló una de sus dependencias.")
+                    resultados[nombre] = 'cancelada'
+                    del pendientes[nombre]
+                elif all(e in ('omitida', 'ejecutada') for e in estados_dependencias):
+                    futuro = executor.submit(preparar_y_ejecutar, etapa, dict(estado['archivos']), estado['etapas'].get(nombre))
+                    en_curso[futuro] = nombre
+                    del pendientes[nombre]
+            if not en_curso:
+                continue
+
+            terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in terminadas:
+                nombre = en_curso.pop(futuro)
+                try:
+                    resultado, huella, segundos, cache_huellas = futuro.result()
+                except Exception as e:
+                    print(f"Etapa '{nombre}' fallida: {e}")
+                    resultados[nombre] = 'fallida'
+                    estado['etapas'].pop(nombre, None)
+                else:
+                    resultados[nombre] = resultado
+                    estado['archivos'].update(cache_huellas)
+                    if resultado == 'ejecutada':
+                        estado['etapas'][nombre] = {'huella': huella, 'fecha': time.time(), 'segundos': round(segundos, 3)}
+                guardar_estado(estado, ruta_estado)
+    return resultados
+
+# Grafo del pipeline: extracción → enriquecimiento → integración, con el mantenimiento de las cachés
+# en etapas aparte que se ejecutan en paralelo con la etapa siguiente
+def construir_dag(motor=None, modo_streaming=None, modo_incremental=None, modo_calidad=None):
+    opciones_integracion = {
+        'motor': motor or integrate_pipeline.MOTOR_DEFAULT,
+        'modo_streaming': integrate_pipeline.MODO_STREAMING_DEFAULT if modo_streaming is None else modo_streaming,
+        'modo_incremental': integrate_pipeline.MODO_INCREMENTAL_DEFAULT if modo_incremental is None else modo_incremental,
+        'modo_calidad': modo_calidad or integrate_pipeline.MODO_CALIDAD_DEFAULT,
+    }
+    modulos_red = ('utils_rate_limit', 'utils_checkpoint', 'utils_landing')
+    modulos_integracion = (
+        'integrate_pipeline', 'motor_arrow', 'utils_isbn', 'utils_matching', 'utils_book_id',
+        'utils_quality', 'utils_streaming', 'utils_parquet', 'utils_landing', 'indice_libros'
+    )
+
+    return [
+        Etapa('extraer', lambda: scrape_goodreads.main(desalojar_cache=False),
+              salidas=[RUTA_GOODREADS], modulos=('scrape_goodreads', 'parse_goodreads', 'utils_cache_http') + modulos_red,
+              caducidad=CADUCIDAD_EXTRACCION),
+        Etapa('desalojar_cache_http', scrape_goodreads.desalojar_cache_http,
+              dependencias=['extraer'], entradas=[RUTA_GOODREADS]),
+        Etapa('enriquecer', lambda: enrich_googlebooks.main(purgar_cache=False),
+              dependencias=['extraer'], entradas=[RUTA_GOODREADS], salidas=[RUTA_GOOGLE_BOOKS],
+              modulos=('enrich_googlebooks', 'utils_cache_consultas') + modulos_red),
+        Etapa('purgar_cache_consultas', enrich_googlebooks.purgar_cache_consultas,
+              dependencias=['enriquecer'], entradas=[RUTA_GOOGLE_BOOKS]),
+        Etapa('integrar', lambda: integrate_pipeline.main(**opciones_integracion),
+              dependencias=['enriquecer'], entradas=[RUTA_GOODREADS, RUTA_GOOGLE_BOOKS],
+              salidas=[integrate_pipeline.RUTA_DIM_BOOK, integrate_pipeline.RUTA_DETALLE_FUENTE, integrate_pipeline.RUTA_INDICE_LIBROS,
+                       os.path.join('docs', 'quality_metrics.json')],
+              modulos=modulos_integracion, configuracion=opciones_integracion),
+    ]
+
+# Ejecuta el pipeline completo. Las etapas indicadas en forzar se ejecutan aunque estén al día
+def main(forzar=(), **opciones_integracion):
+    print("Iniciando orquestador del pipeline...")
+    resultados = ejecutar_dag(construir_dag(**opciones_integracion), forzar=forzar)
+    resumen = ', '.join(f"{nombre}: {resultado}" for nombre, resultado in resultados.items())
+    if any(resultado in ('fallida', 'cancelada') for resultado in resultados.values()):
+        print(f"El pipeline terminó con errores ({resumen}).")
+        return False
+    print(f"Pipeline finalizado ({resumen}).")
+    return True
+
+if __name__ == "__main__":
+    # Los argumentos son nombres de etapas que se quieren repetir aunque estén al día
+    sys.exit(0 if main(forzar=sys.argv[1:]) else 1)
@@ -0,0 +1,122 @@
+import lxml.html
+import json
+import re
+# BeautifulSoup solo lo usan las versiones de referencia (*_bs4) y se importa dentro de ellas: el scraper
+# y sus procesos de parseo arrancan sin cargarlo
+
+# Expresiones precompiladas del camino rápido
+PATRON_JSON_LD = re.compile(
+    r'<script\b[^>]*?\btype\s*=\s*(["\'])application/ld\+json\1[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+PATRON_ISBN_TEXTO = re.compile(r'ISBN(?:13)?:?\s*(\d{10,13})')
+PATRON_RATING = re.compile(r'(\d\.\d+)')
+PATRON_CONTEO_RATINGS = re.compile(r'(\d{1,3}(?:,\d{3})*)\s+ratings')
+
+XPATH_CONTENEDORES = '//tr[@itemtype="http://schema.org/Book"]'
+XPATH_TITULO = './/a[contains(concat(" ", normalize-space(@class), " "), " bookTitle ")]'
+XPATH_AUTOR = './/a[contains(concat(" ", normalize-space(@class), " "), " authorName ")]'
+XPATH_RATING = './/span[contains(concat(" ", normalize-space(@class), " "), " minirating ")]'
+
+# Interpreta el texto del script JSON-LD y, si no trae ISBN, busca el ISBN en el HTML completo.
+# Lo comparten el camino rápido y el de BeautifulSoup para que ambos den exactamente el mismo resultado
+def _interpretar_isbn(texto_json_ld, html, url_libro):
+    isbn10 = None
+    isbn13 = None
+
+    try:
+        # Prioriza el script JSON-LD para datos estructurados
+        if texto_json_ld is not False:
+            datos_json = json.loads(texto_json_ld)
+            if 'isbn' in datos_json:
+                isbn13 = datos_json.get('isbn')
+
+        # Fallback a regex en el contenido de la página si JSON-LD falla
+        if not isbn13:
+            coincidencia_isbn = PATRON_ISBN_TEXTO.search(html)
+            if coincidencia_isbn:
+                isbn_encontrado = coincidencia_isbn.group(1)
+                if len(isbn_encontrado) == 13:
+                    isbn13 = isbn_encontrado
+                elif len(isbn_encontrado) == 10:
+                    isbn10 = isbn_encontrado
+    except Exception as e:
+        print(f"Ocurrió un error inesperado al analizar los detalles del libro desde {url_libro}: {e}")
+
+    return isbn10, isbn13
+
+# Extrae el ISBN10 e ISBN13 del HTML de detalle localizando el JSON-LD con una expresión regular, sin construir el árbol
+def extraer_isbn_de_html(html, url_libro):
+    coincidencia = PATRON_JSON_LD.search(html)
+    # False indica "no hay script", para distinguirlo de un script vacío
+    texto_json_ld = coincidencia.group(2) if coincidencia else False
+    return _interpretar_isbn(texto_json_ld, html, url_libro)
+
+# Versión de referencia con BeautifulSoup de extraer_isbn_de_html
+def extraer_isbn_de_html_bs4(html, url_libro):
+    from bs4 import BeautifulSoup
+    sopa = BeautifulSoup(html, 'lxml')
+    etiqueta_script = sopa.find('script', type='application/ld+json')
+    texto_json_ld = etiqueta_script.string if etiqueta_script else False
+    return _interpretar_isbn(texto_json_ld, html, url_libro)
+
+# Construye el registro de búsqueda de un libro a partir de los textos ya extraídos
+def _construir_datos_busqueda(titulo, autor, texto_rating, href, url_base):
+    coincidencia_rating = PATRON_RATING.search(texto_rating)
+    coincidencia_conteo_ratings = PATRON_CONTEO_RATINGS.search(texto_rating)
+
+    return {
+        "title": titulo,
+        "author": autor,
+        "rating": float(coincidencia_rating.group(1)) if coincidencia_rating else None,
+        "ratings_count": int(coincidencia_conteo_ratings.group(1).replace(',', '')) if coincidencia_conteo_ratings else None,
+        "book_url": url_base + href,
+    }
+
+# Equivalente a get_text(strip=True) de BeautifulSoup sobre un elemento de lxml
+def _texto_limpio(elemento):
+    return ''.join(fragmento.strip() for fragmento in elemento.xpath('.//text()'))
+
+# Parsea una página de búsqueda con lxml y XPath.
+# Devuelve el número de contenedores de libro encontrados y los libros que tienen título, autor y rating
+def parsear_pagina_busqueda(html, url_base):
+    arbol = lxml.html.fromstring(html)
+    contenedores = arbol.xpath(XPATH_CONTENEDORES)
+
+    libros = []
+    for contenedor in contenedores:
+        etiquetas_titulo = contenedor.xpath(XPATH_TITULO)
+        etiquetas_autor = contenedor.xpath(XPATH_AUTOR)
+        etiquetas_rating = contenedor.xpath(XPATH_RATING)
+        if not (etiquetas_titulo and etiquetas_autor and etiquetas_rating):
+            continue
+        libros.append(_construir_datos_busqueda(
+            _texto_limpio(etiquetas_titulo[0]),
+            _texto_limpio(etiquetas_autor[0]),
+            _texto_limpio(etiquetas_rating[0]),
+            etiquetas_titulo[0].get('href'),
+            url_base
+        ))
+    return len(contenedores), libros
+
+# Versión de referencia con BeautifulSoup de parsear_pagina_busqueda
+def parsear_pagina_busqueda_bs4(html, url_base):
+    from bs4 import BeautifulSoup
+    sopa = BeautifulSoup(html, 'lxml')
+    contenedores = sopa.find_all('tr', itemtype='http://schema.org/Book')
+
+    libros = []
+    for contenedor in contenedores:
+        etiqueta_titulo = contenedor.find('a', class_='bookTitle')
+        etiqueta_autor = contenedor.find('a', class_='authorName')
+        etiqueta_rating = contenedor.find('span', class_='minirating')
+        if not (etiqueta_titulo and etiqueta_autor and etiqueta_rating):
+            continue
+        libros.append(_construir_datos_busqueda(
+            etiqueta_titulo.get_text(strip=True),
+            etiqueta_autor.get_text(strip=True),
+            etiqueta_rating.get_text(strip=True),
+            etiqueta_titulo['href'],
+            url_base
+        ))
+    return len(contenedores), libros
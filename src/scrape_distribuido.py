@@ -0,0 +1,202 @@
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import scrape_goodreads
+import utils_rate_limit
+from parse_goodreads import extraer_isbn_de_html, parsear_pagina_busqueda
+from scrape_goodreads import HEADERS_DEFAULT, LIBROS_POR_PAGINA, construir_registro_libro, obtener_url
+from utils_cola_trabajo import COMPLETADA, DURACION_LEASE_DEFAULT, MAX_INTENTOS_DEFAULT, ColaTrabajo
+from utils_landing import ESQUEMA_LANDING_GOODREADS, RUTA_LANDING_GOODREADS, EscritorLanding
+from utils_metricas import etapa, instrumentar
+
+# --- CONFIGURACIÓN ---
+# Consultas del rastreo distribuido y libros que se extraen de cada una
+CONSULTAS_DEFAULT = ["data science", "machine learning", "statistics", "python programming"]
+LIBROS_POR_CONSULTA_DEFAULT = 100
+
+# Procesos trabajadores que se lanzan en esta máquina. Otras máquinas pueden sumarse con la acción 'trabajar'
+# si ven la cola en un sistema de archivos compartido
+NUM_TRABAJADORES_DEFAULT = 4
+# Máquinas que procesan la misma cola. La tasa por host se reparte entre num_trabajadores * num_maquinas procesos;
+# cada máquina solo ve sus trabajadores, así que con varias máquinas hay que indicarlo para no multiplicar la tasa
+NUM_MAQUINAS_DEFAULT = 1
+RUTA_COLA = os.path.join("landing", "cola_scraping.sqlite")
+DURACION_LEASE = DURACION_LEASE_DEFAULT
+MAX_INTENTOS = MAX_INTENTOS_DEFAULT
+ESPERA_SIN_TAREAS = 2.0 # Segundos entre comprobaciones cuando todas las tareas abiertas son de otros trabajadores
+
+TIPO_BUSQUEDA = 'busqueda'
+TIPO_DETALLE = 'detalle'
+ACCIONES = ('completo', 'sembrar', 'trabajar', 'fusionar')
+
+# Clave de orden de un libro en la salida: consulta, página y posición en la página
+def clave_orden(indice_consulta, pagina, posicion):
+    return f"{indice_consulta:06d}.{pagina:06d}.{posicion:04d}"
+
+# URL de la página de detalle de un libro sin consulta ni fragmento. Los enlaces de la búsqueda llevan parámetros
+# propios de cada resultado (from_search, qid, rank...), así que sin ellos el mismo libro sería otra tarea
+def url_canonica_libro(url):
+    partes = urlsplit(url)
+    return urlunsplit((partes.scheme, partes.netloc, partes.path, '', ''))
+
+# Añade a la cola las páginas de búsqueda que cubren libros_por_consulta libros de cada consulta. Si la cola
+# tiene trabajo abierto, se reanuda ese rastreo. Una cola terminada y sin fusionar se rechaza, porque sus tareas
+# no se volverían a descargar y fusionar mezclaría sus libros con los nuevos; con reiniciar se borra y se empieza de cero
+def sembrar(consultas=CONSULTAS_DEFAULT, libros_por_consulta=LIBROS_POR_CONSULTA_DEFAULT, ruta_cola=RUTA_COLA, reiniciar=False):
+    url_base = scrape_goodreads.URL_BASE_GOODREADS
+    tareas = []
+    for indice_consulta, consulta in enumerate(consultas):
+        url_busqueda = f"{url_base}/search?q={consulta.replace(' ', '+')}"
+        for pagina in range(1, -(-libros_por_consulta // LIBROS_POR_PAGINA) + 1):
+            datos = {'consulta': indice_consulta, 'pagina': pagina, 'limite': libros_por_consulta}
+            tareas.append((f"{url_busqueda}&page={pagina}", TIPO_BUSQUEDA, datos, None))
+    cola = ColaTrabajo(ruta_cola)
+    estados = cola.contar_estados()
+    if estados and reiniciar:
+        print(f"Reiniciando la cola '{ruta_cola}' (tareas por estado: {estados}).")
+        cola.eliminar()
+        cola = ColaTrabajo(ruta_cola)
+    elif estados and not cola.hay_trabajo_abierto():
+        cola.cerrar()
+        raise ValueError(f"La cola '{ruta_cola}' contiene un rastreo terminado sin fusionar ({estados}). "
+                         "Ejecuta 'fusionar' o vuelve a sembrar con reiniciar.")
+    elif estados:
+        print(f"La cola '{ruta_cola}' tiene trabajo abierto ({estados}); se reanuda ese rastreo.")
+    cola.agregar(tareas)
+    cola.cerrar()
+    print(f"Cola '{ruta_cola}' sembrada con {len(tareas)} páginas de búsqueda de {len(consultas)} consultas.")
+    return len(tareas)
+
+# Procesa una página de búsqueda: sus libros (hasta el límite de la consulta) pasan a la cola como páginas de
+# detalle. Un libro que ya está en la cola por otra consulta no se vuelve a descargar
+def procesar_busqueda(cola, tarea, trabajador, limitador=None):
+    url = tarea['url']
+    datos = tarea['datos']
+    respuesta = obtener_url(url, HEADERS_DEFAULT, limitador=limitador)
+    if not respuesta:
+        return False
+
+    partes = urlsplit(url)
+    _, libros_pagina = parsear_pagina_busqueda(respuesta.text, f"{partes.scheme}://{partes.netloc}")
+    primera_posicion = (datos['pagina'] - 1) * LIBROS_POR_PAGINA
+    nuevas = [
+        (url_canonica_libro(datos_busqueda['book_url']), TIPO_DETALLE, datos_busqueda,
+         clave_orden(datos['consulta'], datos['pagina'], posicion))
+        for posicion, datos_busqueda in enumerate(libros_pagina)
+        if primera_posicion + posicion < datos['limite']
+    ]
+    return cola.completar(url, trabajador, nuevas=nuevas)
+
+# Procesa una página de detalle: el resultado de la tarea es el registro completo del libro
+def procesar_detalle(cola, tarea, trabajador, limitador=None):
+    url = tarea['url']
+    respuesta = obtener_url(url, HEADERS_DEFAULT, limitador=limitador)
+    if not respuesta:
+        return False
+    isbn10, isbn13 = extraer_isbn_de_html(respuesta.text, url)
+    return cola.completar(url, trabajador, resultado=construir_registro_libro(tarea['datos'], isbn10, isbn13))
+
+# Reparte la tasa de cada host entre los trabajadores de todas las máquinas, para que juntos no la superen.
+# Cada máquina aplica su parte sin coordinarse con las demás, así que num_maquinas tiene que ser el real.
+# Devuelve copias escaladas de las tasas (por host y por defecto) sin tocar las de utils_rate_limit
+def repartir_tasa(num_trabajadores, num_maquinas=NUM_MAQUINAS_DEFAULT):
+    procesos = max(1, num_trabajadores * num_maquinas)
+    tasas_por_host = {
+        host: {clave: valor / procesos for clave, valor in tasas.items()}
+        for host, tasas in utils_rate_limit.TASAS_POR_HOST.items()
+    }
+    tasa_default = {clave: valor / procesos for clave, valor in utils_rate_limit.TASA_DEFAULT.items()}
+    return tasas_por_host, tasa_default
+
+# Bucle de un trabajador: reclama tareas hasta que no queda trabajo abierto. Mientras haya tareas en curso
+# de otros trabajadores se sigue esperando, porque pueden descubrir tareas nuevas o dejar caducar su lease
+def trabajar(ruta_cola=RUTA_COLA, trabajador=None, num_trabajadores=1, num_maquinas=NUM_MAQUINAS_DEFAULT):
+    trabajador = trabajador or f"{socket.gethostname()}:{os.getpid()}"
+    tasas_por_host, tasa_default = repartir_tasa(num_trabajadores, num_maquinas)
+    limitador = utils_rate_limit.LimitadorTasa(tasas_por_host=tasas_por_host, tasa_default=tasa_default)
+    procesadores = {TIPO_BUSQUEDA: procesar_busqueda, TIPO_DETALLE: procesar_detalle}
+    cola = ColaTrabajo(ruta_cola)
+    procesadas = 0
+    try:
+        while True:
+            tarea = cola.reclamar(trabajador, DURACION_LEASE, MAX_INTENTOS)
+            if tarea is None:
+                if not cola.hay_trabajo_abierto():
+                    break
+                time.sleep(ESPERA_SIN_TAREAS)
+                continue
+            try:
+                completada = procesadores[tarea['tipo']](cola, tarea, trabajador, limitador)
+            except Exception as error:
+                print(f"Error en el trabajador {trabajador} procesando {tarea['url']}: {error}")
+                completada = False
+            if not completada:
+                cola.fallar(tarea['url'], trabajador, MAX_INTENTOS)
+            procesadas += 1
+    finally:
+        cola.cerrar()
+    return procesadas
+
+# Lanza num_trabajadores procesos trabajadores en esta máquina y espera a que terminen
+def lanzar_trabajadores(num_trabajadores=NUM_TRABAJADORES_DEFAULT, ruta_cola=RUTA_COLA, num_maquinas=NUM_MAQUINAS_DEFAULT):
+    if num_trabajadores <= 1:
+        return trabajar(ruta_cola, None, 1, num_maquinas)
+    contexto = multiprocessing.get_context('spawn')
+    procesos = [
+        contexto.Process(target=trabajar, args=(ruta_cola, None, num_trabajadores, num_maquinas), name=f"trabajador-{i}")
+        for i in range(num_trabajadores)
+    ]
+    for proceso in procesos:
+        proceso.start()
+    for proceso in procesos:
+        proceso.join()
+
+# Fusiona los libros terminados de la cola en el archivo de Goodreads de la zona landing, en el orden de
+# las consultas y las páginas. Un libro cuya página de detalle no se pudo descargar queda sin ISBN, como en
+# el scraper secuencial. Si ya no queda trabajo abierto, la cola se borra: su resultado está en la salida y
+# el siguiente 'sembrar' empieza de cero. Devuelve el número de libros escritos
+def fusionar(ruta_cola=RUTA_COLA, ruta_salida=RUTA_LANDING_GOODREADS):
+    cola = ColaTrabajo(ruta_cola)
+    try:
+        estados = cola.contar_estados()
+        abierta = cola.hay_trabajo_abierto()
+        if abierta:
+            print(f"Aviso: la cola aún tiene trabajo abierto ({estados}); solo se fusionan las tareas terminadas.")
+        with EscritorLanding(ruta_salida, ESQUEMA_LANDING_GOODREADS) as escritor:
+            for _, estado, datos, resultado in cola.terminadas(TIPO_DETALLE):
+                escritor.escribir(resultado if estado == COMPLETADA else construir_registro_libro(datos, None, None))
+    finally:
+        cola.cerrar()
+    if not abierta:
+        cola.eliminar()
+    print(f"Fusión finalizada. {escritor.filas_escritas} libros guardados en {ruta_salida} (tareas por estado: {estados})")
+    return escritor.filas_escritas
+
+# Función principal del rastreo distribuido. 'completo' siembra la cola, la procesa con los trabajadores locales
+# y fusiona el resultado; las demás acciones hacen solo su paso, para repartirlo entre máquinas. 'fusionar' borra
+# la cola cuando está terminada. num_maquinas es el número de máquinas que ejecutan 'trabajar' sobre la misma cola
+# (ver repartir_tasa); con reiniciar, la siembra descarta la cola anterior (ver sembrar)
+@instrumentar('scrape_distribuido')
+def main(accion='completo', num_trabajadores=NUM_TRABAJADORES_DEFAULT, num_maquinas=NUM_MAQUINAS_DEFAULT, reiniciar=False):
+    if accion not in ACCIONES:
+        raise ValueError(f"Acción desconocida: '{accion}'. Opciones: {', '.join(ACCIONES)}.")
+
+    if accion in ('completo', 'sembrar'):
+        with etapa('sembrar'):
+            sembrar(CONSULTAS_DEFAULT, LIBROS_POR_CONSULTA_DEFAULT, RUTA_COLA, reiniciar)
+    if accion in ('completo', 'trabajar'):
+        print(f"Procesando la cola '{RUTA_COLA}' con {num_trabajadores} trabajadores...")
+        with etapa('trabajar'):
+            lanzar_trabajadores(num_trabajadores, RUTA_COLA, num_maquinas)
+    if accion in ('completo', 'fusionar'):
+        with etapa('fusionar') as medicion:
+            medicion['filas'] = fusionar(RUTA_COLA)
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else 'completo',
+         int(sys.argv[2]) if len(sys.argv) > 2 else NUM_TRABAJADORES_DEFAULT,
+         int(sys.argv[3]) if len(sys.argv) > 3 else NUM_MAQUINAS_DEFAULT)
@@ -1,71 +1,113 @@
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
-import re
+import asyncio
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from parse_goodreads import extraer_isbn_de_html, parsear_pagina_busqueda
+from utils_checkpoint import DiarioCheckpoint
+from utils_cache_http import CacheHTTP, DIRECTORIO_CACHE_DEFAULT
+from utils_rate_limit import obtener_con_limite
+from utils_metricas import etapa, instrumentar, obtener_registro
+from utils_landing import ESQUEMA_LANDING_GOODREADS, RUTA_LANDING_GOODREADS, EscritorLanding
 
 # --- CONFIGURACIÓN ---
 # Modifica estos valores para cambiar la búsqueda por defecto
 CONSULTA_DEFAULT = "data science"
 NUM_LIBROS_DEFAULT = 22
 
-# Obtiene una URL con un número específico de reintentos y backoff
-def obtener_url(url, headers, reintentos=3, factor_backoff=0.5, timeout=30):
-    for i in range(reintentos):
-        try:
-            respuesta = requests.get(url, headers=headers, timeout=timeout)
-            respuesta.raise_for_status()
-            return respuesta
-        except requests.exceptions.RequestException as e:
-            print(f"Solicitud fallida para {url}: {e}. Reintentando en {factor_backoff * (2 ** i)} segundos...")
-            time.sleep(factor_backoff * (2 ** i))
-    print(f"No se pudo obtener {url} después de {reintentos} reintentos.")
-    return None
+# Modo asíncrono: descarga páginas de búsqueda y de detalle de forma concurrente
+MODO_ASINCRONO_DEFAULT = True
+CONCURRENCIA_MAXIMA_DEFAULT = 8 # La cadencia por host la marca el limitador de utils_rate_limit
+LIBROS_POR_PAGINA = 20 # Resultados que Goodreads muestra por página de búsqueda
+
+# Etapa de parseo del modo asíncrono: un pool de procesos convierte el HTML descargado en registros
+NUM_PROCESOS_PARSEO_DEFAULT = os.cpu_count() or 1 # 0 parsea en hilos del propio proceso
+TAMANO_COLA_PARSEO_DEFAULT = 64 # Páginas descargadas que pueden esperar a ser parseadas
+
+# Caché HTTP en disco: evita volver a descargar páginas entre ejecuciones
+USAR_CACHE_HTTP = True
+MODO_OFFLINE = False # Si es True, solo se sirven páginas desde la caché, sin tocar la red
+DIRECTORIO_CACHE_HTTP = DIRECTORIO_CACHE_DEFAULT
+
+# Diario de checkpoint: permite reanudar una extracción interrumpida sin repetir las páginas de detalle ya procesadas
+RUTA_CHECKPOINT = os.path.join("landing", "goodreads_books.checkpoint.jsonl")
+
+URL_BASE_GOODREADS = "https://www.goodreads.com"
+HEADERS_DEFAULT = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8'
+}
+
+_cache_http = None
+
+# Devuelve la caché HTTP configurada para el scraper, o None si está desactivada
+def obtener_cache_http():
+    global _cache_http
+    if USAR_CACHE_HTTP and _cache_http is None:
+        _cache_http = CacheHTTP(DIRECTORIO_CACHE_HTTP, modo_offline=MODO_OFFLINE)
+    return _cache_http if USAR_CACHE_HTTP else None
+
+# Obtiene una URL con reintentos y backoff, respetando el limitador de tasa compartido por host (o el que se pase).
+# Si la caché está activa, sirve las respuestas frescas desde disco y revalida las caducadas con ETag/Last-Modified
+def obtener_url(url, headers, reintentos=3, factor_backoff=0.5, timeout=30, limitador=None):
+    cache = obtener_cache_http()
+    if cache is None:
+        return obtener_con_limite(url, reintentos=reintentos, factor_backoff=factor_backoff, limitador=limitador,
+                                  headers=headers, timeout=timeout)
+
+    metricas = obtener_registro()
+    entrada = cache.buscar(url)
+    if entrada and (cache.modo_offline or cache.es_fresca(entrada)):
+        metricas.contar('cache_http_aciertos')
+        return cache.construir_respuesta(entrada)
+    if cache.modo_offline:
+        metricas.contar('cache_http_fallos')
+        print(f"Modo offline: {url} no está en la caché.")
+        return None
+
+    headers_peticion = {**headers, **cache.cabeceras_condicionales(entrada)}
+    respuesta = obtener_con_limite(url, reintentos=reintentos, factor_backoff=factor_backoff, limitador=limitador,
+                                   headers=headers_peticion, timeout=timeout)
+    if respuesta is None:
+        # Mejor servir una copia caducada que perder el libro
+        if entrada:
+            metricas.contar('cache_http_copias_caducadas')
+        return cache.construir_respuesta(entrada) if entrada else None
+    if respuesta.status_code == 304 and entrada:
+        metricas.contar('cache_http_revalidaciones')
+        cache.marcar_revalidada(entrada)
+        return cache.construir_respuesta(entrada)
+
+    metricas.contar('cache_http_fallos')
+    cache.guardar(url, respuesta)
+    return respuesta
 
 # Obtiene la página del libro y extrae el ISBN10 e ISBN13
 def obtener_detalles_libro(url_libro, headers):
     respuesta = obtener_url(url_libro, headers)
     if not respuesta:
         return None, None
+    return extraer_isbn_de_html(respuesta.text, url_libro)
 
-    sopa = BeautifulSoup(respuesta.text, 'lxml')
-    isbn10 = None
-    isbn13 = None
-
-    try:
-        # Prioriza el script JSON-LD para datos estructurados
-        etiqueta_script = sopa.find('script', type='application/ld+json')
-        if etiqueta_script:
-            datos_json = json.loads(etiqueta_script.string)
-            if 'isbn' in datos_json:
-                isbn13 = datos_json.get('isbn')
-
-        # Fallback a regex en el contenido de la página si JSON-LD falla
-        if not isbn13:
-            coincidencia_isbn = re.search(r'ISBN(?:13)?:?\s*(\d{10,13})', respuesta.text)
-            if coincidencia_isbn:
-                isbn_encontrado = coincidencia_isbn.group(1)
-                if len(isbn_encontrado) == 13:
-                    isbn13 = isbn_encontrado
-                elif len(isbn_encontrado) == 10:
-                    isbn10 = isbn_encontrado
-    except Exception as e:
-        print(f"Ocurrió un error inesperado al analizar los detalles del libro desde {url_libro}: {e}")
-
-    return isbn10, isbn13
-
-
-# Extrae datos de Goodreads para una consulta dada para obtener detalles de libros
-def extraer_goodreads(consulta, num_libros):
-    url_base = "https://www.goodreads.com"
-    url_busqueda = f"{url_base}/search?q={consulta.replace(' ', '+')}"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36',
-        'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8'
+# Construye el registro final de un libro en el orden de campos de la salida JSON
+def construir_registro_libro(datos_busqueda, isbn10, isbn13):
+    return {
+        "title": datos_busqueda["title"],
+        "author": datos_busqueda["author"],
+        "rating": datos_busqueda["rating"],
+        "ratings_count": datos_busqueda["ratings_count"],
+        "book_url": datos_busqueda["book_url"],
+        "isbn10": isbn10,
+        "isbn13": isbn13
     }
 
+# Extrae datos de Goodreads para una consulta dada para obtener detalles de libros.
+# Si se pasa un escritor de la zona landing, cada libro se escribe en cuanto está completo
+def extraer_goodreads(consulta, num_libros, diario=None, escritor=None):
+    url_base = URL_BASE_GOODREADS
+    url_busqueda = f"{url_base}/search?q={consulta.replace(' ', '+')}"
+    headers = HEADERS_DEFAULT
+
     todos_los_datos_libros = []
     pagina = 1
     
@@ -77,73 +119,185 @@ def extraer_goodreads(consulta, num_libros):
         if not respuesta:
             break # Detener si una página de búsqueda no se carga
 
-        sopa = BeautifulSoup(respuesta.text, 'lxml')
-        contenedores_libros = sopa.find_all('tr', itemtype='http://schema.org/Book')
+        num_contenedores, libros_pagina = parsear_pagina_busqueda(respuesta.text, url_base)
         
-        if not contenedores_libros:
+        if not num_contenedores:
             print("No se encontraron más contenedores de libros o el selector cambió. Saliendo.")
             break
 
-        for contenedor in contenedores_libros:
+        for datos_busqueda in libros_pagina:
             if len(todos_los_datos_libros) >= num_libros:
                 break
 
-            etiqueta_titulo = contenedor.find('a', class_='bookTitle')
-            etiqueta_autor = contenedor.find('a', class_='authorName')
-            etiqueta_rating = contenedor.find('span', class_='minirating')
-            
-            if etiqueta_titulo and etiqueta_autor and etiqueta_rating:
-                titulo = etiqueta_titulo.get_text(strip=True)
-                autor = etiqueta_autor.get_text(strip=True)
-                url_libro = url_base + etiqueta_titulo['href']
-                
-                texto_rating = etiqueta_rating.get_text(strip=True)
-                coincidencia_rating = re.search(r'(\d\.\d+)', texto_rating)
-                coincidencia_conteo_ratings = re.search(r'(\d{1,3}(?:,\d{3})*)\s+ratings', texto_rating)
-                
-                rating = float(coincidencia_rating.group(1)) if coincidencia_rating else None
-                conteo_ratings = int(coincidencia_conteo_ratings.group(1).replace(',', '')) if coincidencia_conteo_ratings else None
-
-                print(f"Obteniendo detalles para: {titulo}")
+            url_libro = datos_busqueda['book_url']
+            if diario is not None and diario.contiene(url_libro):
+                registro = diario.obtener(url_libro)
+            else:
+                print(f"Obteniendo detalles para: {datos_busqueda['title']}")
                 isbn10, isbn13 = obtener_detalles_libro(url_libro, headers)
-                time.sleep(1) # Ser cortés
-
-                datos_libro = {
-                    "title": titulo,
-                    "author": autor,
-                    "rating": rating,
-                    "ratings_count": conteo_ratings,
-                    "book_url": url_libro,
-                    "isbn10": isbn10,
-                    "isbn13": isbn13
-                }
-                todos_los_datos_libros.append(datos_libro)
+
+                registro = construir_registro_libro(datos_busqueda, isbn10, isbn13)
+                if diario is not None:
+                    diario.registrar(url_libro, registro)
+            if escritor is not None:
+                escritor.escribir(registro)
+            todos_los_datos_libros.append(registro)
             
         pagina += 1
-        time.sleep(2) # Pausa entre páginas
 
     return todos_los_datos_libros
 
-# Guarda los datos de los libros extraídos en un archivo JSON
-def guardar_resultados(libros):
-    directorio_salida = "landing"
-    os.makedirs(directorio_salida, exist_ok=True)
-    archivo_salida = os.path.join(directorio_salida, "goodreads_books.json")
-    
-    with open(archivo_salida, 'w', encoding='utf-8') as f:
-        json.dump(libros, f, ensure_ascii=False, indent=4)
-    
-    print(f"Extracción finalizada. {len(libros)} libros guardados en {archivo_salida}")
-    return len(libros)
+# Etapa de parseo desacoplada de la descarga: las páginas entran en una cola acotada
+# y varios consumidores las reparten entre los procesos del pool
+class EtapaParseo:
+    def __init__(self, num_procesos, tamano_cola):
+        # 'spawn' evita hacer fork de un proceso que ya tiene hilos de descarga en marcha
+        self.pool = ProcessPoolExecutor(max_workers=num_procesos, mp_context=multiprocessing.get_context('spawn')) if num_procesos > 0 else None
+        self.num_consumidores = max(1, num_procesos)
+        self.cola = asyncio.Queue(maxsize=tamano_cola)
+        self.consumidores = []
+
+    async def __aenter__(self):
+        self.consumidores = [asyncio.create_task(self._consumir()) for _ in range(self.num_consumidores)]
+        return self
+
+    async def __aexit__(self, *excepcion):
+        for consumidor in self.consumidores:
+            consumidor.cancel()
+        await asyncio.gather(*self.consumidores, return_exceptions=True)
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    async def _consumir(self):
+        bucle = asyncio.get_running_loop()
+        while True:
+            funcion, argumentos, futuro = await self.cola.get()
+            try:
+                futuro.set_result(await bucle.run_in_executor(self.pool, funcion, *argumentos))
+            except Exception as e:
+                futuro.set_exception(e)
+            finally:
+                self.cola.task_done()
 
-# Función principal para ejecutar el scraper
-def main():
+    # Encola una página para parsear; espera si la cola está llena (back-pressure) y devuelve un futuro con el resultado
+    async def encolar(self, funcion, *argumentos):
+        futuro = asyncio.get_running_loop().create_future()
+        await self.cola.put((funcion, argumentos, futuro))
+        return futuro
+
+# Descarga una URL sin bloquear el bucle de eventos y la pasa a la etapa de parseo.
+# El semáforo no se suelta hasta que la página está en la cola, así las páginas en memoria quedan acotadas
+async def descargar_y_parsear(url, headers, semaforo, etapa_parseo, funcion_parseo, *argumentos):
+    async with semaforo:
+        respuesta = await asyncio.to_thread(obtener_url, url, headers)
+        if not respuesta:
+            return None
+        futuro = await etapa_parseo.encolar(funcion_parseo, respuesta.text, *argumentos)
+    return await futuro
+
+# Descarga la página de detalle de un libro y completa su registro con los ISBN
+async def completar_libro_async(datos_busqueda, headers, semaforo, etapa_parseo, diario=None):
+    url_libro = datos_busqueda['book_url']
+    if diario is not None and diario.contiene(url_libro):
+        return diario.obtener(url_libro)
+
+    print(f"Obteniendo detalles para: {datos_busqueda['title']}")
+    isbns = await descargar_y_parsear(url_libro, headers, semaforo, etapa_parseo, extraer_isbn_de_html, url_libro)
+    isbn10, isbn13 = isbns if isbns else (None, None)
+
+    registro = construir_registro_libro(datos_busqueda, isbn10, isbn13)
+    if diario is not None:
+        diario.registrar(url_libro, registro)
+    return registro
+
+# Versión asíncrona de extraer_goodreads: mismas reglas de parada y mismo orden de salida
+async def extraer_goodreads_async(consulta, num_libros, max_concurrencia=CONCURRENCIA_MAXIMA_DEFAULT,
+                                  num_procesos_parseo=NUM_PROCESOS_PARSEO_DEFAULT, tamano_cola_parseo=TAMANO_COLA_PARSEO_DEFAULT, diario=None,
+                                  escritor=None):
+    async with EtapaParseo(num_procesos_parseo, tamano_cola_parseo) as etapa_parseo:
+        return await _extraer_goodreads_async(consulta, num_libros, max_concurrencia, etapa_parseo, diario, escritor)
+
+async def _extraer_goodreads_async(consulta, num_libros, max_concurrencia, etapa_parseo, diario, escritor):
+    url_base = URL_BASE_GOODREADS
+    url_busqueda = f"{url_base}/search?q={consulta.replace(' ', '+')}"
+    headers = HEADERS_DEFAULT
+
+    semaforo = asyncio.Semaphore(max_concurrencia)
+    tareas_detalle = []
+    pagina = 1
+    fin_busqueda = False
+
+    while len(tareas_detalle) < num_libros and not fin_busqueda:
+        # Pide en paralelo tantas páginas como hagan falta para cubrir los libros restantes
+        libros_restantes = num_libros - len(tareas_detalle)
+        paginas = range(pagina, pagina + max(1, -(-libros_restantes // LIBROS_POR_PAGINA)))
+        urls_paginas = [f"{url_busqueda}&page={p}" for p in paginas]
+        for url_pagina in urls_paginas:
+            print(f"Extrayendo página: {url_pagina}")
+        resultados_paginas = await asyncio.gather(*(
+            descargar_y_parsear(u, headers, semaforo, etapa_parseo, parsear_pagina_busqueda, url_base) for u in urls_paginas
+        ))
+
+        # Las páginas se procesan en orden para conservar el orden de la salida secuencial
+        for resultado_pagina in resultados_paginas:
+            if not resultado_pagina:
+                fin_busqueda = True # Detener si una página de búsqueda no se carga
+                break
+
+            num_contenedores, libros_pagina = resultado_pagina
+            if not num_contenedores:
+                print("No se encontraron más contenedores de libros o el selector cambió. Saliendo.")
+                fin_busqueda = True
+                break
+
+            for datos_busqueda in libros_pagina:
+                if len(tareas_detalle) >= num_libros:
+                    break
+                # Las páginas de detalle empiezan a descargarse mientras se piden las siguientes búsquedas
+                tareas_detalle.append(asyncio.create_task(
+                    completar_libro_async(datos_busqueda, headers, semaforo, etapa_parseo, diario)
+                ))
+
+        pagina += len(paginas)
+
+    # Los libros se recogen en el orden de búsqueda; cada uno se escribe en cuanto él y los anteriores están completos
+    libros = []
+    for tarea in tareas_detalle:
+        registro = await tarea
+        if escritor is not None:
+            escritor.escribir(registro)
+        libros.append(registro)
+    return libros
+
+# Libera espacio en la caché HTTP (entradas caducadas y exceso de tamaño); no hace nada en modo offline
+def desalojar_cache_http():
+    cache = obtener_cache_http()
+    if cache is not None and not cache.modo_offline:
+        cache.desalojar()
+
+# Función principal para ejecutar el scraper. El orquestador desaloja la caché en una etapa aparte
+@instrumentar('scrape_goodreads')
+def main(desalojar_cache=True):
     print(f"Iniciando extracción de Goodreads para libros de '{CONSULTA_DEFAULT}'...")
-    libros = extraer_goodreads(consulta=CONSULTA_DEFAULT, num_libros=NUM_LIBROS_DEFAULT)
+    diario = DiarioCheckpoint(RUTA_CHECKPOINT)
+    # Los libros se escriben en la zona landing a medida que se extraen; el archivo solo se publica si la extracción termina
+    with etapa('extraer_goodreads') as medicion, EscritorLanding(RUTA_LANDING_GOODREADS, ESQUEMA_LANDING_GOODREADS) as escritor:
+        if MODO_ASINCRONO_DEFAULT:
+            libros = asyncio.run(extraer_goodreads_async(consulta=CONSULTA_DEFAULT, num_libros=NUM_LIBROS_DEFAULT, diario=diario,
+                                                         escritor=escritor))
+        else:
+            libros = extraer_goodreads(consulta=CONSULTA_DEFAULT, num_libros=NUM_LIBROS_DEFAULT, diario=diario, escritor=escritor)
+        medicion['filas'] = len(libros)
     if libros:
-        guardar_resultados(libros)
+        print(f"Extracción finalizada. {len(libros)} libros guardados en {RUTA_LANDING_GOODREADS}")
+        # La salida final ya está en disco: el diario deja de hacer falta
+        diario.eliminar()
     else:
         print("No se extrajeron libros.")
 
+    if desalojar_cache:
+        with etapa('desalojar_cache'):
+            desalojar_cache_http()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
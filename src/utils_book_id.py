@@ -0,0 +1,38 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# --- CONFIGURACIÓN ---
+# Campos que forman la clave del book_id de fallback, en este orden
+COLUMNAS_CLAVE_HASH = ['titulo_normalizado', 'autor_principal', 'editorial', 'anio_pub']
+# A partir de este número de filas el hash de fallback se reparte entre procesos
+UMBRAL_HASH_PARALELO = 500_000
+NUM_PROCESOS_HASH_DEFAULT = os.cpu_count() or 1
+
+# Hash SHA-256 de la clave de fallback de una fila. Es la implementación de referencia de crear_ids_hash_lote
+def crear_id_hash(fila):
+    cadena_clave = f"{fila['titulo_normalizado']}{fila['autor_principal']}{fila['editorial']}{fila['anio_pub']}"
+    return hashlib.sha256(cadena_clave.encode('utf-8')).hexdigest()
+
+# Calcula el SHA-256 hexadecimal de una lista de claves
+def hashear_claves(claves):
+    sha256 = hashlib.sha256
+    return [sha256(clave.encode('utf-8')).hexdigest() for clave in claves]
+
+# Calcula el SHA-256 de una lista de claves; con muchas claves el trabajo se reparte entre procesos
+def hashear_claves_lote(claves, num_procesos=NUM_PROCESOS_HASH_DEFAULT):
+    if num_procesos <= 1 or len(claves) < UMBRAL_HASH_PARALELO:
+        return hashear_claves(claves)
+
+    tamano_bloque = -(-len(claves) // num_procesos)
+    bloques = [claves[i:i + tamano_bloque] for i in range(0, len(claves), tamano_bloque)]
+    with ProcessPoolExecutor(max_workers=num_procesos) as executor:
+        return [hash_clave for bloque in executor.map(hashear_claves, bloques) for hash_clave in bloque]
+
+# Calcula los hashes de fallback de todas las filas de un DataFrame de una vez.
+# Las claves se construyen columna a columna (sin crear una Series por fila) con el mismo formato que
+# crear_id_hash, así que los book_id son idénticos. En DataFrames grandes el hash se reparte entre procesos
+def crear_ids_hash_lote(df, num_procesos=NUM_PROCESOS_HASH_DEFAULT):
+    columnas = [df[columna].to_numpy(dtype=object) for columna in COLUMNAS_CLAVE_HASH]
+    claves = [f"{titulo}{autor}{editorial}{anio}" for titulo, autor, editorial, anio in zip(*columnas)]
+    return hashear_claves_lote(claves, num_procesos)
@@ -0,0 +1,89 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils_isbn import limpiar_isbn
+from utils_quality import limpiar_string
+
+# --- CONFIGURACIÓN ---
+RUTA_CACHE_DEFAULT = os.path.join("landing", "cache_googlebooks.sqlite")
+TTL_POSITIVO_DEFAULT = 90 * 24 * 3600 # Segundos que se reutiliza un libro encontrado
+TTL_NEGATIVO_DEFAULT = 7 * 24 * 3600 # Segundos que se recuerda un "no encontrado" antes de volver a preguntar
+
+# Clave normalizada para una búsqueda por ISBN
+def clave_isbn(isbn):
+    limpio = limpiar_isbn(str(isbn))
+    return f"isbn:{limpio}" if limpio else None
+
+# Clave normalizada para una búsqueda por título y autor
+def clave_titulo_autor(titulo, autor):
+    if not isinstance(titulo, str) or not isinstance(autor, str):
+        return None
+    return f"titulo:{limpiar_string(titulo).lower()}|{limpiar_string(autor).lower()}"
+
+# Caché SQLite de respuestas de la API de Google Books, con resultados positivos y negativos
+class CacheConsultas:
+    def __init__(self, ruta=RUTA_CACHE_DEFAULT, ttl_positivo=TTL_POSITIVO_DEFAULT, ttl_negativo=TTL_NEGATIVO_DEFAULT):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ttl_positivo = ttl_positivo
+        self.ttl_negativo = ttl_negativo
+        self.candado = threading.Lock()
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute("""
+            CREATE TABLE IF NOT EXISTS consultas (
+                clave TEXT PRIMARY KEY,
+                encontrado INTEGER NOT NULL,
+                respuesta TEXT,
+                fecha_guardado REAL NOT NULL
+            )
+        """)
+        self.conexion.commit()
+
+    # Devuelve (True, respuesta) si la clave está en caché y vigente, o (False, None) en caso contrario.
+    # Un "no encontrado" vigente devuelve (True, respuesta) con totalItems == 0
+    def buscar(self, clave):
+        if clave is None:
+            return False, None
+        with self.candado:
+            fila = self.conexion.execute(
+                "SELECT encontrado, respuesta, fecha_guardado FROM consultas WHERE clave = ?", (clave,)
+            ).fetchone()
+        if fila is None:
+            return False, None
+        encontrado, respuesta, fecha_guardado = fila
+        ttl = self.ttl_positivo if encontrado else self.ttl_negativo
+        if time.time() - fecha_guardado > ttl:
+            return False, None
+        return True, json.loads(respuesta)
+
+    # Guarda la respuesta de la API; las respuestas sin resultados se guardan como negativas
+    def guardar(self, clave, respuesta):
+        if clave is None or respuesta is None:
+            return
+        encontrado = 1 if respuesta.get('totalItems', 0) > 0 else 0
+        with self.candado:
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO consultas (clave, encontrado, respuesta, fecha_guardado) VALUES (?, ?, ?, ?)",
+                (clave, encontrado, json.dumps(respuesta, ensure_ascii=False), time.time())
+            )
+            self.conexion.commit()
+
+    # Elimina las entradas caducadas
+    def purgar_caducadas(self):
+        ahora = time.time()
+        with self.candado:
+            cursor = self.conexion.execute(
+                "DELETE FROM consultas WHERE (encontrado = 1 AND fecha_guardado < ?) OR (encontrado = 0 AND fecha_guardado < ?)",
+                (ahora - self.ttl_positivo, ahora - self.ttl_negativo)
+            )
+            self.conexion.commit()
+        return cursor.rowcount
+
+    def cerrar(self):
+        with self.candado:
+            self.conexion.close()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# --- CONFIGURACIÓN ---
+DIRECTORIO_CACHE_DEFAULT = os.path.join("landing", "cache_http")
+TTL_FRESCO_DEFAULT = 24 * 3600 # Segundos durante los que una respuesta se sirve sin revalidar
+TTL_DESALOJO_DEFAULT = 30 * 24 * 3600 # Segundos tras los que una entrada se elimina del disco
+TAMANO_MAXIMO_DEFAULT = 2 * 1024 ** 3 # Bytes de contenido antes de desalojar por LRU
+CABECERAS_GUARDADAS = ('Content-Type', 'ETag', 'Last-Modified')
+# Resolución de ultimo_acceso: un acierto solo reescribe la entrada del índice si su último acceso guardado es más
+# antiguo que esto. Al LRU del desalojo le basta con esta precisión, y un rastreo servido desde la caché no
+# escribe un archivo por página
+RESOLUCION_ULTIMO_ACCESO = 3600
+# Segundos durante los que un objeto sin entrada en el índice no se desaloja: otro proceso que comparte la caché
+# puede haberlo escrito y estar a punto de indexarlo. Los temporales de _escribir_atomico nunca se desalojan
+GRACIA_HUERFANOS = 3600
+
+# Escribe un archivo de forma atómica para que un lector concurrente nunca vea datos a medias
+def _escribir_atomico(ruta, datos):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    descriptor, ruta_temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as f:
+        f.write(datos)
+    os.replace(ruta_temporal, ruta)
+
+# Caché HTTP en disco: el contenido se guarda por su hash y un índice por URL apunta a él
+class CacheHTTP:
+    def __init__(self, directorio=DIRECTORIO_CACHE_DEFAULT, ttl_fresco=TTL_FRESCO_DEFAULT,
+                 ttl_desalojo=TTL_DESALOJO_DEFAULT, tamano_maximo=TAMANO_MAXIMO_DEFAULT, modo_offline=False):
+        self.directorio = directorio
+        self.directorio_objetos = os.path.join(directorio, "objetos")
+        self.directorio_indice = os.path.join(directorio, "indice")
+        self.ttl_fresco = ttl_fresco
+        self.ttl_desalojo = ttl_desalojo
+        self.tamano_maximo = tamano_maximo
+        self.modo_offline = modo_offline
+
+    def _ruta_indice(self, url):
+        return os.path.join(self.directorio_indice, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _ruta_objeto(self, hash_contenido):
+        return os.path.join(self.directorio_objetos, hash_contenido[:2], hash_contenido)
+
+    # Devuelve la entrada del índice para una URL, o None si no está en caché
+    def buscar(self, url):
+        try:
+            with open(self._ruta_indice(url), 'r', encoding='utf-8') as f:
+                entrada = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if not os.path.exists(self._ruta_objeto(entrada['hash_contenido'])):
+            return None
+        return entrada
+
+    def es_fresca(self, entrada):
+        return time.time() - entrada['fecha_validacion'] < self.ttl_fresco
+
+    # Cabeceras para una petición condicional a partir de una entrada previa
+    def cabeceras_condicionales(self, entrada):
+        if not entrada:
+            return {}
+        cabeceras = {}
+        if entrada['cabeceras'].get('ETag'):
+            cabeceras['If-None-Match'] = entrada['cabeceras']['ETag']
+        if entrada['cabeceras'].get('Last-Modified'):
+            cabeceras['If-Modified-Since'] = entrada['cabeceras']['Last-Modified']
+        return cabeceras
+
+    # Guarda el cuerpo de una respuesta 200 y actualiza el índice de su URL
+    def guardar(self, url, respuesta):
+        contenido = respuesta.content
+        hash_contenido = hashlib.sha256(contenido).hexdigest()
+        ruta_objeto = self._ruta_objeto(hash_contenido)
+        if not os.path.exists(ruta_objeto):
+            _escribir_atomico(ruta_objeto, contenido)
+
+        ahora = time.time()
+        entrada = {
+            'url': url,
+            'hash_contenido': hash_contenido,
+            'tamano': len(contenido),
+            'encoding': respuesta.encoding,
+            'cabeceras': {c: respuesta.headers[c] for c in CABECERAS_GUARDADAS if c in respuesta.headers},
+            'fecha_descarga': ahora,
+            'fecha_validacion': ahora,
+            'ultimo_acceso': ahora,
+        }
+        self._guardar_entrada(url, entrada)
+        return entrada
+
+    def _guardar_entrada(self, url, entrada):
+        _escribir_atomico(self._ruta_indice(url), json.dumps(entrada, ensure_ascii=False).encode('utf-8'))
+
+    # Marca una entrada como revalidada tras recibir un 304 Not Modified
+    def marcar_revalidada(self, entrada):
+        entrada['fecha_validacion'] = entrada['ultimo_acceso'] = time.time()
+        self._guardar_entrada(entrada['url'], entrada)
+
+    # Reconstruye un requests.Response a partir de una entrada, para que los llamantes no noten la diferencia
+    def construir_respuesta(self, entrada):
+        with open(self._ruta_objeto(entrada['hash_contenido']), 'rb') as f:
+            contenido = f.read()
+        ahora = time.time()
+        if ahora - entrada['ultimo_acceso'] > RESOLUCION_ULTIMO_ACCESO:
+            entrada['ultimo_acceso'] = ahora
+            self._guardar_entrada(entrada['url'], entrada)
+
+        respuesta = requests.Response()
+        respuesta.status_code = 200
+        respuesta.url = entrada['url']
+        respuesta.headers = CaseInsensitiveDict(entrada['cabeceras'])
+        respuesta.encoding = entrada['encoding']
+        respuesta._content = contenido
+        return respuesta
+
+    # Elimina entradas sin validar desde hace más del TTL, después las menos usadas hasta respetar el tamaño máximo,
+    # y por último los objetos que ya no referencia ninguna entrada (salvo los escritos hace menos de GRACIA_HUERFANOS)
+    def desalojar(self):
+        if not os.path.isdir(self.directorio_indice):
+            return 0
+        ahora = time.time()
+        entradas = []
+        eliminadas = 0
+        for nombre in os.listdir(self.directorio_indice):
+            ruta = os.path.join(self.directorio_indice, nombre)
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    entrada = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            # Una entrada revalidada con un 304 vuelve a estar al día aunque su descarga sea antigua
+            if ahora - entrada['fecha_validacion'] > self.ttl_desalojo:
+                os.remove(ruta)
+                eliminadas += 1
+            else:
+                entradas.append((ruta, entrada))
+
+        # Un mismo objeto puede estar referenciado por varias URL; solo cuenta una vez
+        entradas.sort(key=lambda par: par[1]['ultimo_acceso'], reverse=True)
+        referencias = Counter(e['hash_contenido'] for _, e in entradas)
+        tamano_total = sum({e['hash_contenido']: e['tamano'] for _, e in entradas}.values())
+        while entradas and tamano_total > self.tamano_maximo:
+            ruta, entrada = entradas.pop()
+            os.remove(ruta)
+            eliminadas += 1
+            referencias[entrada['hash_contenido']] -= 1
+            if referencias[entrada['hash_contenido']] == 0:
+                tamano_total -= entrada['tamano']
+
+        referenciados = {h for h, n in referencias.items() if n > 0}
+        if os.path.isdir(self.directorio_objetos):
+            for subdirectorio in os.listdir(self.directorio_objetos):
+                ruta_subdirectorio = os.path.join(self.directorio_objetos, subdirectorio)
+                for nombre in os.listdir(ruta_subdirectorio):
+                    if nombre in referenciados or nombre.endswith('.tmp'):
+                        continue
+                    ruta = os.path.join(ruta_subdirectorio, nombre)
+                    try:
+                        if ahora - os.path.getmtime(ruta) > GRACIA_HUERFANOS:
+                            os.remove(ruta)
+                    except FileNotFoundError:
+                        continue
+        return eliminadas
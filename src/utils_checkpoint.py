@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+
+# Diario de checkpoint en JSONL: cada elemento terminado se añade como una línea {"clave", "registro"}.
+# Al reanudar se cargan los elementos ya completados y solo se procesa el resto
+class DiarioCheckpoint:
+    def __init__(self, ruta, sincronizar_disco=False):
+        self.ruta = ruta
+        self.sincronizar_disco = sincronizar_disco
+        self.candado = threading.Lock()
+        self.completados = self._cargar()
+        self.archivo = None
+
+    # Lee el diario existente; una última línea cortada por una caída a mitad de escritura se descarta
+    def _cargar(self):
+        completados = {}
+        if not os.path.exists(self.ruta):
+            return completados
+        with open(self.ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    entrada = json.loads(linea)
+                except json.JSONDecodeError:
+                    continue
+                completados[entrada['clave']] = entrada['registro']
+        if completados:
+            print(f"Reanudando desde el checkpoint '{self.ruta}': {len(completados)} elementos ya completados.")
+        return completados
+
+    def _termina_sin_salto_de_linea(self):
+        if os.path.getsize(self.ruta) == 0:
+            return False
+        with open(self.ruta, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b'\n'
+
+    def contiene(self, clave):
+        return clave in self.completados
+
+    def obtener(self, clave):
+        return self.completados[clave]
+
+    # Añade un elemento terminado al diario y lo deja escrito en disco antes de devolver el control
+    def registrar(self, clave, registro):
+        linea = json.dumps({'clave': clave, 'registro': registro}, ensure_ascii=False) + '\n'
+        with self.candado:
+            if self.archivo is None:
+                directorio = os.path.dirname(self.ruta)
+                if directorio:
+                    os.makedirs(directorio, exist_ok=True)
+                self.archivo = open(self.ruta, 'a', encoding='utf-8')
+                if self._termina_sin_salto_de_linea():
+                    # Aísla la línea cortada para no pegarle la siguiente entrada
+                    self.archivo.write('\n')
+            self.archivo.write(linea)
+            self.archivo.flush()
+            if self.sincronizar_disco:
+                os.fsync(self.archivo.fileno())
+            self.completados[clave] = registro
+
+    def cerrar(self):
+        with self.candado:
+            if self.archivo is not None:
+                self.archivo.close()
+                self.archivo = None
+
+    # Elimina el diario una vez que la salida final se ha escrito correctamente
+    def eliminar(self):
+        self.cerrar()
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
@@ -0,0 +1,155 @@
+import contextlib
+import json
+import os
+import sqlite3
+import time
+
+# --- CONFIGURACIÓN ---
+DURACION_LEASE_DEFAULT = 300 # Segundos que una tarea reclamada es del trabajador; después otro puede reclamarla
+MAX_INTENTOS_DEFAULT = 3 # Reclamaciones de una tarea antes de darla por fallida
+TIEMPO_ESPERA_BLOQUEO = 60 # Segundos que se espera a que otro proceso libere la base de datos
+# WAL necesita memoria compartida y no funciona entre máquinas; con el diario clásico basta con que
+# el sistema de archivos compartido respete los bloqueos POSIX
+MODO_DIARIO_COLA = 'DELETE'
+
+PENDIENTE = 'pendiente'
+EN_CURSO = 'en_curso'
+COMPLETADA = 'completada'
+FALLIDA = 'fallida'
+
+# Cola de trabajo durable en SQLite, compartida por varios procesos o máquinas. Cada tarea se identifica por
+# su URL, así que añadir dos veces la misma URL no crea trabajo duplicado. Un trabajador reclama una tarea con un
+# lease de duracion_lease segundos; si no la completa a tiempo (por ejemplo, porque se cayó), otro la reclama.
+# Las apariciones guardan en qué posiciones de la salida aparece cada URL, para fusionar en un orden estable
+class ColaTrabajo:
+    def __init__(self, ruta):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ruta = ruta
+        self.conexion = sqlite3.connect(ruta, timeout=TIEMPO_ESPERA_BLOQUEO, isolation_level=None)
+        self.conexion.execute(f"PRAGMA journal_mode={MODO_DIARIO_COLA}")
+        with self._transaccion() as conexion:
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS tareas (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    url TEXT NOT NULL UNIQUE,
+                    tipo TEXT NOT NULL,
+                    datos TEXT,
+                    estado TEXT NOT NULL DEFAULT 'pendiente',
+                    trabajador TEXT,
+                    vence REAL,
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    resultado TEXT
+                )
+            """)
+            conexion.execute("CREATE INDEX IF NOT EXISTS idx_tareas_estado ON tareas (estado, id)")
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS apariciones (
+                    orden TEXT PRIMARY KEY,
+                    url TEXT NOT NULL
+                )
+            """)
+
+    # Transacción con bloqueo de escritura desde el principio: dos procesos no pueden reclamar la misma tarea
+    @contextlib.contextmanager
+    def _transaccion(self):
+        self.conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conexion
+        except BaseException:
+            self.conexion.execute("ROLLBACK")
+            raise
+        self.conexion.execute("COMMIT")
+
+    @staticmethod
+    def _insertar(conexion, tareas):
+        for url, tipo, datos, orden in tareas:
+            conexion.execute(
+                "INSERT OR IGNORE INTO tareas (url, tipo, datos) VALUES (?, ?, ?)",
+                (url, tipo, json.dumps(datos, ensure_ascii=False))
+            )
+            if orden is not None:
+                conexion.execute("INSERT OR IGNORE INTO apariciones (orden, url) VALUES (?, ?)", (orden, url))
+
+    # Añade tareas (url, tipo, datos, orden) en una sola transacción; las URL ya conocidas solo suman su aparición
+    def agregar(self, tareas):
+        with self._transaccion() as conexion:
+            self._insertar(conexion, tareas)
+
+    # Reclama la tarea libre más antigua: pendiente, o en curso con el lease vencido. Una tarea que ya se ha
+    # reclamado max_intentos veces se marca como fallida. Devuelve un diccionario con la tarea o None
+    def reclamar(self, trabajador, duracion_lease=DURACION_LEASE_DEFAULT, max_intentos=MAX_INTENTOS_DEFAULT):
+        with self._transaccion() as conexion:
+            while True:
+                ahora = time.time()
+                fila = conexion.execute(
+                    "SELECT id, url, tipo, datos, intentos FROM tareas "
+                    "WHERE estado = ? OR (estado = ? AND vence < ?) ORDER BY id LIMIT 1",
+                    (PENDIENTE, EN_CURSO, ahora)
+                ).fetchone()
+                if fila is None:
+                    return None
+                id_tarea, url, tipo, datos, intentos = fila
+                if intentos >= max_intentos:
+                    conexion.execute("UPDATE tareas SET estado = ?, trabajador = NULL, vence = NULL WHERE id = ?", (FALLIDA, id_tarea))
+                    continue
+                conexion.execute(
+                    "UPDATE tareas SET estado = ?, trabajador = ?, vence = ?, intentos = intentos + 1 WHERE id = ?",
+                    (EN_CURSO, trabajador, ahora + duracion_lease, id_tarea)
+                )
+                return {'url': url, 'tipo': tipo, 'datos': json.loads(datos), 'intentos': intentos + 1}
+
+    # Completa una tarea del trabajador y añade en la misma transacción las tareas que ha descubierto.
+    # Devuelve False si la tarea ya no es suya (su lease venció y otro trabajador la reclamó)
+    def completar(self, url, trabajador, resultado=None, nuevas=()):
+        with self._transaccion() as conexion:
+            cursor = conexion.execute(
+                "UPDATE tareas SET estado = ?, resultado = ?, vence = NULL WHERE url = ? AND trabajador = ? AND estado = ?",
+                (COMPLETADA, json.dumps(resultado, ensure_ascii=False), url, trabajador, EN_CURSO)
+            )
+            if cursor.rowcount != 1:
+                return False
+            self._insertar(conexion, nuevas)
+        return True
+
+    # Devuelve una tarea fallida a la cola para otro intento, o la marca como fallida si ya no le quedan
+    def fallar(self, url, trabajador, max_intentos=MAX_INTENTOS_DEFAULT):
+        with self._transaccion() as conexion:
+            conexion.execute(
+                "UPDATE tareas SET estado = CASE WHEN intentos >= ? THEN ? ELSE ? END, trabajador = NULL, vence = NULL "
+                "WHERE url = ? AND trabajador = ? AND estado = ?",
+                (max_intentos, FALLIDA, PENDIENTE, url, trabajador, EN_CURSO)
+            )
+
+    # Número de tareas en cada estado
+    def contar_estados(self):
+        return dict(self.conexion.execute("SELECT estado, COUNT(*) FROM tareas GROUP BY estado").fetchall())
+
+    # Hay trabajo abierto mientras quede alguna tarea pendiente o en curso
+    def hay_trabajo_abierto(self):
+        return self.conexion.execute(
+            "SELECT 1 FROM tareas WHERE estado IN (?, ?) LIMIT 1", (PENDIENTE, EN_CURSO)
+        ).fetchone() is not None
+
+    # Recorre las tareas terminadas (completadas o fallidas) de un tipo en el orden de su primera aparición.
+    # Devuelve tuplas (url, estado, datos, resultado)
+    def terminadas(self, tipo):
+        cursor = self.conexion.execute(
+            "SELECT t.url, t.estado, t.datos, t.resultado, MIN(a.orden) AS primera FROM tareas t "
+            "JOIN apariciones a ON a.url = t.url WHERE t.tipo = ? AND t.estado IN (?, ?) "
+            "GROUP BY t.url ORDER BY primera",
+            (tipo, COMPLETADA, FALLIDA)
+        )
+        for url, estado, datos, resultado, _ in cursor:
+            yield url, estado, json.loads(datos), json.loads(resultado) if resultado is not None else None
+
+    def cerrar(self):
+        self.conexion.close()
+
+    # Elimina la cola una vez que su resultado se ha fusionado en la salida final
+    def eliminar(self):
+        self.cerrar()
+        for sufijo in ('', '-journal'):
+            if os.path.exists(self.ruta + sufijo):
+                os.remove(self.ruta + sufijo)
@@ -1,4 +1,17 @@
 import re
+from functools import lru_cache
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+# pandas solo hace falta en las versiones por lotes y se importa dentro de ellas, para que los módulos que solo
+# usan las funciones escalares (p. ej. indice_libros) no paguen su importación al arrancar
+
+REGEX_NO_ISBN = re.compile(r'[^0-9X]') # Caracteres que limpiar_isbn elimina
+TAMANO_CACHE_ISBN = 65_536 # ISBN distintos que recuerda limpiar_isbn (LRU)
+# Pesos de los dígitos para el cálculo de los dígitos de control
+PESOS_ISBN13 = np.array([1, 3] * 6, dtype=np.int64)
+PESOS_ISBN10 = np.arange(10, 1, -1, dtype=np.int64)
 
 # Verifica si un ISBN-10 es válido
 def es_isbn10_valido(isbn):
@@ -41,7 +54,11 @@ def es_isbn13_valido(isbn):
 def limpiar_isbn(isbn):
     if not isinstance(isbn, str):
         return None
-    return re.sub(r'[^0-9X]', '', isbn.upper())
+    return _limpiar_isbn_texto(isbn)
+
+@lru_cache(maxsize=TAMANO_CACHE_ISBN)
+def _limpiar_isbn_texto(isbn):
+    return REGEX_NO_ISBN.sub('', isbn.upper())
 
 # Intenta formatear un string en un ISBN-13 válido
 def formatear_isbn13(isbn):
@@ -55,4 +72,145 @@ def formatear_isbn10(isbn):
     limpio = limpiar_isbn(isbn)
     if limpio and es_isbn10_valido(limpio):
         return limpio
-    return None
\ No newline at end of file
+    return None
+
+# Convierte un ISBN-10 válido en su ISBN-13 equivalente (prefijo 978)
+def convertir_isbn10_a_isbn13(isbn):
+    limpio = formatear_isbn10(isbn)
+    if not limpio:
+        return None
+    base = '978' + limpio[:9]
+    total = sum(int(digito) * peso for digito, peso in zip(base, PESOS_ISBN13))
+    return base + str((10 - total % 10) % 10)
+
+# --- VERSIONES POR LOTES ---
+# Operan sobre una columna completa y dan exactamente el mismo resultado que aplicar la función
+# escalar fila a fila con .apply. La limpieza y los dígitos de control se calculan con NumPy
+# directamente sobre los bytes UTF-8 del array de Arrow, sin crear un objeto Python por fila
+
+# Convierte la columna en un array Arrow large_string; los valores que no son texto pasan a nulos
+def _a_arrow_texto(serie):
+    import pandas as pd
+    if serie.dtype != object and pd.api.types.is_string_dtype(serie.dtype):
+        # Columna de texto nativa: se reutilizan los buffers de Arrow sin pasar por objetos Python
+        arreglo = pa.array(serie.array)
+        if isinstance(arreglo, pa.ChunkedArray):
+            arreglo = arreglo.combine_chunks()
+        return arreglo.cast(pa.large_string())
+    if pd.api.types.is_numeric_dtype(serie.dtype):
+        return pa.nulls(len(serie), type=pa.large_string())
+    valores = serie.to_numpy(dtype=object)
+    es_texto = np.fromiter((isinstance(valor, str) for valor in valores), dtype=bool, count=len(valores))
+    return pa.array(valores, type=pa.large_string(), mask=~es_texto)
+
+# Versión por lotes de limpiar_isbn sobre un array Arrow: conserva dígitos y 'X' (la 'x' pasa a 'X').
+# Ningún otro carácter se convierte en dígito o 'X' al pasar a mayúsculas, así que basta filtrar bytes ASCII
+def _limpiar_isbn_arrow(arreglo):
+    num_filas = len(arreglo)
+    _, buffer_offsets, buffer_datos = arreglo.buffers()
+    offsets = np.frombuffer(buffer_offsets, dtype=np.int64)[arreglo.offset:arreglo.offset + num_filas + 1]
+    datos = np.frombuffer(buffer_datos, dtype=np.uint8)[offsets[0]:offsets[-1]] if buffer_datos is not None else np.empty(0, dtype=np.uint8)
+    offsets = offsets - offsets[0]
+
+    datos = np.where(datos == ord('x'), ord('X'), datos).astype(np.uint8)
+    conservar = ((datos >= ord('0')) & (datos <= ord('9'))) | (datos == ord('X'))
+    acumulado = np.concatenate(([0], np.cumsum(conservar, dtype=np.int64)))
+    nuevos_offsets = acumulado[offsets]
+    limpio = pa.LargeStringArray.from_buffers(
+        num_filas, pa.py_buffer(nuevos_offsets), pa.py_buffer(datos[conservar].tobytes())
+    )
+    # Los nulos de la entrada siguen siendo nulos
+    return pc.if_else(arreglo.is_null(), pa.scalar(None, pa.large_string()), limpio)
+
+# Matriz de bytes (n x longitud) de las filas indicadas de un array Arrow limpio
+def _matriz_bytes(arreglo, filas, longitud):
+    _, buffer_offsets, buffer_datos = arreglo.buffers()
+    offsets = np.frombuffer(buffer_offsets, dtype=np.int64)[arreglo.offset:arreglo.offset + len(arreglo) + 1]
+    datos = np.frombuffer(buffer_datos, dtype=np.uint8)
+    return datos[offsets[filas][:, None] + np.arange(longitud)]
+
+# Longitudes en bytes de un array Arrow (0 para los nulos)
+def _longitudes(arreglo):
+    return pc.fill_null(pc.binary_length(arreglo), 0).to_numpy()
+
+# Construye la Series de salida con la misma inferencia de tipos que .apply
+def _serie_resultado(valores, serie):
+    import pandas as pd
+    return pd.Series(valores, index=serie.index, name=serie.name)
+
+# Versión por lotes de limpiar_isbn
+def limpiar_isbn_lote(serie):
+    limpio = _limpiar_isbn_arrow(_a_arrow_texto(serie))
+    return _serie_resultado(limpio.to_numpy(zero_copy_only=False), serie)
+
+# Índices de las filas válidas como ISBN-13 y array limpio del que extraerlas
+def _validar_isbn13_arrow(limpio):
+    filas = np.flatnonzero(_longitudes(limpio) == 13)
+    digitos = _matriz_bytes(limpio, filas, 13).astype(np.int64) - ord('0')
+    candidatos = (digitos >= 0).all(axis=1) & (digitos <= 9).all(axis=1)
+    filas, digitos = filas[candidatos], digitos[candidatos]
+    control = (10 - (digitos[:, :12] @ PESOS_ISBN13) % 10) % 10
+    return filas[control == digitos[:, 12]]
+
+# Índices de las filas válidas como ISBN-10
+def _validar_isbn10_arrow(limpio):
+    filas = np.flatnonzero(_longitudes(limpio) == 10)
+    digitos = _matriz_bytes(limpio, filas, 10).astype(np.int64) - ord('0')
+    # La 'X' solo puede ir en la última posición, donde vale 10
+    digitos[:, 9] = np.where(digitos[:, 9] == ord('X') - ord('0'), 10, digitos[:, 9])
+    candidatos = (digitos[:, :9] >= 0).all(axis=1) & (digitos[:, :9] <= 9).all(axis=1) & (digitos[:, 9] >= 0) & (digitos[:, 9] <= 10)
+    filas, digitos = filas[candidatos], digitos[candidatos]
+    esperado = (11 - (digitos[:, :9] @ PESOS_ISBN10) % 11) % 11
+    return filas[esperado == digitos[:, 9]]
+
+# Coloca las cadenas de las filas válidas en un array de None del tamaño de la columna
+def _rellenar(limpio, filas):
+    resultado = np.full(len(limpio), None, dtype=object)
+    if len(filas):
+        resultado[filas] = limpio.take(pa.array(filas)).to_numpy(zero_copy_only=False)
+    return resultado
+
+# Versión por lotes de formatear_isbn13
+def formatear_isbn13_lote(serie):
+    limpio = _limpiar_isbn_arrow(_a_arrow_texto(serie))
+    return _serie_resultado(_rellenar(limpio, _validar_isbn13_arrow(limpio)), serie)
+
+# Versión por lotes de formatear_isbn10
+def formatear_isbn10_lote(serie):
+    limpio = _limpiar_isbn_arrow(_a_arrow_texto(serie))
+    return _serie_resultado(_rellenar(limpio, _validar_isbn10_arrow(limpio)), serie)
+
+# Versión por lotes de convertir_isbn10_a_isbn13
+def convertir_isbn10_a_isbn13_lote(serie):
+    limpio = _limpiar_isbn_arrow(_a_arrow_texto(serie))
+    filas = _validar_isbn10_arrow(limpio)
+    resultado = np.full(len(serie), None, dtype=object)
+    if len(filas):
+        digitos = np.concatenate((
+            np.tile([9, 7, 8], (len(filas), 1)),
+            _matriz_bytes(limpio, filas, 9).astype(np.int64) - ord('0')
+        ), axis=1)
+        control = (10 - (digitos @ PESOS_ISBN13) % 10) % 10
+        matriz = np.concatenate((digitos, control[:, None]), axis=1).astype(np.uint8) + ord('0')
+        resultado[filas] = np.frombuffer(matriz.tobytes(), dtype='S13').astype(str).astype(object)
+    return _serie_resultado(resultado, serie)
+
+# --- VERSIONES SOBRE ARRAYS DE ARROW ---
+# Para el motor Arrow: reciben un array large_string y devuelven otro con los valores no válidos como nulos,
+# con el mismo resultado que las versiones por lotes y sin pasar por objetos Python
+
+# Conserva las filas indicadas de un array limpio; el resto pasa a nulo
+def _conservar_filas(limpio, filas):
+    mascara = np.zeros(len(limpio), dtype=bool)
+    mascara[filas] = True
+    return pc.if_else(pa.array(mascara), limpio, pa.scalar(None, pa.large_string()))
+
+# Versión sobre Arrow de formatear_isbn13_lote
+def formatear_isbn13_arrow(arreglo):
+    limpio = _limpiar_isbn_arrow(arreglo)
+    return _conservar_filas(limpio, _validar_isbn13_arrow(limpio))
+
+# Versión sobre Arrow de formatear_isbn10_lote
+def formatear_isbn10_arrow(arreglo):
+    limpio = _limpiar_isbn_arrow(arreglo)
+    return _conservar_filas(limpio, _validar_isbn10_arrow(limpio))
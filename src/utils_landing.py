@@ -0,0 +1,129 @@
+import math
+import os
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# --- CONFIGURACIÓN ---
+DIRECTORIO_LANDING = "landing"
+ARCHIVO_GOODREADS = "goodreads_books.parquet"
+ARCHIVO_GOOGLE_BOOKS = "googlebooks_books.parquet"
+# Formato anterior de la zona landing; se sigue leyendo si no existen los archivos Parquet
+ARCHIVO_GOODREADS_LEGADO = "goodreads_books.json"
+ARCHIVO_GOOGLE_BOOKS_LEGADO = "googlebooks_books.csv"
+RUTA_LANDING_GOODREADS = os.path.join(DIRECTORIO_LANDING, ARCHIVO_GOODREADS)
+RUTA_LANDING_GOOGLE_BOOKS = os.path.join(DIRECTORIO_LANDING, ARCHIVO_GOOGLE_BOOKS)
+FILAS_POR_LOTE_LANDING = 10_000 # Registros acumulados antes de escribir un row group
+COMPRESION_LANDING = 'zstd'
+
+# Esquemas declarados de la zona landing: los tipos ya no dependen de lo que infiera el lector
+ESQUEMA_LANDING_GOODREADS = pa.schema([
+    ('title', pa.string()),
+    ('author', pa.string()),
+    ('rating', pa.float64()),
+    ('ratings_count', pa.int64()),
+    ('book_url', pa.string()),
+    ('isbn10', pa.string()),
+    ('isbn13', pa.string()),
+])
+ESQUEMA_LANDING_GOOGLE_BOOKS = pa.schema([
+    ('gb_id', pa.string()),
+    ('title', pa.string()),
+    ('subtitle', pa.string()),
+    ('authors', pa.string()),
+    ('publisher', pa.string()),
+    ('pub_date', pa.string()),
+    ('language', pa.string()),
+    ('categories', pa.string()),
+    ('isbn13', pa.string()),
+    ('isbn10', pa.string()),
+    ('price_amount', pa.float64()),
+    ('price_currency', pa.string()),
+])
+
+# Escritor en streaming de un archivo de la zona landing: los registros se acumulan y se vuelcan como row groups
+# de filas_por_lote filas. Se escribe en un archivo temporal que sustituye al definitivo al cerrar sin errores,
+# así un lector nunca ve un archivo a medias. Si no se escribe ningún registro, el archivo anterior se conserva.
+# Con vacios_como_nulos las cadenas vacías se guardan como nulos, igual que las leía el CSV anterior
+class EscritorLanding:
+    def __init__(self, ruta, esquema, filas_por_lote=FILAS_POR_LOTE_LANDING, vacios_como_nulos=False):
+        self.ruta = ruta
+        self.esquema = esquema
+        self.filas_por_lote = filas_por_lote
+        self.vacios_como_nulos = vacios_como_nulos
+        self.campos_texto = {campo.name for campo in esquema if pa.types.is_string(campo.type)}
+        self.pendientes = []
+        self.filas_escritas = 0
+        self.escritor = None
+        self.ruta_temporal = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        self.ruta_temporal = self.ruta + '.tmp'
+        self.escritor = pq.ParquetWriter(self.ruta_temporal, self.esquema, compression=COMPRESION_LANDING)
+        return self
+
+    # Ajusta un registro al esquema: NaN como nulo, valores no textuales en campos de texto como str
+    def _preparar(self, registro):
+        fila = {}
+        for nombre in self.esquema.names:
+            valor = registro.get(nombre)
+            if isinstance(valor, float) and math.isnan(valor):
+                valor = None
+            elif nombre in self.campos_texto and valor is not None:
+                valor = valor if isinstance(valor, str) else str(valor)
+                if self.vacios_como_nulos and not valor:
+                    valor = None
+            fila[nombre] = valor
+        return fila
+
+    def escribir(self, registro):
+        self.pendientes.append(self._preparar(registro))
+        if len(self.pendientes) >= self.filas_por_lote:
+            self._volcar()
+
+    def _volcar(self):
+        if self.pendientes:
+            self.escritor.write_table(pa.Table.from_pylist(self.pendientes, schema=self.esquema))
+            self.filas_escritas += len(self.pendientes)
+            self.pendientes = []
+
+    def __exit__(self, tipo_excepcion, *excepcion):
+        try:
+            if tipo_excepcion is None:
+                self._volcar()
+        finally:
+            self.escritor.close()
+        if tipo_excepcion is None and self.filas_escritas:
+            os.replace(self.ruta_temporal, self.ruta)
+        else:
+            os.remove(self.ruta_temporal)
+
+# Escribe una lista de registros de una vez
+def escribir_landing(registros, ruta, esquema, vacios_como_nulos=False):
+    with EscritorLanding(ruta, esquema, vacios_como_nulos=vacios_como_nulos) as escritor:
+        for registro in registros:
+            escritor.escribir(registro)
+    return escritor.filas_escritas
+
+# Devuelve la ruta del archivo de una fuente en la zona landing: el Parquet si existe, si no el del formato
+# anterior, o None si no hay ninguno
+def buscar_archivo_landing(directorio, archivo, archivo_legado):
+    for nombre in (archivo, archivo_legado):
+        ruta = os.path.join(directorio, nombre)
+        if os.path.exists(ruta):
+            return ruta
+    return None
+
+def es_landing_parquet(ruta):
+    return ruta.endswith('.parquet')
+
+# Lee un archivo Parquet de la zona landing completo (o solo algunas columnas) con memory map
+def leer_landing(ruta, columnas=None):
+    return pq.read_table(ruta, columns=columnas, memory_map=True).to_pandas()
+
+# Lee un archivo Parquet de la zona landing por bloques de tamano_bloque filas, sin cargarlo entero
+def leer_landing_por_bloques(ruta, tamano_bloque, columnas=None):
+    archivo = pq.ParquetFile(ruta, memory_map=True)
+    for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=columnas):
+        yield pa.Table.from_batches([lote]).to_pandas()
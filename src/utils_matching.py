@@ -0,0 +1,261 @@
+import numpy as np
+import pandas as pd
+
+from utils_isbn import formatear_isbn10_lote, formatear_isbn13_lote
+
+# --- CONFIGURACIÓN ---
+UMBRAL_PUNTUACION_MATCH = 0.6 # Puntuación mínima para aceptar un emparejamiento difuso
+PESO_TITULO = 0.75 # Peso de la similitud de título; el resto corresponde al autor
+MAX_FILAS_BLOQUE = 100 # Bloques con más filas de Google Books (palabras demasiado comunes) no generan candidatos
+CLAVES_POR_FILA = 3 # Cada libro de Goodreads solo se busca en sus bloques más pequeños
+TAMANO_LOTE_DIFUSO = 50_000 # Libros de Goodreads puntuados a la vez; acota la memoria de los pares candidatos
+LONGITUD_PREFIJO_AUTOR = 4 # Los autores se agrupan por los primeros caracteres de cada palabra del nombre
+COLUMNAS_INDICE_GB = ['titulo_gb', 'autores_gb', 'isbn13_gb', 'isbn10_gb'] # Columnas de Google Books que usa el emparejamiento
+PALABRAS_VACIAS = {
+    'a', 'an', 'and', 'the', 'of', 'for', 'to', 'in', 'on', 'with', 'by',
+    'el', 'la', 'los', 'las', 'de', 'del', 'y', 'en', 'para', 'con', 'un', 'una',
+}
+
+# Los ISBN leídos con read_json/read_csv pueden llegar como números; para emparejar se vuelven a texto
+def _isbn_como_texto(serie):
+    if isinstance(serie.dtype, pd.StringDtype):
+        return serie.astype(object).where(serie.notna(), None)
+
+    def a_texto(valor):
+        if isinstance(valor, str):
+            return valor
+        if isinstance(valor, (int, np.integer)):
+            return str(valor)
+        if isinstance(valor, (float, np.floating)) and np.isfinite(valor) and float(valor).is_integer():
+            return str(int(valor))
+        return None
+    return serie.map(a_texto).astype(object)
+
+# Divide cada texto en palabras normalizadas (minúsculas, sin signos de puntuación)
+def _tokenizar(serie):
+    es_texto = serie.map(lambda valor: isinstance(valor, str)).astype(bool)
+    if not es_texto.any():
+        return pd.Series([np.nan] * len(serie), dtype=object)
+    texto = serie.where(es_texto).astype(object).reset_index(drop=True)
+    return texto.str.lower().str.replace(r'[^\w\s]', ' ', regex=True).str.split()
+
+# Convierte listas de palabras por fila en un DataFrame (indice, token) sin repeticiones
+def _explotar(listas):
+    tokens = pd.DataFrame({'indice': np.arange(len(listas)), 'token': listas.to_numpy()}).explode('token')
+    return tokens.dropna().drop_duplicates().reset_index(drop=True)
+
+# Sustituye las palabras de Google Books por códigos enteros, para que los cruces no comparen cadenas.
+# Devuelve las palabras codificadas y el vocabulario con el que se codifican después las de Goodreads
+def _vocabulario(tokens_gb):
+    codigos, vocabulario = pd.factorize(tokens_gb['token'])
+    return tokens_gb.assign(token=codigos), pd.Index(vocabulario)
+
+# Codifica palabras de Goodreads con el vocabulario de Google Books; las que no aparecen en él reciben códigos nuevos
+def _codificar_tokens(tokens_gr, vocabulario):
+    codigos = vocabulario.get_indexer(tokens_gr['token'])
+    nuevas = codigos < 0
+    if nuevas.any():
+        codigos[nuevas] = len(vocabulario) + pd.factorize(tokens_gr['token'].to_numpy()[nuevas])[0]
+    return tokens_gr.assign(token=codigos)
+
+# Mapa de ISBN normalizado a fila de Google Books; si varias filas comparten ISBN gana la primera
+def _mapa_isbn(isbn_gb):
+    derecha = pd.DataFrame({'isbn': isbn_gb.to_numpy(), 'indice_gb': np.arange(len(isbn_gb))}).dropna()
+    return derecha.drop_duplicates('isbn', keep='first')
+
+# Empareja filas por igualdad exacta de ISBN con el mapa de Google Books
+def _emparejar_por_isbn(isbn_gr, derecha, indices_gr, metodo):
+    izquierda = pd.DataFrame({'isbn': isbn_gr.to_numpy()[indices_gr], 'indice_gr': indices_gr}).dropna()
+    pares = izquierda.merge(derecha, on='isbn')[['indice_gr', 'indice_gb']]
+    pares['puntuacion_match'] = 1.0
+    pares['metodo_match'] = metodo
+    return pares
+
+# Claves de bloque de cada fila: palabras del título, título completo y prefijos de las palabras del autor
+def _claves_bloque(tokens_titulo, tokens_autor, listas_titulo):
+    titulo = tokens_titulo[(tokens_titulo['token'].str.len() > 1) & ~tokens_titulo['token'].isin(PALABRAS_VACIAS)]
+    autor = tokens_autor[tokens_autor['token'].str.len() >= 3]
+    completo = pd.DataFrame({
+        'indice': np.arange(len(listas_titulo)),
+        'token': listas_titulo.map(lambda tokens: ' '.join(tokens) if isinstance(tokens, list) and tokens else None).to_numpy()
+    }).dropna()
+    return pd.concat([
+        pd.DataFrame({'indice': titulo['indice'], 'clave': 't:' + titulo['token']}),
+        pd.DataFrame({'indice': completo['indice'], 'clave': 'f:' + completo['token']}),
+        pd.DataFrame({'indice': autor['indice'], 'clave': 'a:' + autor['token'].str.slice(0, LONGITUD_PREFIJO_AUTOR)}),
+    ], ignore_index=True).drop_duplicates()
+
+# Elige los bloques en los que se busca cada libro de Goodreads: sus CLAVES_POR_FILA bloques más pequeños,
+# ignorando los de más de MAX_FILAS_BLOQUE filas de Google Books. Así cada libro tiene un número acotado
+# de candidatos y el total crece linealmente con el tamaño del catálogo
+def _seleccionar_bloques(bloques_gr, indice_gb):
+    codigos = indice_gb['vocabulario_bloques'].get_indexer(bloques_gr['clave'])
+    bloques_gr = pd.DataFrame({'indice': bloques_gr['indice'].to_numpy(), 'token': codigos})[codigos >= 0]
+
+    bloques_gr = bloques_gr.assign(tamano=indice_gb['tamano_bloque'][bloques_gr['token'].to_numpy(dtype=np.int64)])
+    bloques_gr = bloques_gr[bloques_gr['tamano'] <= MAX_FILAS_BLOQUE]
+    bloques_gr = bloques_gr.sort_values(['indice', 'tamano'], kind='stable')
+    bloques_gr = bloques_gr[bloques_gr.groupby('indice').cumcount() < CLAVES_POR_FILA]
+    return bloques_gr[['indice', 'token']].rename(columns={'indice': 'indice_gr'})
+
+# Cuenta las palabras que comparte cada par candidato sin cruces de pandas: las palabras de la fila de Goodreads
+# se expanden por par y se buscan, como clave entera (fila_gb, palabra), en las claves ordenadas de Google Books
+def _contar_compartidos(candidatos, tokens_gr, tokens_gb):
+    gr = candidatos['indice_gr'].to_numpy(dtype=np.int64)
+    gb = candidatos['indice_gb'].to_numpy(dtype=np.int64)
+    tokens_gr = tokens_gr.sort_values('indice', kind='stable')
+    indice_gr = tokens_gr['indice'].to_numpy(dtype=np.int64)
+    token_gr = tokens_gr['token'].to_numpy(dtype=np.int64)
+    token_gb = tokens_gb['token'].to_numpy(dtype=np.int64)
+    num_tokens = max(token_gr.max(initial=-1), token_gb.max(initial=-1)) + 1
+
+    conteo_gr = np.bincount(indice_gr, minlength=gr.max(initial=-1) + 1)
+    inicio_gr = np.concatenate(([0], np.cumsum(conteo_gr)[:-1]))
+    por_par = conteo_gr[gr]
+    par = np.repeat(np.arange(len(candidatos)), por_par)
+    desplazamiento = np.arange(len(par)) - np.repeat(np.cumsum(por_par) - por_par, por_par)
+    claves = gb[par] * num_tokens + token_gr[inicio_gr[gr][par] + desplazamiento]
+
+    claves_gb = np.sort(tokens_gb['indice'].to_numpy(dtype=np.int64) * num_tokens + token_gb)
+    posicion = np.minimum(np.searchsorted(claves_gb, claves), max(len(claves_gb) - 1, 0))
+    encontrada = claves_gb[posicion] == claves if len(claves_gb) else np.zeros(len(claves), dtype=bool)
+    return np.bincount(par, weights=encontrada, minlength=len(candidatos))
+
+# Número de palabras por fila
+def _contar_tokens(tokens, num_filas):
+    return np.bincount(tokens['indice'].to_numpy(dtype=np.int64), minlength=num_filas)
+
+# Puntúa los pares candidatos y se queda, para cada libro de Goodreads, con el mejor por encima del umbral
+def _puntuar_candidatos(candidatos, tokens_titulo_gr, tokens_titulo_gb, tokens_autor_gr, tokens_autor_gb, num_palabras):
+    gr, gb = candidatos['indice_gr'].to_numpy(), candidatos['indice_gb'].to_numpy()
+    num_titulo_gr, num_titulo_gb, num_autor_gr, num_autor_gb = num_palabras
+
+    # Similitud de título: media de Jaccard y del coeficiente de solapamiento, para que
+    # "Clean Code" y "Clean Code: A Handbook..." se consideren parecidos
+    compartidos = _contar_compartidos(candidatos, tokens_titulo_gr, tokens_titulo_gb)
+    num_gr, num_gb = num_titulo_gr[gr], num_titulo_gb[gb]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jaccard = np.nan_to_num(compartidos / (num_gr + num_gb - compartidos))
+        solape_titulo = np.nan_to_num(compartidos / np.minimum(num_gr, num_gb))
+
+        # Similitud de autor: coeficiente de solapamiento entre las palabras de los nombres
+        compartidos_autor = _contar_compartidos(candidatos, tokens_autor_gr, tokens_autor_gb)
+        solape_autor = np.nan_to_num(compartidos_autor / np.minimum(num_autor_gr[gr], num_autor_gb[gb]))
+
+    candidatos['puntuacion_match'] = PESO_TITULO * (jaccard + solape_titulo) / 2 + (1 - PESO_TITULO) * solape_autor
+    candidatos['metodo_match'] = np.where(jaccard == 1.0, 'titulo_exacto', 'difuso')
+    candidatos = candidatos[candidatos['puntuacion_match'] >= UMBRAL_PUNTUACION_MATCH]
+
+    # Para cada libro de Goodreads gana el candidato con mayor puntuación (a igualdad, el primero de Google Books)
+    return (
+        candidatos.sort_values(['indice_gr', 'puntuacion_match', 'indice_gb'], ascending=[True, False, True])
+        .drop_duplicates('indice_gr', keep='first')
+    )
+
+# Empareja por similitud de título y autor dentro de bloques: solo se comparan filas que comparten alguna clave de bloque.
+# Los libros de Goodreads se procesan en lotes de TAMANO_LOTE_DIFUSO para acotar la memoria
+def _emparejar_difuso(titulos_gr, autores_gr, indice_gb, indices_gr):
+    listas_titulo_gr = _tokenizar(titulos_gr)
+    tokens_titulo_gr, tokens_autor_gr = _explotar(listas_titulo_gr), _explotar(_tokenizar(autores_gr))
+
+    bloques_gr = _claves_bloque(tokens_titulo_gr, tokens_autor_gr, listas_titulo_gr)
+    bloques_gr = _seleccionar_bloques(bloques_gr[bloques_gr['indice'].isin(indices_gr)], indice_gb)
+    bloques_gb = indice_gb['bloques']
+
+    tokens_titulo_gr = _codificar_tokens(tokens_titulo_gr, indice_gb['vocabulario_titulo'])
+    tokens_autor_gr = _codificar_tokens(tokens_autor_gr, indice_gb['vocabulario_autor'])
+    tokens_titulo_gb, tokens_autor_gb = indice_gb['tokens_titulo'], indice_gb['tokens_autor']
+    num_palabras = (
+        _contar_tokens(tokens_titulo_gr, len(titulos_gr)), indice_gb['num_palabras_titulo'],
+        _contar_tokens(tokens_autor_gr, len(autores_gr)), indice_gb['num_palabras_autor'],
+    )
+
+    resultados = []
+    for inicio in range(0, len(indices_gr), TAMANO_LOTE_DIFUSO):
+        lote = indices_gr[inicio:inicio + TAMANO_LOTE_DIFUSO]
+        candidatos = (
+            bloques_gr[bloques_gr['indice_gr'].isin(lote)]
+            .merge(bloques_gb, on='token')[['indice_gr', 'indice_gb']]
+            .drop_duplicates().reset_index(drop=True)
+        )
+        if not candidatos.empty:
+            resultados.append(_puntuar_candidatos(
+                candidatos,
+                tokens_titulo_gr, tokens_titulo_gb, tokens_autor_gr, tokens_autor_gb, num_palabras
+            ))
+
+    if not resultados:
+        return pd.DataFrame(columns=['indice_gr', 'indice_gb', 'puntuacion_match', 'metodo_match'])
+    return pd.concat(resultados, ignore_index=True)
+
+# Índice de Google Books para emparejar: los mapas de ISBN y, para el emparejamiento difuso, las palabras y claves
+# de bloque de cada fila ya codificadas. Solo usa las columnas COLUMNAS_INDICE_GB y se construye una vez para
+# emparejar cualquier número de bloques de Goodreads; los índices de fila son posicionales
+def indexar_google_books(df_gb):
+    isbn = {
+        columna: _mapa_isbn(formatear(_isbn_como_texto(df_gb[columna])))
+        for columna, formatear in [('isbn13_gb', formatear_isbn13_lote), ('isbn10_gb', formatear_isbn10_lote)]
+        if columna in df_gb.columns
+    }
+    autores_gb = df_gb['autores_gb'] if 'autores_gb' in df_gb.columns else pd.Series([None] * len(df_gb))
+    listas_titulo = _tokenizar(df_gb['titulo_gb'])
+    tokens_titulo, tokens_autor = _explotar(listas_titulo), _explotar(_tokenizar(autores_gb))
+
+    # Los bloques de más de MAX_FILAS_BLOQUE filas nunca se eligen, así que no se guardan sus filas
+    bloques, vocabulario_bloques = _vocabulario(_claves_bloque(tokens_titulo, tokens_autor, listas_titulo).rename(columns={'clave': 'token'}))
+    tamano_bloque = np.bincount(bloques['token'].to_numpy(dtype=np.int64), minlength=len(vocabulario_bloques))
+    bloques = bloques[tamano_bloque[bloques['token'].to_numpy(dtype=np.int64)] <= MAX_FILAS_BLOQUE]
+
+    tokens_titulo, vocabulario_titulo = _vocabulario(tokens_titulo)
+    tokens_autor, vocabulario_autor = _vocabulario(tokens_autor)
+    return {
+        'num_filas': len(df_gb),
+        'isbn': isbn,
+        'bloques': bloques.rename(columns={'indice': 'indice_gb'}).reset_index(drop=True),
+        'vocabulario_bloques': vocabulario_bloques,
+        'tamano_bloque': tamano_bloque,
+        'tokens_titulo': tokens_titulo,
+        'vocabulario_titulo': vocabulario_titulo,
+        'num_palabras_titulo': _contar_tokens(tokens_titulo, len(df_gb)),
+        'tokens_autor': tokens_autor,
+        'vocabulario_autor': vocabulario_autor,
+        'num_palabras_autor': _contar_tokens(tokens_autor, len(df_gb)),
+    }
+
+# Empareja cada libro de Goodreads con como mucho una fila del índice de Google Books (ver indexar_google_books).
+# Primero por ISBN-13, después por ISBN-10 y, para el resto, por similitud de título y autor.
+# Devuelve un DataFrame (indice_gr, indice_gb, puntuacion_match, metodo_match) con índices posicionales
+def emparejar_con_indice(df_gr, indice_gb):
+    pendientes = np.arange(len(df_gr))
+    pares = []
+
+    for columna_gr, columna_gb, formatear, metodo in [
+        ('isbn13_gr', 'isbn13_gb', formatear_isbn13_lote, 'isbn13'),
+        ('isbn10_gr', 'isbn10_gb', formatear_isbn10_lote, 'isbn10'),
+    ]:
+        if columna_gr not in df_gr.columns or columna_gb not in indice_gb['isbn']:
+            continue
+        pares_isbn = _emparejar_por_isbn(
+            formatear(_isbn_como_texto(df_gr[columna_gr])), indice_gb['isbn'][columna_gb], pendientes, metodo
+        )
+        pares.append(pares_isbn)
+        pendientes = np.setdiff1d(pendientes, pares_isbn['indice_gr'].to_numpy())
+
+    if len(pendientes) and indice_gb['num_filas']:
+        pares.append(_emparejar_difuso(df_gr['titulo_gr'], df_gr['autor_gr'], indice_gb, pendientes))
+
+    pares = [p for p in pares if not p.empty]
+    if not pares:
+        return pd.DataFrame({
+            'indice_gr': pd.Series(dtype='int64'), 'indice_gb': pd.Series(dtype='int64'),
+            'puntuacion_match': pd.Series(dtype='float64'), 'metodo_match': pd.Series(dtype=object),
+        })
+    resultado = pd.concat(pares, ignore_index=True)
+    resultado['indice_gr'] = resultado['indice_gr'].astype('int64')
+    resultado['indice_gb'] = resultado['indice_gb'].astype('int64')
+    resultado['puntuacion_match'] = resultado['puntuacion_match'].astype('float64')
+    return resultado.sort_values('indice_gr').reset_index(drop=True)
+
+# Empareja cada libro de Goodreads con como mucho un libro de Google Books (ver emparejar_con_indice)
+def emparejar_fuentes(df_gr, df_gb):
+    return emparejar_con_indice(df_gr, indexar_google_books(df_gb))
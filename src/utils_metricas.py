@@ -0,0 +1,203 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError: # Windows: no hay getrusage, el pico de memoria queda sin medir
+    resource = None
+
+# --- CONFIGURACIÓN ---
+RUTA_METRICAS_EJECUCION = os.path.join('docs', 'run_metrics.json') # Junto a quality_metrics.json
+# Perfilador opcional de toda la ejecución: None, 'cprofile' o 'pyinstrument' (este último requiere instalarlo aparte)
+PERFILADOR_DEFAULT = None
+PERFILADORES = ('cprofile', 'pyinstrument')
+DIRECTORIO_PERFILES = os.path.join('docs', 'perfiles')
+PERCENTILES_LATENCIA = (50, 90, 99)
+
+# Pico de memoria residente del proceso en MB (ru_maxrss está en KB en Linux y en bytes en macOS)
+def rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if os.uname().sysname == 'Darwin' else 1024), 1)
+
+# Memoria residente actual en MB, o None si el sistema no expone /proc
+def rss_actual_mb():
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            paginas = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+
+# Tiempo de CPU del proceso y de los subprocesos ya terminados (pools de parseo y de hash)
+def tiempo_cpu():
+    tiempos = os.times()
+    return tiempos.user + tiempos.system + tiempos.children_user + tiempos.children_system
+
+# Percentil por rango más cercano de una lista ya ordenada
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return None
+    posicion = max(0, -(-len(valores_ordenados) * p // 100) - 1)
+    return valores_ordenados[int(posicion)]
+
+# Registro de métricas de una ejecución: tiempos por etapa y contadores HTTP.
+# Es seguro entre hilos porque el enriquecedor y el scraper registran peticiones desde varios a la vez
+class RegistroMetricas:
+    def __init__(self):
+        self.candado = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self.candado:
+            self.inicio = datetime.now(timezone.utc)
+            self.etapas = []
+            self.contadores = Counter()
+            self.latencias = []
+
+    # Mide una etapa: tiempo real, tiempo de CPU, memoria y filas/s. El llamante puede anotar
+    # las filas procesadas en el diccionario que devuelve el bloque with
+    @contextmanager
+    def etapa(self, nombre, filas=None):
+        medicion = {'etapa': nombre, 'filas': filas}
+        inicio_real, inicio_cpu = time.perf_counter(), tiempo_cpu()
+        try:
+            yield medicion
+        finally:
+            segundos = time.perf_counter() - inicio_real
+            medicion['segundos'] = round(segundos, 4)
+            medicion['segundos_cpu'] = round(tiempo_cpu() - inicio_cpu, 4)
+            medicion['filas_por_segundo'] = round(medicion['filas'] / segundos, 1) if medicion['filas'] and segundos > 0 else None
+            medicion['rss_actual_mb'] = rss_actual_mb()
+            medicion['rss_pico_mb'] = rss_pico_mb()
+            with self.candado:
+                self.etapas.append(medicion)
+
+    def contar(self, nombre, cantidad=1):
+        with self.candado:
+            self.contadores[nombre] += cantidad
+
+    # Registra un intento HTTP contra la red, con su latencia en segundos y los bytes recibidos
+    def registrar_peticion(self, latencia, num_bytes=0, codigo=None):
+        with self.candado:
+            self.contadores['http_peticiones'] += 1
+            self.contadores['http_bytes'] += num_bytes
+            if codigo is None:
+                self.contadores['http_errores_red'] += 1
+            else:
+                self.contadores[f'http_codigo_{codigo}'] += 1
+            self.latencias.append(latencia)
+
+    def resumen_http(self):
+        with self.candado:
+            latencias = sorted(self.latencias)
+            contadores = dict(self.contadores)
+        resumen = {nombre: valor for nombre, valor in sorted(contadores.items())}
+        resumen['latencia_ms'] = {
+            **{f'p{p}': round(percentil(latencias, p) * 1000, 1) if latencias else None for p in PERCENTILES_LATENCIA},
+            'maxima': round(latencias[-1] * 1000, 1) if latencias else None,
+            'media': round(sum(latencias) / len(latencias) * 1000, 1) if latencias else None,
+        }
+        return resumen
+
+    def resumen(self):
+        with self.candado:
+            etapas = list(self.etapas)
+        return {
+            'inicio': self.inicio.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'etapas': etapas,
+            'http': self.resumen_http(),
+        }
+
+_registro_global = RegistroMetricas()
+
+# Devuelve el registro de métricas compartido por todos los módulos del proceso
+def obtener_registro():
+    return _registro_global
+
+# Atajo para medir una etapa en el registro global
+def etapa(nombre, filas=None):
+    return _registro_global.etapa(nombre, filas)
+
+# Añade el resumen de la ejecución a run_metrics.json bajo el nombre del script, conservando
+# la última ejecución de los demás scripts
+def guardar_metricas(nombre_script, resumen, ruta=RUTA_METRICAS_EJECUCION):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    metricas = {}
+    if os.path.exists(ruta):
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                metricas = json.load(f)
+        except json.JSONDecodeError:
+            metricas = {}
+    metricas[nombre_script] = resumen
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(metricas, f, indent=4, ensure_ascii=False)
+    print(f"Guardado {os.path.basename(ruta)}")
+
+# Perfila el bloque con cProfile o pyinstrument y deja el resultado en DIRECTORIO_PERFILES
+@contextmanager
+def perfilar(nombre, perfilador=PERFILADOR_DEFAULT):
+    if perfilador is None:
+        yield
+        return
+    if perfilador not in PERFILADORES:
+        raise ValueError(f"Perfilador desconocido: '{perfilador}'. Opciones: {', '.join(PERFILADORES)}.")
+
+    if perfilador == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("pyinstrument no está instalado: la ejecución continúa sin perfilar.")
+            yield
+            return
+        perfil = Profiler()
+        perfil.start()
+        try:
+            yield
+        finally:
+            perfil.stop()
+            os.makedirs(DIRECTORIO_PERFILES, exist_ok=True)
+            ruta = os.path.join(DIRECTORIO_PERFILES, f"{nombre}.html")
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(perfil.output_html())
+            print(f"Perfil guardado en {ruta}")
+        return
+
+    import cProfile
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        os.makedirs(DIRECTORIO_PERFILES, exist_ok=True)
+        ruta = os.path.join(DIRECTORIO_PERFILES, f"{nombre}.prof")
+        perfil.dump_stats(ruta)
+        print(f"Perfil guardado en {ruta}")
+
+# Decorador para el main de cada script: mide la ejecución completa como etapa 'total', la perfila si se
+# ha configurado un perfilador y guarda las métricas al terminar, también si la ejecución falla
+def instrumentar(nombre_script, perfilador=PERFILADOR_DEFAULT, ruta=RUTA_METRICAS_EJECUCION):
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltorio(*args, **kwargs):
+            registro = obtener_registro()
+            registro.reiniciar()
+            estado = 'error'
+            try:
+                with perfilar(nombre_script, perfilador), registro.etapa('total'):
+                    resultado = funcion(*args, **kwargs)
+                estado = 'ok'
+                return resultado
+            finally:
+                guardar_metricas(nombre_script, {'estado': estado, **registro.resumen()}, ruta)
+        return envoltorio
+    return decorador
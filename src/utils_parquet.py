@@ -0,0 +1,188 @@
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# --- CONFIGURACIÓN ---
+CODEC_COMPRESION_DEFAULT = 'zstd' # 'zstd', 'snappy', 'gzip', 'brotli', 'lz4' o 'none'
+NIVEL_COMPRESION_DEFAULT = None # None usa el nivel por defecto del codec
+FILAS_POR_GRUPO_DEFAULT = 128 * 1024 # Filas por row group: grupos grandes comprimen mejor, pequeños filtran más fino
+
+# dim_book se escribe como dataset particionado estilo Hive por esta columna (particion_idioma=en/...) para que
+# los lectores puedan descartar particiones enteras; None escribe un único archivo. La clave de partición es una
+# columna derivada sin nulos (pyarrow no sabe leer particiones nulas), y la columna original se conserva.
+# Los lectores genéricos del directorio reciben también esa columna derivada; leer_tabla la descarta
+COLUMNA_PARTICION_DIM_BOOK = 'idioma'
+VALOR_PARTICION_NULA = 'desconocido'
+
+# Columnas de baja cardinalidad que se guardan con codificación de diccionario
+COLUMNAS_DICCIONARIO_DIM_BOOK = ['editorial', 'idioma', 'moneda']
+COLUMNAS_DICCIONARIO_DETALLE_FUENTE = [
+    'fuente_gr', 'fuente_gb', 'metodo_match', 'editorial_gb', 'idioma_gb', 'moneda_gb',
+    'categorias_gb', 'codigo_idioma', 'codigo_moneda', 'editorial',
+]
+
+_TEXTO_DICCIONARIO = pa.dictionary(pa.int32(), pa.string())
+
+# Esquema explícito de dim_book
+ESQUEMA_DIM_BOOK = pa.schema([
+    ('book_id', pa.string()),
+    ('titulo', pa.string()),
+    ('titulo_normalizado', pa.string()),
+    ('autor_principal', pa.string()),
+    ('autores', pa.list_(pa.string())),
+    ('editorial', _TEXTO_DICCIONARIO),
+    ('anio_publicacion', pa.int64()),
+    ('fecha_publicacion', pa.string()),
+    ('idioma', _TEXTO_DICCIONARIO),
+    ('isbn10', pa.string()),
+    ('isbn13', pa.string()),
+    ('precio', pa.float64()),
+    ('moneda', _TEXTO_DICCIONARIO),
+    ('ts_ultima_actualizacion', pa.string()),
+])
+
+# Convierte una columna al tipo indicado; los textos se codifican como diccionario cuando el destino lo es
+def _convertir_columna(columna, tipo):
+    if pa.types.is_dictionary(tipo):
+        if not pa.types.is_dictionary(columna.type):
+            columna = columna.cast(tipo.value_type).dictionary_encode()
+        return columna.cast(tipo)
+    return columna.cast(tipo)
+
+# Adapta una tabla a un esquema explícito: orden y tipos de columna; las columnas que falten se añaden como nulas
+def convertir_a_esquema(tabla, esquema):
+    columnas = [
+        _convertir_columna(tabla.column(campo.name), campo.type) if campo.name in tabla.column_names
+        else pa.nulls(tabla.num_rows, campo.type)
+        for campo in esquema
+    ]
+    # Conserva los metadatos de pandas de la tabla original (p. ej. que anio_publicacion es Int64)
+    if esquema.metadata is None and tabla.schema.metadata is not None:
+        esquema = esquema.with_metadata(tabla.schema.metadata)
+    return pa.Table.from_arrays(columnas, schema=esquema)
+
+# Esquema con las columnas de texto indicadas codificadas como diccionario
+def esquema_compacto(esquema, columnas_diccionario):
+    return pa.schema([
+        pa.field(campo.name, _TEXTO_DICCIONARIO)
+        if campo.name in columnas_diccionario and (pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type)
+                                                 or pa.types.is_null(campo.type))
+        else campo
+        for campo in esquema
+    ], metadata=esquema.metadata)
+
+# Codifica como diccionario las columnas de texto indicadas que existan en la tabla
+def compactar_tabla(tabla, columnas_diccionario):
+    return convertir_a_esquema(tabla, esquema_compacto(tabla.schema, columnas_diccionario))
+
+# Devuelve las columnas de diccionario a su tipo de texto, para combinar tablas leídas con tablas nuevas
+def decodificar_diccionarios(tabla):
+    esquema = pa.schema([
+        pa.field(campo.name, campo.type.value_type) if pa.types.is_dictionary(campo.type) else campo
+        for campo in tabla.schema
+    ], metadata=tabla.schema.metadata)
+    return convertir_a_esquema(tabla, esquema)
+
+# Opciones de escritura comunes: codec, row groups y estadísticas de columna para el filtrado por predicado
+def _opciones_escritura(codec, nivel_compresion):
+    return {
+        'compression': codec,
+        'compression_level': nivel_compresion,
+        'write_statistics': True,
+    }
+
+# Sustituye el destino (archivo o directorio) por la versión recién escrita. Quien lea el destino ve
+# la versión anterior o la nueva completas; si es un directorio hay un instante entre ambos renombrados
+def _sustituir(ruta_temporal, ruta):
+    ruta_anterior = ruta + '.anterior'
+    if os.path.isdir(ruta_anterior):
+        shutil.rmtree(ruta_anterior)
+    elif os.path.exists(ruta_anterior):
+        os.remove(ruta_anterior)
+
+    if os.path.isdir(ruta) or os.path.isdir(ruta_temporal):
+        if os.path.exists(ruta):
+            os.replace(ruta, ruta_anterior)
+        os.replace(ruta_temporal, ruta)
+        if os.path.isdir(ruta_anterior):
+            shutil.rmtree(ruta_anterior)
+        elif os.path.exists(ruta_anterior):
+            os.remove(ruta_anterior)
+    else:
+        os.replace(ruta_temporal, ruta)
+
+# Nombre de la columna de partición derivada de una columna
+def nombre_particion(columna):
+    return f"particion_{columna}"
+
+# Añade a la tabla la columna de partición: el valor de la columna como texto, o VALOR_PARTICION_NULA
+def _con_particion(tabla, columna):
+    clave = pc.fill_null(tabla.column(columna).cast(pa.string()), VALOR_PARTICION_NULA)
+    return tabla.append_column(nombre_particion(columna), clave)
+
+# Escribe lotes de registros como dataset particionado en un directorio temporal y lo coloca en su destino
+def _escribir_dataset(lotes, ruta, esquema, columna_particion, codec, nivel_compresion, filas_por_grupo):
+    ruta_temporal = ruta + '.tmp'
+    if os.path.isdir(ruta_temporal):
+        shutil.rmtree(ruta_temporal)
+
+    formato = ds.ParquetFileFormat()
+    ds.write_dataset(
+        lotes, ruta_temporal, schema=esquema.append(pa.field(nombre_particion(columna_particion), pa.string())),
+        format=formato, file_options=formato.make_write_options(**_opciones_escritura(codec, nivel_compresion)),
+        partitioning=ds.partitioning(pa.schema([(nombre_particion(columna_particion), pa.string())]), flavor='hive'),
+        basename_template='parte-{i}.parquet',
+        max_rows_per_group=filas_por_grupo, min_rows_per_group=min(filas_por_grupo, 8 * 1024),
+        existing_data_behavior='error', preserve_order=True
+    )
+    _sustituir(ruta_temporal, ruta)
+
+# Escribe una tabla de forma atómica. Con columna_particion crea un dataset particionado estilo Hive en el
+# directorio `ruta`; sin ella, un único archivo Parquet
+def escribir_tabla(tabla, ruta, columna_particion=None, codec=CODEC_COMPRESION_DEFAULT,
+                   nivel_compresion=NIVEL_COMPRESION_DEFAULT, filas_por_grupo=FILAS_POR_GRUPO_DEFAULT):
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    if columna_particion:
+        _escribir_dataset(_con_particion(tabla, columna_particion).to_batches(), ruta, tabla.schema,
+                          columna_particion, codec, nivel_compresion, filas_por_grupo)
+        return
+
+    ruta_temporal = ruta + '.tmp'
+    pq.write_table(tabla, ruta_temporal, row_group_size=filas_por_grupo, **_opciones_escritura(codec, nivel_compresion))
+    _sustituir(ruta_temporal, ruta)
+
+# Escribe como una sola tabla las partes Parquet indicadas, convertidas a `esquema`, leyendo una parte
+# cada vez (la memoria depende del tamaño de las partes, no del total)
+def escribir_tabla_desde_partes(rutas, ruta, esquema, columna_particion=None, codec=CODEC_COMPRESION_DEFAULT,
+                                nivel_compresion=NIVEL_COMPRESION_DEFAULT, filas_por_grupo=FILAS_POR_GRUPO_DEFAULT):
+    os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+    # Sin metadatos propios, el esquema toma los de pandas de la primera parte, como haría convertir_a_esquema
+    if esquema.metadata is None and rutas:
+        esquema = esquema.with_metadata(pq.read_schema(rutas[0]).metadata)
+    partes = (convertir_a_esquema(pq.read_table(ruta_parte), esquema) for ruta_parte in rutas)
+    if columna_particion:
+        lotes = (lote for parte in partes for lote in _con_particion(parte, columna_particion).to_batches())
+        _escribir_dataset(lotes, ruta, esquema, columna_particion, codec, nivel_compresion, filas_por_grupo)
+        return
+
+    ruta_temporal = ruta + '.tmp'
+    with pq.ParquetWriter(ruta_temporal, esquema, **_opciones_escritura(codec, nivel_compresion)) as escritor:
+        for parte in partes:
+            escritor.write_table(parte, row_group_size=filas_por_grupo)
+    _sustituir(ruta_temporal, ruta)
+
+# Lee un archivo Parquet o un dataset particionado con las columnas de diccionario como texto.
+# Las columnas de partición derivadas se descartan; con `columnas` se devuelven solo esas y en ese orden
+def leer_tabla(ruta, columnas=None):
+    if os.path.isdir(ruta):
+        tabla = ds.dataset(ruta, format='parquet', partitioning='hive').to_table()
+        tabla = tabla.select([nombre for nombre in tabla.column_names if not nombre.startswith('particion_')])
+    else:
+        tabla = pq.read_table(ruta)
+    if columnas is not None:
+        tabla = tabla.select(columnas)
+    return decodificar_diccionarios(tabla)
@@ -1,12 +1,51 @@
 import pandas as pd
+import numpy as np
+import os
 import re
 from datetime import datetime
+from functools import lru_cache
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Patrones de los validadores
+PATRON_IDIOMA = r'^[a-z]{2}(-[A-Z]{2})?$'
+PATRON_MONEDA = r'^[A-Z]{3}$'
+# Versiones precompiladas para los validadores escalares
+REGEX_IDIOMA = re.compile(PATRON_IDIOMA)
+REGEX_MONEDA = re.compile(PATRON_MONEDA)
+REGEX_ESPACIOS = re.compile(r'\s+')
+REGEX_MAYUSCULA_INTERIOR = re.compile(r'(?<!^)(?=[A-Z])')
+# Valores distintos que recuerda cada validador escalar (LRU). Los datos repiten mucho los mismos valores
+# (idiomas, monedas, editoriales, autores), así que casi todas las llamadas se resuelven en la caché
+TAMANO_CACHE_VALIDADORES = 65_536
+# Los mismos patrones para el motor de expresiones regulares de Arrow (RE2), donde '$' solo coincide al final del texto;
+# en re de Python también coincide antes de un salto de línea final
+PATRON_IDIOMA_ARROW = r'^[a-z]{2}(-[A-Z]{2})?\n?$'
+PATRON_MONEDA_ARROW = r'^[A-Z]{3}\n?$'
+# Espacios en blanco según str.isspace (los que reconoce \s en re de Python; el \s de RE2 solo incluye ASCII)
+PATRON_ESPACIOS_ARROW = '[' + ''.join(f'\\x{{{codigo:x}}}' for codigo in range(0x3001) if chr(codigo).isspace()) + ']+'
+# Años que pandas representa con Timestamp y que strftime escribe con cuatro cifras
+ANIO_MINIMO_VECTORIZADO = 1678
+ANIO_MAXIMO_VECTORIZADO = 2261
+# Archivos entre los que se reparten los hashes de fila al contar duplicados por bloques
+NUM_PARTICIONES_DUPLICADOS = 64
+# Informe de calidad: 'exacto' cuenta todas las filas duplicadas; 'muestreo' las estima con una fracción de las filas
+MODO_CALIDAD_DEFAULT = 'exacto'
+MODOS_CALIDAD = ('exacto', 'muestreo')
+FRACCION_MUESTRA_CALIDAD = 1 / 64
+PRECISION_HLL = 14 # 16.384 registros por columna: error típico de la estimación de valores distintos ~0,8%
+HASH_NULO = np.uint64(0x9E3779B97F4A7C15) # Hash común de todos los nulos
 
 # Valida y convierte un string de fecha a formato ISO 8601 (YYYY-MM-DD)
 def validar_fecha(string_fecha):
     if not isinstance(string_fecha, str):
         return None
-    
+    return _validar_fecha_texto(string_fecha)
+
+# Los validadores escalares solo guardan en caché las entradas de texto; el resto se resuelve antes
+@lru_cache(maxsize=TAMANO_CACHE_VALIDADORES)
+def _validar_fecha_texto(string_fecha):
     string_fecha = string_fecha.strip()
     try:
         # Fecha completa: YYYY-MM-DD
@@ -28,9 +67,12 @@ def validar_fecha(string_fecha):
 def validar_codigo_idioma(codigo_idioma):
     if not isinstance(codigo_idioma, str):
         return None
-    
+    return _validar_codigo_idioma_texto(codigo_idioma)
+
+@lru_cache(maxsize=TAMANO_CACHE_VALIDADORES)
+def _validar_codigo_idioma_texto(codigo_idioma):
     # Regex simple para formatos comunes de BCP-47 como 'en' o 'en-US'
-    if re.match(r'^[a-z]{2}(-[A-Z]{2})?$', codigo_idioma):
+    if REGEX_IDIOMA.match(codigo_idioma):
         return codigo_idioma
     return None
 
@@ -38,29 +80,315 @@ def validar_codigo_idioma(codigo_idioma):
 def validar_codigo_moneda(codigo_moneda):
     if not isinstance(codigo_moneda, str):
         return None
-    
-    if re.match(r'^[A-Z]{3}$', codigo_moneda.upper()):
+    return _validar_codigo_moneda_texto(codigo_moneda)
+
+@lru_cache(maxsize=TAMANO_CACHE_VALIDADORES)
+def _validar_codigo_moneda_texto(codigo_moneda):
+    if REGEX_MONEDA.match(codigo_moneda.upper()):
         return codigo_moneda.upper()
     return None
 
+# --- VALIDADORES POR LOTES ---
+# Validan una columna completa con el mismo resultado que aplicar la función escalar con .apply.
+# Cada valor distinto se valida una sola vez y el resultado se reparte a todas sus filas
+
+# Aplica una función que valida un array de valores distintos (solo textos) y propaga el resultado a la columna
+def _validar_sobre_unicos(serie, validar_unicos):
+    valores = serie.to_numpy(dtype=object)
+    es_texto = np.fromiter((isinstance(valor, str) for valor in valores), dtype=bool, count=len(valores))
+    codigos, unicos = pd.factorize(valores[es_texto])
+
+    resultado = np.full(len(valores), None, dtype=object)
+    if len(unicos):
+        resultado[es_texto] = np.asarray(validar_unicos(np.asarray(unicos, dtype=object)), dtype=object)[codigos]
+    # Misma inferencia de tipos que .apply
+    return pd.Series(resultado, index=serie.index, name=serie.name)
+
+# Valida fechas distintas por grupos de formato, con pd.to_datetime y operaciones de texto vectorizadas.
+# Lo que no encaja en un formato canónico (p. ej. '2012-2-3' o años anteriores a 1678) pasa por validar_fecha
+def _validar_fechas_unicas(unicos):
+    limpios = pd.Series([valor.strip() for valor in unicos], dtype=object)
+    resultado = np.full(len(limpios), None, dtype=object)
+    anio = pd.to_numeric(limpios.str.slice(0, 4), errors='coerce')
+    anio_vectorizable = anio.between(ANIO_MINIMO_VECTORIZADO, ANIO_MAXIMO_VECTORIZADO).to_numpy()
+
+    # Fecha completa: YYYY-MM-DD
+    completa = limpios.str.fullmatch(r'[0-9]{4}-[0-9]{2}-[0-9]{2}').to_numpy() & anio_vectorizable
+    fechas = pd.to_datetime(limpios[completa], format='%Y-%m-%d', errors='coerce')
+    resultado[completa] = np.where(fechas.notna(), limpios[completa], None)
+
+    # Año y mes: YYYY-MM
+    anio_mes = limpios.str.fullmatch(r'[0-9]{4}-[0-9]{2}').to_numpy() & anio_vectorizable
+    fechas = pd.to_datetime(limpios[anio_mes], format='%Y-%m', errors='coerce')
+    resultado[anio_mes] = np.where(fechas.notna(), limpios[anio_mes] + '-01', None)
+
+    # Solo año: YYYY
+    solo_anio = limpios.str.fullmatch(r'[0-9]{4}').to_numpy() & anio_vectorizable
+    resultado[solo_anio] = (limpios[solo_anio] + '-01-01').to_numpy(dtype=object)
+
+    resto = ~(completa | anio_mes | solo_anio)
+    resultado[resto] = [validar_fecha(valor) for valor in unicos[resto]]
+    return resultado
+
+# Versión por lotes de validar_fecha
+def validar_fecha_lote(serie):
+    return _validar_sobre_unicos(serie, _validar_fechas_unicas)
+
+# Versión por lotes de validar_codigo_idioma.
+# Se usa re.match de Python (columna object) y no el motor de Arrow, para que '$' se comporte igual
+def validar_codigo_idioma_lote(serie):
+    def validar_unicos(unicos):
+        validos = pd.Series(unicos, dtype=object).str.match(PATRON_IDIOMA).to_numpy(dtype=bool)
+        return np.where(validos, unicos, None)
+    return _validar_sobre_unicos(serie, validar_unicos)
+
+# Versión por lotes de validar_codigo_moneda
+def validar_codigo_moneda_lote(serie):
+    def validar_unicos(unicos):
+        mayusculas = pd.Series(unicos, dtype=object).str.upper()
+        validos = mayusculas.str.match(PATRON_MONEDA).to_numpy(dtype=bool)
+        return np.where(validos, mayusculas.to_numpy(dtype=object), None)
+    return _validar_sobre_unicos(serie, validar_unicos)
+
 # Elimina espacios en blanco al principio y al final y el exceso de espacios en un string
 def limpiar_string(texto):
     if isinstance(texto, str):
-        return re.sub(r'\s+', ' ', texto).strip()
+        return _limpiar_string_texto(texto)
     return texto
 
+@lru_cache(maxsize=TAMANO_CACHE_VALIDADORES)
+def _limpiar_string_texto(texto):
+    return REGEX_ESPACIOS.sub(' ', texto).strip()
+
+# --- VALIDADORES SOBRE ARRAYS DE ARROW ---
+# Para el motor Arrow: reciben un array large_string y devuelven otro con el mismo resultado que los validadores
+# por lotes, con kernels de pyarrow.compute. Los nulos de la entrada siguen siendo nulos
+
+_NULO_TEXTO = pa.scalar(None, pa.large_string())
+
+# Versión sobre Arrow de validar_fecha_lote: cada fecha distinta se valida una sola vez, con la misma función
+def validar_fecha_arrow(arreglo):
+    codificado = pc.dictionary_encode(arreglo)
+    unicos = codificado.dictionary.to_numpy(zero_copy_only=False)
+    validas = _validar_fechas_unicas(unicos) if len(unicos) else []
+    return pa.array(validas, type=pa.large_string()).take(codificado.indices)
+
+# Versión sobre Arrow de validar_codigo_idioma_lote
+def validar_codigo_idioma_arrow(arreglo):
+    return pc.if_else(pc.match_substring_regex(arreglo, PATRON_IDIOMA_ARROW), arreglo, _NULO_TEXTO)
+
+# Versión sobre Arrow de validar_codigo_moneda_lote. str.upper de Python convierte algunos caracteres no ASCII
+# en letras ASCII (p. ej. 'ſ' en 'S'); esos valores, poco frecuentes, se validan con validar_codigo_moneda
+def validar_codigo_moneda_arrow(arreglo):
+    mayusculas = pc.ascii_upper(arreglo)
+    es_ascii = pc.string_is_ascii(arreglo)
+    resultado = pc.if_else(pc.and_(es_ascii, pc.match_substring_regex(mayusculas, PATRON_MONEDA_ARROW)), mayusculas, _NULO_TEXTO)
+
+    no_ascii = pc.fill_null(pc.invert(es_ascii), False)
+    if not pc.any(no_ascii).as_py():
+        return resultado
+    valores = [validar_codigo_moneda(valor) for valor in arreglo.filter(no_ascii).to_pylist()]
+    return pc.replace_with_mask(resultado, no_ascii, pa.array(valores, type=pa.large_string()))
+
+# Versión sobre Arrow de limpiar_string para columnas de texto
+def limpiar_string_arrow(arreglo):
+    return pc.utf8_trim(pc.replace_substring_regex(arreglo, PATRON_ESPACIOS_ARROW, ' '), ' ')
+
 # Convierte todos los nombres de las columnas de un DataFrame a snake_case
 def normalizar_nombres_columnas(df):
-    df.columns = [re.sub(r'(?<!^)(?=[A-Z])', '_', nombre).lower() for nombre in df.columns]
+    df.columns = [REGEX_MAYUSCULA_INTERIOR.sub('_', nombre).lower() for nombre in df.columns]
     return df
 
-# Genera un informe de calidad para un DataFrame dado
-def generar_reporte_calidad(df, nombre_fuente):
-    reporte = {
-        'fuente': nombre_fuente,
-        'filas_totales': len(df),
-        'nulos_por_columna': {col: int(df[col].isnull().sum()) for col in df.columns},
-        'porcentaje_nulos_por_columna': {col: f"{df[col].isnull().mean() * 100:.2f}%" for col in df.columns},
-        'filas_duplicadas': int(df.duplicated().sum())
-    }
-    return reporte
\ No newline at end of file
+# Genera un informe de calidad para un DataFrame dado, en una sola pasada por columna (ver AcumuladorCalidad)
+def generar_reporte_calidad(df, nombre_fuente, modo=MODO_CALIDAD_DEFAULT):
+    acumulador = AcumuladorCalidad(nombre_fuente, modo=modo)
+    acumulador.agregar(df)
+    return acumulador.reporte()
+
+# Las listas (p. ej. autores) no se pueden hashear: se sustituyen por su texto, igual para listas y arrays de NumPy
+def _valores_hashables(valores):
+    return np.array([str(list(valor)) if isinstance(valor, (list, tuple, np.ndarray)) else valor for valor in valores], dtype=object)
+
+# Hash de 64 bits de cada valor de una columna; los nulos dan todos el mismo hash.
+# Devuelve también los hashes de los valores distintos no nulos (o de todos los no nulos, que para HyperLogLog
+# da lo mismo) y si los valores admiten orden (las columnas con listas no lo admiten)
+def _hash_columna(serie, nulos):
+    if isinstance(serie.dtype, pd.StringDtype) and serie.dtype.storage == 'pyarrow':
+        # Columna de texto de Arrow: se hashea una vez cada valor distinto, con el mismo resultado
+        arreglo = pa.array(serie.array)
+        codificado = pc.dictionary_encode(arreglo.combine_chunks() if isinstance(arreglo, pa.ChunkedArray) else arreglo)
+        hash_distintos = pd.util.hash_array(codificado.dictionary.to_numpy(zero_copy_only=False).astype(object), categorize=False)
+        indices = pc.fill_null(codificado.indices, 0).to_numpy()
+        hash_columna = hash_distintos[indices] if len(hash_distintos) else np.zeros(len(serie), dtype=np.uint64)
+        hash_columna[nulos] = HASH_NULO
+        return hash_columna, hash_distintos, True
+
+    ordenable = True
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        hash_columna = pd.util.hash_array(serie.to_numpy(dtype='float64', na_value=np.nan))
+    else:
+        valores = serie.to_numpy(dtype=object)
+        try:
+            hash_columna = pd.util.hash_array(valores, categorize=True)
+        except TypeError:
+            hash_columna = pd.util.hash_array(_valores_hashables(valores), categorize=True)
+            ordenable = False
+    hash_columna[nulos] = HASH_NULO
+    return hash_columna, hash_columna[~nulos], ordenable
+
+# Combina el hash de una columna con el acumulado de las anteriores
+def _combinar_hash(hashes, hash_columna):
+    with np.errstate(over='ignore'):
+        return hashes * np.uint64(1000003) + hash_columna
+
+# Hash de 64 bits de cada fila. Los nulos de cualquier tipo dan el mismo hash y los números se comparan como decimales,
+# para que dos filas iguales coincidan aunque pandas haya inferido tipos distintos en bloques distintos
+def hash_filas(df):
+    hashes = np.zeros(len(df), dtype=np.uint64)
+    for columna in df.columns:
+        serie = df[columna]
+        hashes = _combinar_hash(hashes, _hash_columna(serie, serie.isnull().to_numpy())[0])
+    return hashes
+
+# Estimador HyperLogLog del número de valores distintos a partir de sus hashes de 64 bits, con memoria fija
+# (2**precision registros de un byte) y un error típico de 1.04 / sqrt(2**precision)
+class HyperLogLog:
+    def __init__(self, precision=PRECISION_HLL):
+        self.precision = precision
+        self.registros = np.zeros(1 << precision, dtype=np.uint8)
+
+    def agregar(self, hashes):
+        if not len(hashes):
+            return
+        bits_resto = 64 - self.precision
+        indices = (hashes >> np.uint64(bits_resto)).astype(np.int64)
+        resto = hashes & np.uint64((1 << bits_resto) - 1)
+        # Posición del primer bit a 1 del resto; frexp da la longitud en bits exacta porque el resto cabe en un float64
+        longitud = np.frexp(resto.astype(np.float64))[1]
+        np.maximum.at(self.registros, indices, (bits_resto - longitud + 1).astype(np.uint8))
+
+    def estimar(self):
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimacion = alfa * m * m / np.sum(np.ldexp(1.0, -self.registros.astype(np.int64)))
+        vacios = int(np.count_nonzero(self.registros == 0))
+        # Corrección para cardinalidades pequeñas (linear counting)
+        if estimacion <= 2.5 * m and vacios:
+            estimacion = m * np.log(m / vacios)
+        return int(round(estimacion))
+
+# Convierte un mínimo o máximo de pandas/NumPy en un valor que se puede guardar en JSON
+def _valor_json(valor):
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, (pd.Timestamp, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, float) and not np.isfinite(valor):
+        return None
+    return valor if isinstance(valor, (str, int, float, bool)) else str(valor)
+
+# Informe de calidad de un DataFrame completo o que llega por bloques, recorriendo cada columna una sola vez por bloque.
+# Con el hash de cada columna se calculan a la vez el hash de la fila (para los duplicados) y la estimación
+# HyperLogLog de valores distintos; los nulos, mínimos y máximos se acumulan bloque a bloque.
+# Duplicados: en modo 'exacto' se guardan los hashes de todas las filas (en memoria o, con directorio_trabajo,
+# en archivos por partición para que la memoria no dependa del tamaño total); en modo 'muestreo' solo los de
+# una fracción de las filas elegida por su hash, así que las filas repetidas caen todas o ninguna en la muestra
+# y el número de duplicados se estima escalando el de la muestra. Esa estimación es buena si los duplicados están
+# repartidos entre muchas filas distintas; si se concentran en pocas filas muy repetidas, filas_distintas_estimadas
+# (HyperLogLog de los hashes de fila, en los dos modos) da una segunda estimación: filas_totales - filas_distintas
+class AcumuladorCalidad:
+    def __init__(self, nombre_fuente, directorio_trabajo=None, num_particiones=NUM_PARTICIONES_DUPLICADOS,
+                 modo=MODO_CALIDAD_DEFAULT, fraccion_muestra=FRACCION_MUESTRA_CALIDAD):
+        if modo not in MODOS_CALIDAD:
+            raise ValueError(f"Modo de calidad desconocido: '{modo}'. Opciones: {', '.join(MODOS_CALIDAD)}.")
+        self.nombre_fuente = nombre_fuente
+        self.directorio_trabajo = directorio_trabajo
+        self.num_particiones = num_particiones
+        self.modo = modo
+        # La muestra se elige con 1 de cada `divisor_muestra` valores de los bits altos del hash
+        self.divisor_muestra = 1 if modo == 'exacto' else max(1, int(round(1 / fraccion_muestra)))
+        self.filas_totales = 0
+        self.nulos_por_columna = {}
+        self.distintos_por_columna = {}
+        self.minimo_por_columna = {}
+        self.maximo_por_columna = {}
+        self.filas_distintas = HyperLogLog()
+        self.hashes_en_memoria = []
+        if directorio_trabajo is not None:
+            os.makedirs(directorio_trabajo, exist_ok=True)
+
+    def _ruta_particion(self, particion):
+        return os.path.join(self.directorio_trabajo, f"hashes-{particion:03d}.bin")
+
+    # Actualiza el mínimo y el máximo de una columna; si los bloques tienen tipos que no se pueden comparar
+    # entre sí, la columna se queda sin mínimo ni máximo
+    def _actualizar_extremos(self, columna, serie, ordenable):
+        if columna in self.minimo_por_columna and self.minimo_por_columna[columna] is None:
+            return
+        try:
+            if not ordenable:
+                raise TypeError
+            minimo, maximo = serie.min(), serie.max()
+            if pd.isna(minimo):
+                return
+            if columna in self.minimo_por_columna:
+                minimo = min(minimo, self.minimo_por_columna[columna])
+                maximo = max(maximo, self.maximo_por_columna[columna])
+        except TypeError:
+            minimo = maximo = None
+        self.minimo_por_columna[columna] = minimo
+        self.maximo_por_columna[columna] = maximo
+
+    def agregar(self, df):
+        self.filas_totales += len(df)
+        hashes = np.zeros(len(df), dtype=np.uint64)
+        for columna in df.columns:
+            serie = df[columna]
+            nulos = serie.isnull().to_numpy()
+            self.nulos_por_columna[columna] = self.nulos_por_columna.get(columna, 0) + int(nulos.sum())
+
+            hash_columna, hash_distintos, ordenable = _hash_columna(serie, nulos)
+            hashes = _combinar_hash(hashes, hash_columna)
+            self.distintos_por_columna.setdefault(columna, HyperLogLog()).agregar(hash_distintos)
+            self._actualizar_extremos(columna, serie, ordenable)
+
+        self.filas_distintas.agregar(hashes)
+        if self.divisor_muestra > 1:
+            hashes = hashes[(hashes >> np.uint64(40)) % np.uint64(self.divisor_muestra) == 0]
+        if self.directorio_trabajo is None:
+            self.hashes_en_memoria.append(hashes)
+            return
+        particiones = hashes % np.uint64(self.num_particiones)
+        for particion in np.unique(particiones):
+            with open(self._ruta_particion(int(particion)), 'ab') as f:
+                hashes[particiones == particion].tofile(f)
+
+    def _contar_duplicados(self):
+        if self.directorio_trabajo is None:
+            hashes = np.concatenate(self.hashes_en_memoria) if self.hashes_en_memoria else np.empty(0, dtype=np.uint64)
+            return len(hashes) - len(np.unique(hashes))
+        filas_duplicadas = 0
+        for particion in range(self.num_particiones):
+            ruta = self._ruta_particion(particion)
+            if os.path.exists(ruta):
+                hashes = np.fromfile(ruta, dtype=np.uint64)
+                filas_duplicadas += len(hashes) - len(np.unique(hashes))
+        return filas_duplicadas
+
+    def reporte(self):
+        return {
+            'fuente': self.nombre_fuente,
+            'filas_totales': self.filas_totales,
+            'nulos_por_columna': dict(self.nulos_por_columna),
+            'porcentaje_nulos_por_columna': {
+                col: f"{(nulos / self.filas_totales if self.filas_totales else float('nan')) * 100:.2f}%"
+                for col, nulos in self.nulos_por_columna.items()
+            },
+            'filas_duplicadas': self._contar_duplicados() * self.divisor_muestra,
+            'modo_calidad': self.modo,
+            'fraccion_muestra_duplicados': 1 / self.divisor_muestra,
+            'filas_distintas_estimadas': self.filas_distintas.estimar(),
+            'valores_distintos_estimados': {col: hll.estimar() for col, hll in self.distintos_por_columna.items()},
+            'minimo_por_columna': {col: _valor_json(valor) for col, valor in self.minimo_por_columna.items() if valor is not None},
+            'maximo_por_columna': {col: _valor_json(valor) for col, valor in self.maximo_por_columna.items() if valor is not None},
+        }
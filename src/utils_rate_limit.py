@@ -0,0 +1,143 @@
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+
+from utils_metricas import obtener_registro
+
+# --- CONFIGURACIÓN ---
+# Tasa inicial y techo (peticiones por segundo) para cada host conocido
+TASAS_POR_HOST = {
+    'www.goodreads.com': {'tasa_inicial': 2.0, 'tasa_maxima': 4.0},
+    'www.googleapis.com': {'tasa_inicial': 5.0, 'tasa_maxima': 10.0},
+}
+TASA_DEFAULT = {'tasa_inicial': 1.0, 'tasa_maxima': 2.0}
+TASA_MINIMA = 0.1 # Nunca se baja de una petición cada 10 segundos
+INCREMENTO_ADITIVO = 0.1 # Peticiones/s que se recuperan tras cada respuesta correcta
+FACTOR_REDUCCION = 0.5 # Multiplicador aplicado a la tasa tras un 429/503
+ESPERA_MAXIMA_RETRY_AFTER = 300 # Segundos; evita quedarse bloqueado por un Retry-After absurdo
+CODIGOS_LIMITACION = (429, 503)
+
+# Cubo de tokens con ajuste adaptativo (AIMD) de la tasa de reposición
+class CuboTokens:
+    def __init__(self, tasa_inicial, tasa_maxima, capacidad=None):
+        self.tasa = tasa_inicial
+        self.tasa_maxima = tasa_maxima
+        self.capacidad = capacidad or max(1.0, tasa_inicial)
+        self.tokens = self.capacidad
+        self.ultima_reposicion = time.monotonic()
+        self.bloqueado_hasta = 0.0
+        self.candado = threading.Lock()
+
+    def _reponer(self, ahora):
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultima_reposicion) * self.tasa)
+        self.ultima_reposicion = ahora
+
+    # Bloquea hasta que haya un token disponible y lo consume
+    def adquirir(self):
+        while True:
+            with self.candado:
+                ahora = time.monotonic()
+                self._reponer(ahora)
+                if ahora < self.bloqueado_hasta:
+                    espera = self.bloqueado_hasta - ahora
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    espera = (1 - self.tokens) / self.tasa
+            time.sleep(espera)
+
+    # Aumento aditivo de la tasa tras una respuesta correcta, hasta el techo configurado
+    def registrar_exito(self):
+        with self.candado:
+            self.tasa = min(self.tasa_maxima, self.tasa + INCREMENTO_ADITIVO)
+
+    # Reducción multiplicativa de la tasa y pausa del host durante la espera indicada
+    def registrar_limitacion(self, espera):
+        with self.candado:
+            self.tasa = max(TASA_MINIMA, self.tasa * FACTOR_REDUCCION)
+            self.tokens = 0.0
+            self.bloqueado_hasta = max(self.bloqueado_hasta, time.monotonic() + espera)
+
+# Mantiene un cubo de tokens por host, compartido por todos los hilos del proceso
+class LimitadorTasa:
+    def __init__(self, tasas_por_host=None, tasa_default=None):
+        self.tasas_por_host = tasas_por_host if tasas_por_host is not None else TASAS_POR_HOST
+        self.tasa_default = tasa_default or TASA_DEFAULT
+        self.cubos = {}
+        self.candado = threading.Lock()
+
+    def obtener_cubo(self, url):
+        host = urlparse(url).netloc
+        with self.candado:
+            if host not in self.cubos:
+                config = self.tasas_por_host.get(host, self.tasa_default)
+                self.cubos[host] = CuboTokens(config['tasa_inicial'], config['tasa_maxima'])
+            return self.cubos[host]
+
+    def adquirir(self, url):
+        self.obtener_cubo(url).adquirir()
+
+    def registrar_exito(self, url):
+        self.obtener_cubo(url).registrar_exito()
+
+    def registrar_limitacion(self, url, espera):
+        self.obtener_cubo(url).registrar_limitacion(espera)
+
+# Limitador que usa obtener_con_limite cuando no se le pasa otro: todas las peticiones del proceso
+# (scraper y enriquecedor) comparten así las tasas de cada host
+_limitador_global = LimitadorTasa()
+
+# Interpreta la cabecera Retry-After, en segundos o como fecha HTTP
+def interpretar_retry_after(valor):
+    if not valor:
+        return None
+    valor = valor.strip()
+    if valor.isdigit():
+        return min(float(valor), ESPERA_MAXIMA_RETRY_AFTER)
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    segundos = (fecha - datetime.now(timezone.utc)).total_seconds()
+    return min(max(segundos, 0.0), ESPERA_MAXIMA_RETRY_AFTER)
+
+# Realiza un GET respetando el limitador por host, con reintentos, backoff y soporte de Retry-After
+def obtener_con_limite(url, reintentos=3, factor_backoff=0.5, sesion=None, limitador=None, descripcion=None, **kwargs):
+    cliente = sesion or requests
+    limitador = limitador or _limitador_global
+    descripcion = descripcion or url
+    metricas = obtener_registro()
+
+    for i in range(reintentos):
+        espera_backoff = factor_backoff * (2 ** i)
+        if i > 0:
+            metricas.contar('http_reintentos')
+        limitador.adquirir(url)
+        inicio, respuesta = time.perf_counter(), None
+        try:
+            respuesta = cliente.get(url, **kwargs)
+            metricas.registrar_peticion(time.perf_counter() - inicio, len(respuesta.content), respuesta.status_code)
+            if respuesta.status_code in CODIGOS_LIMITACION:
+                espera = interpretar_retry_after(respuesta.headers.get('Retry-After'))
+                espera = espera if espera is not None else espera_backoff
+                print(f"Límite de tasa alcanzado para {descripcion} (HTTP {respuesta.status_code}). Reintentando en {espera} segundos...")
+                limitador.registrar_limitacion(url, espera)
+                continue
+            respuesta.raise_for_status()
+            limitador.registrar_exito(url)
+            return respuesta
+        except requests.exceptions.RequestException as e:
+            if respuesta is None: # Sin respuesta (conexión, timeout...): cuenta como error de red
+                metricas.registrar_peticion(time.perf_counter() - inicio)
+            print(f"Solicitud fallida para {descripcion}: {e}. Reintentando en {espera_backoff} segundos...")
+            time.sleep(espera_backoff)
+    metricas.contar('http_fallidas')
+    print(f"No se pudo obtener {descripcion} después de {reintentos} reintentos.")
+    return None
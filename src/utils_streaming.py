@@ -0,0 +1,120 @@
+import io
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils_parquet import convertir_a_esquema
+
+# --- CONFIGURACIÓN ---
+TAMANO_LECTURA_JSON = 1 << 20 # Caracteres leídos del disco en cada paso al recorrer un array JSON
+
+# Lee un archivo con un array JSON de objetos (como goodreads_books.json) por bloques de tamano_bloque objetos,
+# sin cargar el archivo entero. Cada bloque se convierte con pd.read_json, así que los tipos se infieren igual
+# que al leer el archivo completo; las columnas de `tipos` se fuerzan para que no dependan del bloque
+def leer_json_por_bloques(ruta, tamano_bloque, tipos=None):
+    decodificador = json.JSONDecoder()
+    with open(ruta, 'r', encoding='utf-8') as f:
+        buffer = ''
+        posicion = 0
+        fin_archivo = False
+        inicio_array = False
+        objetos = []
+
+        while True:
+            # Salta espacios, el corchete inicial y las comas entre objetos
+            while posicion < len(buffer) and (buffer[posicion].isspace() or buffer[posicion] == ','
+                                                or (buffer[posicion] == '[' and not inicio_array)):
+                inicio_array = inicio_array or buffer[posicion] == '['
+                posicion += 1
+
+            if posicion < len(buffer) and not inicio_array:
+                raise ValueError(f"El archivo '{ruta}' no contiene un array JSON.")
+
+            if posicion == len(buffer):
+                if fin_archivo:
+                    break
+                leido = f.read(TAMANO_LECTURA_JSON)
+                buffer, posicion = buffer[posicion:] + leido, 0
+                fin_archivo = not leido
+                continue
+
+            if buffer[posicion] == ']':
+                break
+
+            try:
+                _, fin = decodificador.raw_decode(buffer, posicion)
+            except json.JSONDecodeError:
+                # El objeto sigue en la próxima lectura
+                if fin_archivo:
+                    raise
+                leido = f.read(TAMANO_LECTURA_JSON)
+                buffer, posicion = buffer[posicion:] + leido, 0
+                fin_archivo = not leido
+                continue
+
+            objetos.append(buffer[posicion:fin])
+            posicion = fin
+            if len(objetos) == tamano_bloque:
+                yield pd.read_json(io.StringIO('[' + ','.join(objetos) + ']'), dtype=tipos)
+                objetos = []
+
+        if objetos:
+            yield pd.read_json(io.StringIO('[' + ','.join(objetos) + ']'), dtype=tipos)
+
+# Lee un CSV por bloques de tamano_bloque filas
+def leer_csv_por_bloques(ruta, tamano_bloque, tipos=None, sep=';'):
+    yield from pd.read_csv(ruta, sep=sep, dtype=tipos, chunksize=tamano_bloque)
+
+# Escribe un DataFrame intermedio como archivo Parquet en el directorio de trabajo
+def escribir_parte(df, ruta, filas_por_grupo=None):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), ruta, row_group_size=filas_por_grupo)
+
+# Une los esquemas de varias partes. Una columna sin valores en una parte (tipo null) toma el tipo de las demás,
+# los enteros y decimales se unifican como decimales y, si aun así hay conflicto, la columna pasa a texto
+def unificar_esquemas(esquemas):
+    try:
+        unificado = pa.unify_schemas(esquemas, promote_options='permissive')
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        tipos = {}
+        for esquema in esquemas:
+            for campo in esquema:
+                if pa.types.is_null(campo.type):
+                    tipos.setdefault(campo.name, campo.type)
+                elif campo.name not in tipos or pa.types.is_null(tipos[campo.name]):
+                    tipos[campo.name] = campo.type
+                elif tipos[campo.name] != campo.type:
+                    tipos[campo.name] = pa.large_string()
+        unificado = pa.schema([pa.field(nombre, tipo) for nombre, tipo in tipos.items()])
+
+    return unificado.with_metadata(_metadatos_pandas(esquemas, unificado))
+
+# Combina los metadatos de pandas de las partes: cada columna conserva los de la primera parte en la que tenía valores,
+# para que al leer el resultado se recuperen los tipos de pandas (p. ej. Int64) igual que con un único to_parquet
+def _metadatos_pandas(esquemas, unificado):
+    partes = [
+        (esquema, json.loads(esquema.metadata[b'pandas']))
+        for esquema in esquemas if esquema.metadata and b'pandas' in esquema.metadata
+    ]
+    if not partes:
+        return None
+
+    columnas = {}
+    for esquema, metadato in partes:
+        for columna in metadato['columns']:
+            nombre = columna['name']
+            con_valores = nombre in esquema.names and not pa.types.is_null(esquema.field(nombre).type)
+            if nombre not in columnas or (con_valores and not columnas[nombre][1]):
+                columnas[nombre] = (columna, con_valores)
+
+    combinado = dict(partes[0][1])
+    combinado['columns'] = [columnas[nombre][0] for nombre in unificado.names if nombre in columnas]
+    return {b'pandas': json.dumps(combinado).encode('utf-8')}
+
+# Concatena tablas de Arrow con esquemas compatibles pero no idénticos
+def concatenar_tablas(tablas):
+    esquema = unificar_esquemas([tabla.schema for tabla in tablas])
+    return pa.concat_tables([convertir_a_esquema(tabla, esquema) for tabla in tablas])